@@ -1,7 +1,7 @@
 import { Plugin, Notice } from 'obsidian';
 import { LoggerModule } from './logger';
 import { AutoReloadModule } from './auto-reload';
-import { PluginSettings, DEFAULT_SETTINGS } from './shared/types';
+import { PluginSettings, DEFAULT_SETTINGS, ReloadRequest } from './shared/types';
 import { CursorLoggerSettingTab } from './settings';
 
 /**
@@ -111,7 +111,15 @@ export default class ObsidianLoggerPlugin extends Plugin {
    * 保存设置
    */
   async saveSettings() {
-    await this.saveData(this.settings);
+    // 重载队列由 MCP Server 写入、配置监听处理，保存设置时保留磁盘上的最新队列
+    const data: any = { ...this.settings };
+    delete data._reloadQueue;
+    delete data._reloadRequest;
+    const latestData = await this.loadData();
+    if (latestData && Array.isArray(latestData._reloadQueue)) {
+      data._reloadQueue = latestData._reloadQueue;
+    }
+    await this.saveData(data);
   }
   
   /**
@@ -317,8 +325,8 @@ ${status.watchedPlugins.map(id => `  • ${id}`).join('\n')}
       const oldMode = this.settings.autoReload.mode;
       const oldWatchedPlugins = [...this.settings.autoReload.watchedPlugins];
       
-      // 检查是否有重载请求
-      const reloadRequest = (loadedData as any)._reloadRequest;
+      // 检查是否有重载请求（队列，以及旧版本 MCP Server 写入的单个请求）
+      const { requests: reloadRequests, requestIds, consumedIds, consumedCount } = this.collectReloadRequests(loadedData);
       
       // 更新配置（直接赋值，不触发保存）
       this.settings = Object.assign({}, DEFAULT_SETTINGS, loadedData);
@@ -340,14 +348,25 @@ ${status.watchedPlugins.map(id => `  • ${id}`).join('\n')}
         };
       }
       
-      // 2. 处理重载请求
-      if (reloadRequest) {
-        console.log(`[Config Monitor] 📨 收到重载请求: ${reloadRequest.pluginId}`);
-        await this.handleReloadRequest(reloadRequest);
+      // 2. 按顺序处理重载请求
+      if (consumedCount > 0) {
+        console.log(`[Config Monitor] 📨 收到 ${reloadRequests.length} 个重载请求`);
+        for (const request of reloadRequests) {
+          await this.handleReloadRequest(request, requestIds.get(request.pluginId) || [request.id]);
+        }
         
-        // 清除请求标记
-        delete (loadedData as any)._reloadRequest;
-        await this.saveData(loadedData);
+        // 重新读取后移除本轮读到的全部请求（包括被合并的重复请求和无效条目），
+        // 保留处理期间新加入队列的请求；否则残留的重复请求会在下次检查时再次触发重载
+        const latestData = (await this.loadData()) || {};
+        const remaining = (Array.isArray(latestData._reloadQueue) ? latestData._reloadQueue : [])
+          .filter((request: ReloadRequest) => this.isValidReloadRequest(request) && !consumedIds.has(request.id));
+        if (remaining.length > 0) {
+          latestData._reloadQueue = remaining;
+        } else {
+          delete latestData._reloadQueue;
+        }
+        delete latestData._reloadRequest;
+        await this.saveData(latestData);
       }
       
       // 3. 应用配置变化
@@ -413,24 +432,78 @@ ${status.watchedPlugins.map(id => `  • ${id}`).join('\n')}
     }
   }
   
+  /**
+   * 从配置中收集待处理的重载请求
+   * 
+   * 同一插件的多个请求只重载一次
+   * @param data data.json 的内容
+   * @returns requests: 按提交顺序排列、每个插件一个的重载请求；
+   *          requestIds: 插件 ID 到合并进该次重载的所有请求 ID（按提交顺序）；
+   *          consumedIds: 本轮读到的所有请求 ID（包括被合并的重复请求）；
+   *          consumedCount: 本轮读到的条目数（包括无效条目）
+   */
+  private collectReloadRequests(data: any): {
+    requests: ReloadRequest[];
+    requestIds: Map<string, string[]>;
+    consumedIds: Set<string>;
+    consumedCount: number;
+  } {
+    const entries: any[] = [];
+    if (data && Array.isArray(data._reloadQueue)) {
+      entries.push(...data._reloadQueue);
+    }
+    if (data && data._reloadRequest) {
+      const legacy = data._reloadRequest;
+      entries.push({ id: `legacy-${legacy.timestamp}`, pluginId: legacy.pluginId, timestamp: legacy.timestamp });
+    }
+    
+    const requests: ReloadRequest[] = [];
+    const requestIds = new Map<string, string[]>();
+    const consumedIds = new Set<string>();
+    for (const entry of entries) {
+      if (!this.isValidReloadRequest(entry)) {
+        continue;
+      }
+      consumedIds.add(entry.id);
+      const ids = requestIds.get(entry.pluginId);
+      if (ids) {
+        ids.push(entry.id);
+      } else {
+        requestIds.set(entry.pluginId, [entry.id]);
+        requests.push(entry);
+      }
+    }
+    return { requests, requestIds, consumedIds, consumedCount: entries.length };
+  }
+  
+  /**
+   * 检查队列条目是否是有效的重载请求
+   */
+  private isValidReloadRequest(entry: any): entry is ReloadRequest {
+    return !!entry && typeof entry.id === 'string' && typeof entry.pluginId === 'string' && entry.pluginId.length > 0;
+  }
+  
   /**
    * 处理重载请求
+   * @param request 该插件的第一个重载请求
+   * @param requestIds 合并进本次重载的所有请求 ID，日志中全部记录，每个请求方都能匹配到结果
    */
-  private async handleReloadRequest(request: { pluginId: string; timestamp: number }) {
+  private async handleReloadRequest(request: ReloadRequest, requestIds: string[]) {
     const { pluginId, timestamp } = request;
+    const id = requestIds.join(',');
     
-    console.log(`[Config Monitor] 收到重载请求: ${pluginId} (时间戳: ${timestamp})`);
+    console.log(`[Config Monitor] 收到重载请求: ${pluginId} (请求: ${id}, 时间戳: ${timestamp})`);
     
     // 检查插件是否存在且已启用
     const plugin = (this.app as any).plugins.plugins[pluginId];
     if (!plugin) {
-      console.warn(`[Config Monitor] 插件不存在: ${pluginId}`);
+      console.warn(`[Config Monitor] 插件不存在: ${pluginId} (请求: ${id})`);
       new Notice(`⚠️ 插件不存在: ${pluginId}`);
       return;
     }
     
     if (!(this.app as any).plugins.enabledPlugins.has(pluginId)) {
-      console.warn(`[Config Monitor] 插件未启用: ${pluginId}`);
+      console.warn(`[Config Monitor] 插件未启用: ${pluginId} (请求: ${id})`);
       new Notice(`⚠️ 插件未启用: ${pluginId}`);
       return;
     }
@@ -450,10 +523,10 @@ ${status.watchedPlugins.map(id => `  • ${id}`).join('\n')}
       
       const duration = Date.now() - startTime;
       
-      console.log(`[Config Monitor] ✅ 插件已重载: ${pluginId} (用时: ${duration}ms)`);
+      console.log(`[Config Monitor] ✅ 插件已重载: ${pluginId} (用时: ${duration}ms, 请求: ${id})`);
       new Notice(`✅ 插件已重载: ${pluginId}`);
     } catch (error) {
-      console.error(`[Config Monitor] ❌ 重载失败: ${pluginId}`, error);
+      console.error(`[Config Monitor] ❌ 重载失败: ${pluginId} (请求: ${id})`, error);
       new Notice(`❌ 重载失败: ${pluginId}`);
     }
   }
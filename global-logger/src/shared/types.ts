@@ -87,6 +87,15 @@ export const DEFAULT_SETTINGS: PluginSettings = {
   }
 };
 
+/**
+ * 重载请求（MCP Server 写入 data.json 的 _reloadQueue）
+ */
+export interface ReloadRequest {
+  id: string;         // 请求 ID，重载日志中会记录，用于追踪
+  pluginId: string;   // 要重载的插件 ID
+  timestamp: number;  // 提交时间（毫秒）
+}
+
 /**
  * 日志级别类型
  */
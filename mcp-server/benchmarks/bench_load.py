@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+并发负载基准测试
+
+以 stdio 方式启动服务进程（与 Cursor 相同，通过 launcher.py），由多个并发工作者
+按配置的比例持续发送工具调用（统计摘要、最近错误、错误分析、读取日志、配置修改等），
+测量整体吞吐量和每个工具的 p50/p95/p99 延迟。可选地在测试期间持续追加日志，
+让缓存不断失效，模拟插件正在写日志时智能体反复查询的场景。
+
+用于比较缓存、工作线程执行和请求合并等改动对真实负载的影响。
+消息直接按行写入 JSON-RPC，不使用 MCP 客户端；所有请求共用一个 stdio 连接，响应按 id 分发。
+
+不指定配置文件时，在临时目录中用合成日志（log_generator）创建仓库和配置。
+
+用法:
+    python benchmarks/bench_load.py
+    python benchmarks/bench_load.py --concurrency 16 --duration 20 --size 100M
+    python benchmarks/bench_load.py --mix summary=5 errors=3 analysis=2 config=1 --append-rate 500
+    python benchmarks/bench_load.py --config /path/to/config.json --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+
+from log_generator import ensure_log, parse_size
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+LAUNCHER = os.path.join(SRC_DIR, 'launcher.py')
+
+# 负载类型 -> 生成 (工具名称, 参数) 的函数
+OPERATIONS = {
+    'summary': lambda rng: ("get_log_summary", {}),
+    'errors': lambda rng: ("get_recent_errors", {"limit": rng.choice([5, 10, 20])}),
+    'analysis': lambda rng: ("analyze_errors", {"time_range_hours": rng.choice([1, 24])}),
+    'read': lambda rng: ("read_logs", {"lines": 50}),
+    'status': lambda rng: ("get_auto_reload_status", {}),
+    'config': lambda rng: rng.choice([
+        ("set_auto_reload_mode", {"mode": rng.choice(["auto", "smart", "manual"])}),
+        ("manage_watched_plugins", {"action": "add", "plugins": ["load-test-plugin"]}),
+        ("manage_watched_plugins", {"action": "remove", "plugins": ["load-test-plugin"]}),
+    ]),
+}
+
+DEFAULT_MIX = ['summary=4', 'errors=3', 'analysis=2', 'read=2', 'status=1', 'config=1']
+
+
+def parse_mix(items: list) -> dict:
+    """解析负载比例（如 summary=4 errors=3）
+    
+    Raises:
+        ValueError: 未知的负载类型或权重无效
+    """
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition('=')
+        if name not in OPERATIONS:
+            raise ValueError(f"未知的负载类型: {name}（可用: {', '.join(OPERATIONS)}）")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"权重不能为负数: {item}")
+    return mix
+
+
+def prepare_config(work_dir: str, size: int, seed: int) -> str:
+    """用合成日志创建临时仓库和配置
+    
+    Returns:
+        配置文件路径
+    """
+    vault_path = os.path.join(work_dir, 'vault')
+    plugin_dir = os.path.join(vault_path, '.obsidian', 'plugins', 'obsidian-logger')
+    os.makedirs(plugin_dir, exist_ok=True)
+    with open(os.path.join(plugin_dir, 'data.json'), 'w', encoding='utf-8') as f:
+        json.dump({"autoReload": {"mode": "smart", "watchedPlugins": ["my-plugin"]}}, f)
+    
+    log_path = os.path.join(work_dir, 'logs', 'obsidian-debug.log')
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    source = ensure_log(os.path.join(tempfile.gettempdir(), 'obsidian-logger-bench'), size, seed)
+    shutil.copyfile(source, log_path)
+    
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "vault_path": vault_path,
+            "log_file_path": log_path,
+            "index": {"dir": os.path.join(work_dir, 'index')},
+        }, f)
+    return config_path
+
+
+class StdioClient:
+    """共用一个 stdio 连接的 JSON-RPC 客户端，响应按 id 分发给等待的请求"""
+    
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self._next_id = 0
+        self._pending = {}
+        self._reader = asyncio.create_task(self._read_loop())
+    
+    async def _read_loop(self) -> None:
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            future = self._pending.pop(message.get('id'), None)
+            if future is not None and not future.done():
+                future.set_result(message)
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"服务进程提前退出（返回码 {self.process.returncode}）"))
+    
+    def notify(self, method: str) -> None:
+        self.process.stdin.write(json.dumps({'jsonrpc': '2.0', 'method': method}).encode('utf-8') + b'\n')
+    
+    async def request(self, method: str, params: dict) -> dict:
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        message = {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+        self.process.stdin.write(json.dumps(message).encode('utf-8') + b'\n')
+        await self.process.stdin.drain()
+        return await future
+    
+    async def close(self) -> None:
+        self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), 10)
+        except asyncio.TimeoutError:
+            self.process.kill()
+        self._reader.cancel()
+
+
+def appender(log_path: str, rate: int, stop: threading.Event) -> None:
+    """按速率追加日志（每 100ms 批量写入一次，模拟插件的缓冲刷新）"""
+    seq = 0
+    while not stop.wait(0.1):
+        lines = []
+        for _ in range(max(rate // 10, 1)):
+            seq += 1
+            level = 'ERROR' if seq % 20 == 0 else 'LOG'
+            lines.append(f"[{time.strftime('%H:%M:%S')}.000] [{level}] [LoadTest] appended entry {seq}\n")
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+
+
+async def worker(client: StdioClient, mix: dict, rng: random.Random, deadline: float,
+                 latencies: dict, errors: dict) -> None:
+    """持续按比例发送工具调用，直到截止时间"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        tool, arguments = OPERATIONS[rng.choices(names, weights)[0]](rng)
+        started = time.perf_counter()
+        response = await client.request('tools/call', {'name': tool, 'arguments': arguments})
+        elapsed = (time.perf_counter() - started) * 1000
+        result = response.get('result') or {}
+        text = ''.join(item.get('text', '') for item in result.get('content', []))
+        if 'error' in response or result.get('isError') or text.startswith('❌'):
+            errors[tool] = errors.get(tool, 0) + 1
+        latencies.setdefault(tool, []).append(elapsed)
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+
+async def run(args, config_path: str) -> dict:
+    """启动服务进程，预热后运行负载"""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, LAUNCHER, config_path,
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        limit=16 * 1024 * 1024
+    )
+    client = StdioClient(process)
+    stop_appending = threading.Event()
+    try:
+        await client.request('initialize', {
+            'protocolVersion': '2025-06-18',
+            'capabilities': {},
+            'clientInfo': {'name': 'bench-load', 'version': '1.0'}
+        })
+        client.notify('notifications/initialized')
+        await client.request('tools/list', {})
+        
+        if args.append_rate:
+            response = await client.request('tools/call', {'name': 'get_log_file_path', 'arguments': {}})
+            text = response['result']['content'][0]['text']
+            log_path = next(line for line in text.splitlines() if os.path.isabs(line))
+            threading.Thread(target=appender, args=(log_path, args.append_rate, stop_appending),
+                             daemon=True).start()
+        
+        mix = parse_mix(args.mix)
+        rng = random.Random(args.seed)
+        if args.warmup > 0:
+            deadline = time.perf_counter() + args.warmup
+            await asyncio.gather(*(worker(client, mix, random.Random(rng.random()), deadline, {}, {})
+                                   for _ in range(args.concurrency)))
+        
+        latencies, errors = {}, {}
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(worker(client, mix, random.Random(rng.random()), deadline, latencies, errors)
+                               for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        stop_appending.set()
+        await client.close()
+    
+    tools = {}
+    for tool, values in sorted(latencies.items()):
+        tools[tool] = {
+            'calls': len(values),
+            'errors': errors.get(tool, 0),
+            'throughput': len(values) / elapsed,
+            'p50_ms': statistics.median(values),
+            'p95_ms': percentile(values, 0.95),
+            'p99_ms': percentile(values, 0.99),
+            'max_ms': max(values),
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        'concurrency': args.concurrency,
+        'duration_s': elapsed,
+        'calls': total,
+        'errors': sum(errors.values()),
+        'throughput': total / elapsed,
+        'tools': tools,
+    }
+
+
+def print_results(args, results: dict) -> None:
+    print(f"并发 {results['concurrency']}，时长 {results['duration_s']:.1f}s，"
+          f"共 {results['calls']:,} 次调用（失败 {results['errors']}），吞吐量 {results['throughput']:.1f} 次/秒")
+    if args.append_rate:
+        print(f"测试期间每秒追加 {args.append_rate} 条日志")
+    print(f"{'工具':<26} {'调用':>7} {'失败':>5} {'次/秒':>8} {'p50(ms)':>9} {'p95(ms)':>9} "
+          f"{'p99(ms)':>9} {'最大(ms)':>9}")
+    print('─' * 92)
+    for tool, r in results['tools'].items():
+        print(f"{tool:<26} {r['calls']:>7} {r['errors']:>5} {r['throughput']:>8.1f} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并发负载基准测试')
+    parser.add_argument('--config', help='配置文件路径（不指定时用合成日志创建临时仓库）')
+    parser.add_argument('--size', default='10M', help='合成日志大小（未指定 --config 时使用）')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发工作者数量')
+    parser.add_argument('--duration', type=float, default=10.0, help='测量时长（秒）')
+    parser.add_argument('--warmup', type=float, default=2.0, help='预热时长（秒，不计入结果）')
+    parser.add_argument('--mix', nargs='+', default=DEFAULT_MIX,
+                        help=f"负载比例，如 summary=4 errors=3（可用: {', '.join(OPERATIONS)}）")
+    parser.add_argument('--append-rate', type=int, default=0, help='测试期间每秒追加的日志条数（0 表示不追加）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    args = parser.parse_args()
+    
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    work_dir = None
+    if args.config:
+        config_path = os.path.abspath(args.config)
+    else:
+        work_dir = tempfile.mkdtemp(prefix='bench-load-')
+        config_path = prepare_config(work_dir, parse_size(args.size), args.seed)
+    try:
+        results = asyncio.run(run(args, config_path))
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_results(args, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+监听后端事件处理开销基准测试
+
+在子进程中以指定速率追加写入日志文件（模拟插件 FileManager.appendFileSync），
+同时向同目录的备份文件和 .tmp 文件写入干扰数据，统计各后端在本进程中消耗的 CPU 时间
+和触发的通知次数。写入在子进程中进行，因此本进程的 CPU 时间只包含事件处理开销。
+
+用法:
+    python benchmarks/bench_monitor_backends.py
+    python benchmarks/bench_monitor_backends.py --rate 5000 --noise-rate 5000 --duration 5
+    python benchmarks/bench_monitor_backends.py --backends inotify watchdog
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from monitor_backends import (  # noqa: E402
+    create_backend, inotify_available, watchdog_available,
+    BACKEND_INOTIFY, BACKEND_WATCHDOG, BACKEND_POLLING
+)
+
+LINE = '[10:30:45.123] [LOG] benchmark message with some payload 0123456789\n'
+
+
+def writer(log_path: str, duration: float, rate: int, noise_rate: int) -> None:
+    """按速率写入目标文件和干扰文件（子进程）"""
+    log_dir = os.path.dirname(log_path)
+    noise_paths = [
+        os.path.join(log_dir, 'obsidian-debug-backup-20250101-000000.log'),
+        log_path + '.tmp',
+    ]
+    tick = 0.005
+    end = time.monotonic() + duration
+    next_tick = time.monotonic()
+    target_budget = noise_budget = 0.0
+    
+    while time.monotonic() < end:
+        target_budget += rate * tick
+        noise_budget += noise_rate * tick
+        while target_budget >= 1:
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(LINE)
+            target_budget -= 1
+        i = 0
+        while noise_budget >= 1:
+            with open(noise_paths[i % len(noise_paths)], 'a', encoding='utf-8') as f:
+                f.write(LINE)
+            noise_budget -= 1
+            i += 1
+        next_tick += tick
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run_backend(name: str, duration: float, rate: int, noise_rate: int) -> dict:
+    """测试单个后端"""
+    temp_dir = tempfile.mkdtemp(prefix='bench-monitor-')
+    log_path = os.path.join(temp_dir, 'obsidian-debug.log')
+    open(log_path, 'w').close()
+    
+    notifications = [0]
+    
+    def notify():
+        notifications[0] += 1
+    
+    options = {'min_interval_ms': 100, 'max_interval_ms': 2000} if name == BACKEND_POLLING else {}
+    backend = create_backend(name, log_path, notify, **options)
+    backend.start()
+    
+    process = multiprocessing.Process(target=writer, args=(log_path, duration, rate, noise_rate))
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    process.start()
+    process.join()
+    # 留出时间处理积压的事件
+    time.sleep(0.3)
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+    wall_s = time.perf_counter() - wall_start
+    
+    backend.stop()
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    writes = int(rate * duration)
+    result = {
+        'backend': name,
+        'writes': writes,
+        'notifications': notifications[0],
+        'cpu_ms': cpu_ms,
+        'cpu_us_per_write': cpu_ms * 1000 / writes if writes else 0,
+        'cpu_percent': cpu_ms / 10 / wall_s,
+    }
+    if name == BACKEND_INOTIFY:
+        result['raw_events'] = backend.events
+        result['batches'] = backend.batches
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='监听后端事件处理开销基准测试')
+    parser.add_argument('--duration', type=float, default=3.0, help='每个后端的写入时长（秒）')
+    parser.add_argument('--rate', type=int, default=2000, help='目标日志文件每秒追加次数')
+    parser.add_argument('--noise-rate', type=int, default=2000, help='同目录其他文件每秒写入次数')
+    parser.add_argument('--backends', nargs='+',
+                        default=[BACKEND_INOTIFY, BACKEND_WATCHDOG, BACKEND_POLLING])
+    args = parser.parse_args()
+    
+    print(f"写入速率: {args.rate}/s（干扰 {args.noise_rate}/s），时长 {args.duration}s")
+    print(f"{'后端':<10} {'通知次数':>10} {'原始事件':>10} {'CPU(ms)':>10} {'µs/写入':>10} {'CPU%':>7}")
+    print('─' * 62)
+    
+    for name in args.backends:
+        if name == BACKEND_INOTIFY and not inotify_available():
+            print(f"{name:<10} 跳过（当前平台不支持 inotify）")
+            continue
+        if name == BACKEND_WATCHDOG and not watchdog_available():
+            print(f"{name:<10} 跳过（watchdog 未安装）")
+            continue
+        r = run_backend(name, args.duration, args.rate, args.noise_rate)
+        raw = r.get('raw_events', '-')
+        print(f"{r['backend']:<10} {r['notifications']:>10} {raw:>10} {r['cpu_ms']:>10.1f} "
+              f"{r['cpu_us_per_write']:>10.2f} {r['cpu_percent']:>6.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+服务启动时间基准测试
+
+以 stdio 方式启动服务进程（与 Cursor 相同），测量从进程启动到收到各个响应的时间：
+- initialize：握手响应
+- tools/list：工具列表响应（客户端可以开始调用工具的时刻）
+- 首次工具调用：get_log_summary 的响应（包括等待后台启动的文件监听）
+
+消息直接按行写入 JSON-RPC，不使用 MCP 客户端，避免把客户端的导入时间计入。
+转发器模式（--connect）下第一次运行会启动守护进程，之后的运行测量的是连接已运行的守护进程。
+
+用法:
+    python benchmarks/bench_startup.py /path/to/config.json
+    python benchmarks/bench_startup.py /path/to/config.json --runs 20
+    python benchmarks/bench_startup.py /path/to/config.json --modes standalone connect
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# 启动方式：命令行入口（启动器）和直接运行服务端脚本
+ENTRIES = {
+    'launcher': os.path.join(SRC_DIR, 'launcher.py'),
+    'script': os.path.join(SRC_DIR, 'mcp_obsidian_logger.py'),
+}
+
+MODES = {
+    'standalone': [],
+    'connect': ['--connect'],
+}
+
+
+def _request(request_id: int, method: str, params: dict) -> bytes:
+    message = {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+    return json.dumps(message).encode('utf-8') + b'\n'
+
+
+def _read_response(process: subprocess.Popen, request_id: int) -> dict:
+    """读取指定 id 的响应（跳过通知）"""
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError(f"服务进程提前退出（返回码 {process.poll()}）")
+        message = json.loads(line)
+        if message.get('id') == request_id:
+            return message
+
+
+def run_once(entry: str, config_path: str, extra_args: list) -> dict:
+    """启动一次服务进程并测量各阶段耗时（毫秒）"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, entry, config_path] + extra_args,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        process.stdin.write(_request(1, 'initialize', {
+            'protocolVersion': '2025-06-18',
+            'capabilities': {},
+            'clientInfo': {'name': 'bench-startup', 'version': '1.0'}
+        }))
+        process.stdin.flush()
+        _read_response(process, 1)
+        initialize_ms = (time.perf_counter() - started) * 1000
+        
+        notification = {'jsonrpc': '2.0', 'method': 'notifications/initialized'}
+        process.stdin.write(json.dumps(notification).encode('utf-8') + b'\n')
+        process.stdin.write(_request(2, 'tools/list', {}))
+        process.stdin.flush()
+        _read_response(process, 2)
+        tools_ms = (time.perf_counter() - started) * 1000
+        
+        process.stdin.write(_request(3, 'tools/call', {'name': 'get_log_summary', 'arguments': {}}))
+        process.stdin.flush()
+        _read_response(process, 3)
+        first_call_ms = (time.perf_counter() - started) * 1000
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    
+    return {'initialize': initialize_ms, 'tools/list': tools_ms, 'first_call': first_call_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='服务启动时间基准测试')
+    parser.add_argument('config', help='配置文件路径')
+    parser.add_argument('--runs', type=int, default=10, help='每种方式的运行次数')
+    parser.add_argument('--entries', nargs='+', default=['launcher'], choices=sorted(ENTRIES))
+    parser.add_argument('--modes', nargs='+', default=['standalone'], choices=sorted(MODES))
+    args = parser.parse_args()
+    
+    config_path = os.path.abspath(args.config)
+    print(f"配置: {config_path}，每种方式运行 {args.runs} 次（中位数 / 最小值，毫秒）")
+    print(f"{'方式':<22} {'initialize':>18} {'tools/list':>18} {'首次调用':>18}")
+    print('─' * 80)
+    
+    for entry in args.entries:
+        for mode in args.modes:
+            runs = [run_once(ENTRIES[entry], config_path, MODES[mode]) for _ in range(args.runs)]
+            
+            def cell(key):
+                values = [run[key] for run in runs]
+                return f"{statistics.median(values):8.1f} / {min(values):7.1f}"
+            
+            print(f"{entry + ' ' + mode:<22} {cell('initialize'):>18} {cell('tools/list'):>18} "
+                  f"{cell('first_call'):>18}")
+
+
+if __name__ == '__main__':
+    main()
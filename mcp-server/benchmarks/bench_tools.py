@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+工具性能基准测试
+
+用合成日志（log_generator）在不同大小下测量每个工具的延迟、吞吐量和峰值内存：
+- 通过内存中的 MCP 客户端会话调用工具，经过完整的 call_tool 路径（不含 stdio 传输）
+- 首次调用单独记录（可能包含建立索引等一次性开销）
+- 冷调用：每次调用前使报告缓存失效；热调用：紧接着再调用一次（报告类工具命中缓存）
+- 吞吐量：日志大小 / 冷调用延迟中位数（只对扫描整个日志的报告类工具计算）
+- 峰值内存：单独一轮调用，用 tracemalloc 记录每次调用期间的 Python 分配峰值
+- wait_for_log 测量的是从追加匹配行到工具返回的时间
+
+结果可以保存为基线（--save-baseline），之后与基线比较（--baseline），
+任一指标超过基线的 --tolerance 倍（且差值大于噪声下限）时报告回归并以非零状态退出。
+
+用法:
+    python benchmarks/bench_tools.py
+    python benchmarks/bench_tools.py --sizes 1M 100M 1G --runs 5
+    python benchmarks/bench_tools.py --save-baseline benchmarks/baseline-tools.json
+    python benchmarks/bench_tools.py --baseline benchmarks/baseline-tools.json --tolerance 1.5
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import mcp_obsidian_logger as server  # noqa: E402
+from mcp.shared.memory import create_connected_server_and_client_session  # noqa: E402
+
+from log_generator import ensure_log, parse_size, format_size  # noqa: E402
+
+# 每个工具的调用参数（按顺序调用；clear_logs 会清空日志，放在最后）
+TOOL_CALLS = [
+    ("read_logs", {"lines": 50}),
+    ("get_log_summary", {}),
+    ("get_recent_errors", {"limit": 10}),
+    ("analyze_errors", {}),
+    ("get_reload_statistics", {}),
+    ("get_log_file_path", {}),
+    ("get_auto_reload_status", {}),
+    ("get_auto_reload_mode", {}),
+    ("set_auto_reload_mode", {"mode": "smart"}),
+    ("manage_watched_plugins", {"action": "get"}),
+    ("trigger_plugin_reload", {"plugin_id": "my-plugin"}),
+    ("wait_for_log", {"pattern": "bench-marker", "timeout_seconds": 10}),
+    ("clear_logs", {"backup": True}),
+]
+
+# 扫描整个日志的工具（吞吐量只对它们有意义）
+SCAN_TOOLS = {"get_log_summary", "get_recent_errors", "analyze_errors", "get_reload_statistics"}
+
+# 比较基线时的噪声下限（毫秒 / KB），低于该差值的变化不算回归
+NOISE_FLOOR_MS = 2.0
+NOISE_FLOOR_KB = 256
+
+PLUGIN_DATA = {
+    "logger": {"bufferSize": 100, "flushInterval": 500},
+    "autoReload": {"mode": "smart", "watchedPlugins": ["my-plugin"], "checkInterval": 1000},
+}
+
+
+def prepare_vault(work_dir: str, source_log: str) -> str:
+    """创建临时仓库和配置，复制一份日志供工具修改
+    
+    Returns:
+        配置文件路径
+    """
+    vault_path = os.path.join(work_dir, 'vault')
+    plugin_dir = os.path.join(vault_path, '.obsidian', 'plugins', 'obsidian-logger')
+    os.makedirs(plugin_dir, exist_ok=True)
+    with open(os.path.join(plugin_dir, 'data.json'), 'w', encoding='utf-8') as f:
+        json.dump(PLUGIN_DATA, f)
+    
+    log_path = os.path.join(work_dir, 'logs', 'obsidian-debug.log')
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    shutil.copyfile(source_log, log_path)
+    
+    config = {
+        "vault_path": vault_path,
+        "log_file_path": log_path,
+        "index": {"dir": os.path.join(work_dir, 'index')},
+        # 后台预热和重算会干扰冷调用的测量
+        "prewarm": {"enabled": False},
+        "refresh": {"enabled": False},
+    }
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    return config_path
+
+
+async def call_once(session, name: str, arguments: dict) -> float:
+    """调用一次工具，返回延迟（毫秒）"""
+    if name == "wait_for_log":
+        call = asyncio.ensure_future(session.call_tool(name, arguments))
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        with open(server.log_manager.log_file_path, 'a', encoding='utf-8') as f:
+            f.write(f"[00:00:00.000] [LOG] bench-marker {started}\n")
+        await call
+        return (time.perf_counter() - started) * 1000
+    
+    started = time.perf_counter()
+    result = await session.call_tool(name, arguments)
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.isError:
+        raise RuntimeError(f"{name} 调用失败: {result.content[0].text}")
+    return elapsed
+
+
+async def bench_size(config_path: str, runs: int, memory: bool, tools) -> dict:
+    """对一份日志测量所有工具"""
+    if not server.initialize_components(config_path):
+        raise RuntimeError("初始化组件失败")
+    results = {}
+    try:
+        async with create_connected_server_and_client_session(server.app) as session:
+            listed = {tool.name for tool in (await session.list_tools()).tools}
+            missing = listed - {name for name, _ in TOOL_CALLS}
+            if missing:
+                print(f"⚠️ 以下工具没有基准测试参数: {', '.join(sorted(missing))}")
+            
+            for name, arguments in TOOL_CALLS:
+                if tools and name not in tools:
+                    continue
+                # 首次调用单独记录（可能包含建立索引等一次性开销）
+                server.cache.invalidate()
+                first = await call_once(session, name, arguments)
+                cold, warm = [], []
+                for _ in range(0 if name == "clear_logs" else runs):
+                    server.cache.invalidate()
+                    cold.append(await call_once(session, name, arguments))
+                    if name != "wait_for_log":
+                        warm.append(await call_once(session, name, arguments))
+                
+                entry = {
+                    'first_ms': first,
+                    'cold_ms': statistics.median(cold) if cold else first,
+                    'warm_ms': statistics.median(warm) if warm else None,
+                }
+                if memory and name != "clear_logs":
+                    server.cache.invalidate()
+                    tracemalloc.start()
+                    tracemalloc.reset_peak()
+                    await call_once(session, name, arguments)
+                    entry['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+                    tracemalloc.stop()
+                results[name] = entry
+    finally:
+        server.vaults.stop()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """与基线比较，返回回归列表"""
+    regressions = []
+    for size, tools in results.items():
+        for name, entry in tools.items():
+            base = baseline.get(size, {}).get(name)
+            if not base:
+                continue
+            for metric, floor in (('cold_ms', NOISE_FLOOR_MS), ('warm_ms', NOISE_FLOOR_MS),
+                                  ('peak_kb', NOISE_FLOOR_KB)):
+                current, previous = entry.get(metric), base.get(metric)
+                if current is None or not previous:
+                    continue
+                if current > previous * tolerance and current - previous > floor:
+                    regressions.append(f"{size} {name} {metric}: {previous:.1f} → {current:.1f} "
+                                       f"({current / previous:.2f}x)")
+    return regressions
+
+
+def print_results(size: int, tools: dict) -> None:
+    print(f"\n日志大小 {format_size(size)}（{size:,} 字节）")
+    print(f"{'工具':<26} {'首次(ms)':>10} {'冷(ms)':>10} {'热(ms)':>10} {'吞吐(MB/s)':>12} {'峰值(KB)':>10}")
+    print('─' * 84)
+    for name, entry in tools.items():
+        if name in SCAN_TOOLS and entry['cold_ms']:
+            throughput = f"{size / 1024 / 1024 / (entry['cold_ms'] / 1000):12.1f}"
+        else:
+            throughput = f"{'-':>12}"
+        warm = f"{entry['warm_ms']:10.2f}" if entry['warm_ms'] is not None else f"{'-':>10}"
+        peak = f"{entry['peak_kb']:10.0f}" if 'peak_kb' in entry else f"{'-':>10}"
+        print(f"{name:<26} {entry['first_ms']:10.2f} {entry['cold_ms']:10.2f} {warm} {throughput} {peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='工具性能基准测试')
+    parser.add_argument('--sizes', nargs='+', default=['1M', '10M'], help='日志大小（如 1M 100M 1G）')
+    parser.add_argument('--seed', type=int, default=0, help='日志生成的随机种子')
+    parser.add_argument('--runs', type=int, default=5, help='每个工具的调用次数')
+    parser.add_argument('--tools', nargs='+', help='只测量指定的工具')
+    parser.add_argument('--no-memory', action='store_true', help='不测量峰值内存')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'obsidian-logger-bench'),
+                        help='生成的日志的缓存目录')
+    parser.add_argument('--baseline', help='与该基线文件比较')
+    parser.add_argument('--save-baseline', help='把结果保存为基线文件')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='超过基线的倍数视为回归')
+    args = parser.parse_args()
+    
+    # 服务端日志输出到 stderr 会干扰结果表格
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    all_results = {}
+    for size_text in args.sizes:
+        size = parse_size(size_text)
+        source_log = ensure_log(args.data_dir, size, args.seed)
+        work_dir = tempfile.mkdtemp(prefix='bench-tools-')
+        try:
+            config_path = prepare_vault(work_dir, source_log)
+            tools = asyncio.run(bench_size(config_path, args.runs, not args.no_memory, args.tools))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        all_results[format_size(size)] = tools
+        print_results(size, tools)
+    
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                         'seed': args.seed, 'runs': args.runs},
+                'results': all_results
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存: {args.save_baseline}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(all_results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ 发现 {len(regressions)} 项回归（超过基线 {args.tolerance} 倍）：")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\n✅ 未发现回归（容差 {args.tolerance} 倍）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+合成日志生成器
+
+按插件 LogCollector 的格式（[HH:MM:SS.mmm] [LEVEL] message）生成确定性的测试日志：
+相同的大小和种子总是生成相同的内容。日志包含：
+- 接近真实的级别分布（LOG 为主，少量 WARN / ERROR / DEBUG）和多个来源前缀
+- 错误后的堆栈续行（不带时间戳，console.error(err) 序列化 err.stack 的结果）
+- Auto-Reload 的文件变化和重载完成记录（get_reload_statistics 统计的行）
+- 跨越午夜的时间回绕（时间只有时分秒，越过 23:59:59.999 后从 00:00 重新开始）
+
+用法:
+    python benchmarks/log_generator.py /tmp/synthetic.log --size 100M
+    python benchmarks/log_generator.py /tmp/synthetic.log --size 1G --seed 7
+"""
+
+import os
+import re
+import random
+import argparse
+
+# 级别分布（权重）
+LEVEL_WEIGHTS = (('LOG', 70), ('DEBUG', 15), ('WARN', 10), ('ERROR', 5))
+
+SOURCES = ('', '[Plugin:dataview] ', '[Plugin:my-plugin] ', '[Config Monitor] ', '[Global Logger] ')
+
+PLUGINS = ('my-plugin', 'dataview', 'templater-obsidian', 'obsidian-git', 'calendar')
+
+LOG_MESSAGES = (
+    'Rendering view {n} in {ms}ms',
+    'Indexed {n} files',
+    'Metadata cache resolved for note-{n}.md',
+    'Sync finished: {n} changes',
+    '{{"event":"layout-change","leaf":{n},"active":true}}',
+)
+
+WARN_MESSAGES = (
+    'Slow operation: {ms}ms for note-{n}.md',
+    'Deprecated API used by plugin {plugin}',
+    'Retrying request {n}',
+)
+
+ERROR_MESSAGES = (
+    "TypeError: Cannot read properties of undefined (reading 'file')",
+    'ReferenceError: app is not defined',
+    'Uncaught (in promise) Error: null value in note-{n}.md',
+    'Failed to fetch: network error ({n})',
+    'EACCES: permission denied, open note-{n}.md',
+    "ENOENT: no such file or directory, open 'note-{n}.md'",
+    'Error: unexpected state {n}',
+)
+
+DEBUG_MESSAGES = (
+    'cache hit ratio {n}%',
+    'event queue length {n}',
+    'timer {n} fired after {ms}ms',
+)
+
+# 每行平均推进的时间（毫秒），用于安排第一次午夜回绕的位置
+MEAN_STEP_MS = 40
+MS_PER_DAY = 24 * 3600 * 1000
+
+_SIZE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)\s*([KMG]?)B?$', re.IGNORECASE)
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """解析大小（如 512K、100M、1G）
+    
+    Args:
+        text: 大小文本
+    
+    Returns:
+        字节数
+    
+    Raises:
+        ValueError: 无法解析
+    """
+    match = _SIZE_PATTERN.match(text.strip())
+    if not match:
+        raise ValueError(f"无法解析大小: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def format_size(size: int) -> str:
+    """格式化大小（parse_size 的逆操作，用于文件名和报告）"""
+    for unit in ('G', 'M', 'K'):
+        if size >= _SIZE_UNITS[unit] and size % _SIZE_UNITS[unit] == 0:
+            return f"{size // _SIZE_UNITS[unit]}{unit}"
+    return str(size)
+
+
+def _timestamp(ms: int) -> str:
+    ms %= MS_PER_DAY
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+def generate_lines(size: int, seed: int = 0):
+    """逐条生成日志条目（一条可能包含多行，如错误和它的堆栈）
+    
+    Args:
+        size: 目标大小（字节），用于安排午夜回绕的位置
+        seed: 随机种子
+    
+    Yields:
+        以换行结尾的日志条目
+    """
+    rng = random.Random(seed)
+    levels = [level for level, _ in LEVEL_WEIGHTS]
+    weights = [weight for _, weight in LEVEL_WEIGHTS]
+    # 第一次午夜回绕大约出现在前三分之一处（按平均行长 100 字节估算）
+    now = MS_PER_DAY - max(size // 100 // 3, 1) * MEAN_STEP_MS % MS_PER_DAY
+    request = 0
+    
+    while True:
+        now += rng.randint(0, MEAN_STEP_MS * 2)
+        n = rng.randint(1, 9999)
+        
+        if rng.random() < 0.005:
+            # Auto-Reload：检测到文件变化，随后重载完成
+            plugin = rng.choice(PLUGINS)
+            request += 1
+            yield f"[{_timestamp(now)}] [LOG] [Auto-Reload] 🔄 检测到文件变化: {plugin} (main.js)\n"
+            now += rng.randint(50, 400)
+            yield (f"[{_timestamp(now)}] [LOG] [Auto-Reload] ✅ 插件已重载: {plugin} "
+                   f"(用时: {rng.randint(80, 900)}ms, 请求: req-{request})\n")
+            continue
+        
+        level = rng.choices(levels, weights)[0]
+        source = rng.choice(SOURCES)
+        templates = {'LOG': LOG_MESSAGES, 'WARN': WARN_MESSAGES,
+                     'ERROR': ERROR_MESSAGES, 'DEBUG': DEBUG_MESSAGES}[level]
+        message = rng.choice(templates).format(n=n, ms=rng.randint(1, 2000), plugin=rng.choice(PLUGINS))
+        entry = f"[{_timestamp(now)}] [{level}] {source}{message}\n"
+        
+        if level == 'ERROR' and rng.random() < 0.6:
+            # 堆栈续行
+            plugin = rng.choice(PLUGINS)
+            for depth in range(rng.randint(2, 6)):
+                entry += f"    at fn{depth} (plugin:{plugin}:{rng.randint(1, 5000)}:{rng.randint(1, 80)})\n"
+        yield entry
+
+
+def generate_log(path: str, size: int, seed: int = 0) -> int:
+    """生成日志文件（在条目边界截止，实际大小不超过目标大小）
+    
+    Args:
+        path: 输出路径
+        size: 目标大小（字节）
+        seed: 随机种子
+    
+    Returns:
+        实际写入的字节数
+    """
+    written = 0
+    batch = []
+    batch_bytes = 0
+    with open(path, 'wb') as f:
+        for entry in generate_lines(size, seed):
+            data = entry.encode('utf-8')
+            if written + batch_bytes + len(data) > size:
+                break
+            batch.append(data)
+            batch_bytes += len(data)
+            if batch_bytes >= 1024 * 1024:
+                f.write(b''.join(batch))
+                written += batch_bytes
+                batch = []
+                batch_bytes = 0
+        f.write(b''.join(batch))
+        written += batch_bytes
+    return written
+
+
+def ensure_log(directory: str, size: int, seed: int = 0) -> str:
+    """在目录中生成（或复用已生成的）指定大小和种子的日志
+    
+    Args:
+        directory: 缓存目录
+        size: 目标大小（字节）
+        seed: 随机种子
+    
+    Returns:
+        日志文件路径
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"synthetic-{format_size(size)}-{seed}.log")
+    if not os.path.exists(path):
+        temp_path = path + '.tmp'
+        generate_log(temp_path, size, seed)
+        os.replace(temp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合成日志生成器')
+    parser.add_argument('output', help='输出文件路径')
+    parser.add_argument('--size', default='1M', help='目标大小（如 1M、100M、1G）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+    
+    written = generate_log(args.output, parse_size(args.size), args.seed)
+    print(f"已生成 {args.output}（{written:,} 字节）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+日志写入模拟器：端到端新鲜度和吞吐量测试
+
+在子进程中按插件的行为写日志（不需要运行 Obsidian）：
+- LogCollector：按速率产生日志条目放入缓冲区，缓冲区满（bufferSize）或定时（flushInterval）时刷新
+- FileManager：刷新时先检查大小，超过 maxFileSize 时把日志重命名为 -<时间戳>.log（轮转），
+  再以 logs.join('\\n') + '\\n' 追加写入；清空时先复制为 -backup-<时间戳>.log，再截断原文件
+
+每个条目带递增序号（sim-seq=N），子进程把每次刷新、轮转和清空的时刻报告给本进程。
+本进程通过内存中的 MCP 客户端会话（完整的 call_tool / 资源路径）同时观察日志：
+- cursor：循环调用 read_logs 传回 cursor 增量读取
+- resource：订阅 obsidian-log://debug，收到 resources/updated 通知后带 cursor 读取资源
+- wait_for_log：循环调用 wait_for_log 等待下一条模拟条目（抽样）
+并周期性调用报告类工具，让缓存随写入不断失效和重算。
+
+报告每种观察方式从追加写入到在结果中可见的延迟（p50/p95/p99/最大值），
+以及丢失（写入后始终未被读到）和重复（被读到多次）的条目数；
+清空前尚未读到的条目会被截断，单独统计，不算丢失。
+
+注意：插件的轮转文件名只精确到秒，同一秒内轮转两次时后一次会覆盖前一次的备份，
+模拟器如实保留这一行为（--max-file-size 过小时会在 cursor 读取中看到丢失）。
+
+用法:
+    python benchmarks/writer_simulator.py
+    python benchmarks/writer_simulator.py --rate 2000 --flush-interval 500 --buffer-size 100 --duration 10
+    python benchmarks/writer_simulator.py --max-file-size 0.5 --clear-every 4
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import mcp_obsidian_logger as server  # noqa: E402
+from mcp import types  # noqa: E402
+from mcp.shared.memory import create_connected_server_and_client_session  # noqa: E402
+
+from log_resources import DEBUG_URI  # noqa: E402
+
+SEQ_PATTERN = re.compile(r'sim-seq=(\d+)\b')
+CURSOR_PATTERN = re.compile(r'🔖 cursor: ([A-Za-z0-9_-]+)')
+
+LEVEL_WEIGHTS = (('LOG', 80), ('DEBUG', 10), ('WARN', 7), ('ERROR', 3))
+
+# 观察方式
+OBSERVERS = ('cursor', 'resource', 'wait_for_log')
+
+
+def _timestamp() -> str:
+    """LogCollector.getTimestamp：本地时间 HH:MM:SS.mmm"""
+    now = datetime.now()
+    return now.strftime('%H:%M:%S.') + f"{now.microsecond // 1000:03d}"
+
+
+def _file_timestamp() -> str:
+    """FileManager 的备份文件时间戳：toISOString 替换 : 和 . 后取前 19 个字符（精确到秒）"""
+    iso = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+    return iso.replace(':', '-').replace('.', '-')[:19]
+
+
+class FileManager:
+    """插件 FileManager 的写入、轮转和清空行为"""
+    
+    def __init__(self, log_path: str, max_file_size_mb: float, events):
+        self.log_path = log_path
+        self.max_file_size_mb = max_file_size_mb
+        self.events = events
+        self.last_seq = 0
+    
+    def write_logs(self, logs: list, last_seq: int) -> None:
+        self.check_rotation()
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(logs) + '\n')
+        self.last_seq = last_seq
+        self.events.put(('flush', last_seq, time.time()))
+    
+    def check_rotation(self) -> None:
+        if not os.path.exists(self.log_path):
+            return
+        if os.path.getsize(self.log_path) / (1024 * 1024) > self.max_file_size_mb:
+            backup_path = self.log_path.replace('.log', f'-{_file_timestamp()}.log')
+            os.replace(self.log_path, backup_path)
+            self.events.put(('rotate', self.last_seq, time.time()))
+    
+    def clear_logs(self) -> None:
+        if os.path.exists(self.log_path):
+            backup_path = self.log_path.replace('.log', f'-backup-{_file_timestamp()}.log')
+            shutil.copyfile(self.log_path, backup_path)
+            with open(self.log_path, 'w', encoding='utf-8'):
+                pass
+            self.events.put(('clear', self.last_seq, time.time()))
+
+
+def writer(log_path: str, options: dict, events) -> None:
+    """按速率产生条目并按 LogCollector 的规则刷新（子进程）"""
+    rng = random.Random(options['seed'])
+    levels = [level for level, _ in LEVEL_WEIGHTS]
+    weights = [weight for _, weight in LEVEL_WEIGHTS]
+    manager = FileManager(log_path, options['max_file_size'], events)
+    buffer_size = options['buffer_size']
+    flush_interval = options['flush_interval'] / 1000
+    clear_every = options['clear_every']
+    
+    buffer = []
+    seq = 0
+    tick = 0.005
+    budget = 0.0
+    start = time.monotonic()
+    end = start + options['duration']
+    next_tick = next_flush = start
+    next_clear = start + clear_every if clear_every else None
+    
+    while True:
+        now = time.monotonic()
+        if now >= end:
+            break
+        budget += options['rate'] * tick
+        while budget >= 1:
+            seq += 1
+            level = rng.choices(levels, weights)[0]
+            buffer.append(f"[{_timestamp()}] [{level}] [Simulator] sim-seq={seq} payload {rng.randint(0, 10 ** 9)}")
+            budget -= 1
+            if len(buffer) >= buffer_size:
+                manager.write_logs(buffer, seq)
+                buffer = []
+        if now >= next_flush:
+            # setInterval 定时刷新
+            if buffer:
+                manager.write_logs(buffer, seq)
+                buffer = []
+            next_flush += flush_interval
+        if next_clear is not None and now >= next_clear:
+            manager.clear_logs()
+            next_clear += clear_every
+        next_tick += tick
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    
+    # cleanup：最后刷新一次
+    if buffer:
+        manager.write_logs(buffer, seq)
+    events.put(('done', seq, time.time()))
+
+
+class Observation:
+    """一种观察方式看到的条目"""
+    
+    def __init__(self):
+        self.seen = {}          # 序号 -> 第一次看到的时刻
+        self.duplicates = 0
+        self.calls = 0
+        self.errors = 0
+    
+    def record(self, text: str) -> int:
+        now = time.time()
+        count = 0
+        for match in SEQ_PATTERN.finditer(text):
+            seq = int(match.group(1))
+            if seq in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen[seq] = now
+            count += 1
+        return count
+
+
+async def observe_cursor(session, observation: Observation, stop: asyncio.Event, poll: float) -> None:
+    """循环调用 read_logs 传回 cursor"""
+    result = await session.call_tool("read_logs", {"lines": 1})
+    cursor = CURSOR_PATTERN.search(result.content[0].text).group(1)
+    while True:
+        result = await session.call_tool("read_logs", {"cursor": cursor, "lines": 500})
+        observation.calls += 1
+        text = result.content[0].text
+        match = CURSOR_PATTERN.search(text)
+        if result.isError or match is None:
+            observation.errors += 1
+        else:
+            cursor = match.group(1)
+        observation.record(text)
+        if '新增内容超过每页上限' in text:
+            # 超过每页上限，立即读取下一页
+            continue
+        if stop.is_set():
+            return
+        await asyncio.sleep(poll)
+
+
+async def observe_resource(session, observation: Observation, stop: asyncio.Event,
+                           updated: asyncio.Event) -> None:
+    """订阅资源，收到更新通知后带 cursor 读取"""
+    result = await session.read_resource(DEBUG_URI)
+    cursor = result.contents[0].meta['cursor']
+    await session.subscribe_resource(DEBUG_URI)
+    while True:
+        if not stop.is_set():
+            try:
+                await asyncio.wait_for(updated.wait(), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            updated.clear()
+        result = await session.read_resource(f"{DEBUG_URI}?cursor={cursor}")
+        observation.calls += 1
+        contents = result.contents[0]
+        observation.record(contents.text)
+        if contents.meta.get('cursor'):
+            cursor = contents.meta['cursor']
+        if contents.meta.get('more'):
+            updated.set()
+        elif stop.is_set():
+            return
+
+
+async def observe_wait(session, observation: Observation, stop: asyncio.Event) -> None:
+    """循环调用 wait_for_log 等待下一条模拟条目"""
+    while not stop.is_set():
+        result = await session.call_tool("wait_for_log", {"pattern": r"sim-seq=\d+", "timeout_seconds": 2})
+        observation.calls += 1
+        if observation.record(result.content[0].text) == 0:
+            observation.errors += 1
+
+
+async def exercise_reports(session, latencies: dict, stop: asyncio.Event, interval: float) -> None:
+    """周期性调用报告类工具（缓存随写入失效和重算）"""
+    calls = (("get_log_summary", {}), ("get_recent_errors", {"limit": 10}), ("analyze_errors", {}))
+    while not stop.is_set():
+        for name, arguments in calls:
+            started = time.perf_counter()
+            await session.call_tool(name, arguments)
+            latencies.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+
+
+def collect_events(events) -> tuple:
+    """读取子进程报告的刷新、轮转和清空事件
+    
+    Returns:
+        (每个序号的追加时刻, 每次清空时已写入的最大序号列表, 轮转次数, 写入条目总数)
+    """
+    flushed = {}
+    clears = []
+    rotations = 0
+    total = 0
+    previous = 0
+    while True:
+        kind, seq, at = events.get()
+        if kind == 'flush':
+            for n in range(previous + 1, seq + 1):
+                flushed[n] = at
+            previous = seq
+        elif kind == 'rotate':
+            rotations += 1
+        elif kind == 'clear':
+            clears.append(seq)
+        elif kind == 'done':
+            total = seq
+            break
+    return flushed, clears, rotations, total
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+
+def analyze(name: str, observation: Observation, flushed: dict, clears: list) -> dict:
+    """计算一种观察方式的延迟、丢失和重复"""
+    latencies = [(at - flushed[seq]) * 1000 for seq, at in observation.seen.items() if seq in flushed]
+    missing = [seq for seq in flushed if seq not in observation.seen]
+    result = {
+        'observer': name,
+        'seen': len(observation.seen),
+        'calls': observation.calls,
+        'errors': observation.errors,
+        'duplicates': observation.duplicates,
+    }
+    if name == 'wait_for_log':
+        # 抽样观察，不统计丢失
+        result['dropped'] = result['cleared'] = None
+    else:
+        # 清空前写入、且在该次清空之前没有读到的条目被截断，单独统计
+        cleared = [seq for seq in missing if any(seq <= bound for bound in clears)]
+        result['cleared'] = len(cleared)
+        result['dropped'] = len(missing) - len(cleared)
+    if latencies:
+        result.update({
+            'p50_ms': statistics.median(latencies),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': max(latencies),
+        })
+    return result
+
+
+async def run(args, work_dir: str) -> dict:
+    """启动服务组件和写入子进程，观察到写入结束后再等待 --drain 秒"""
+    log_path = os.path.join(work_dir, 'logs', 'obsidian-debug.log')
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'w', encoding='utf-8') as f:
+        f.write(f"[{_timestamp()}] [LOG] [Simulator] start\n")
+    
+    config = {
+        "vault_path": os.path.join(work_dir, 'vault'),
+        "log_file_path": log_path,
+        "index": {"dir": os.path.join(work_dir, 'index')},
+    }
+    if args.notify_interval_ms is not None:
+        config["resources"] = {"min_notify_interval_ms": args.notify_interval_ms}
+    os.makedirs(config["vault_path"], exist_ok=True)
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    if not server.initialize_components(config_path):
+        raise RuntimeError("初始化组件失败")
+    
+    updated = asyncio.Event()
+    
+    async def message_handler(message) -> None:
+        if isinstance(message, types.ServerNotification) and \
+                isinstance(message.root, types.ResourceUpdatedNotification):
+            updated.set()
+    
+    observations = {name: Observation() for name in OBSERVERS}
+    report_latencies = {}
+    stop = asyncio.Event()
+    context = multiprocessing.get_context('spawn')
+    events = context.Queue()
+    options = {
+        'rate': args.rate, 'buffer_size': args.buffer_size, 'flush_interval': args.flush_interval,
+        'max_file_size': args.max_file_size, 'clear_every': args.clear_every,
+        'duration': args.duration, 'seed': args.seed,
+    }
+    
+    try:
+        async with create_connected_server_and_client_session(server.app, message_handler=message_handler) \
+                as session:
+            await session.call_tool("get_log_file_path", {})   # 等待组件启动完成
+            tasks = [
+                asyncio.create_task(observe_cursor(session, observations['cursor'], stop, args.poll_ms / 1000)),
+                asyncio.create_task(observe_resource(session, observations['resource'], stop, updated)),
+                asyncio.create_task(observe_wait(session, observations['wait_for_log'], stop)),
+                asyncio.create_task(exercise_reports(session, report_latencies, stop, args.report_interval)),
+            ]
+            await asyncio.sleep(0.2)
+            
+            process = context.Process(target=writer, args=(log_path, options, events))
+            process.start()
+            loop = asyncio.get_running_loop()
+            flushed, clears, rotations, total = await loop.run_in_executor(None, collect_events, events)
+            await loop.run_in_executor(None, process.join)
+            await asyncio.sleep(args.drain)
+            stop.set()
+            updated.set()
+            await asyncio.gather(*tasks)
+    finally:
+        server.vaults.stop()
+    
+    return {
+        'written': total,
+        'rotations': rotations,
+        'clears': len(clears),
+        'observers': [analyze(name, observations[name], flushed, clears) for name in OBSERVERS],
+        'reports': {name: statistics.median(values) for name, values in report_latencies.items()},
+    }
+
+
+def print_results(args, results: dict) -> None:
+    print(f"写入 {results['written']:,} 条（{args.rate}/s，bufferSize {args.buffer_size}，"
+          f"flushInterval {args.flush_interval}ms，时长 {args.duration}s），"
+          f"轮转 {results['rotations']} 次，清空 {results['clears']} 次")
+    print(f"{'观察方式':<14} {'看到':>8} {'调用':>7} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9} "
+          f"{'最大(ms)':>9} {'丢失':>6} {'清空截断':>8} {'重复':>6}")
+    print('─' * 104)
+    for r in results['observers']:
+        latency = ''.join(f"{r[key]:9.1f} " if key in r else f"{'-':>9} "
+                          for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms'))
+        dropped = '-' if r['dropped'] is None else r['dropped']
+        cleared = '-' if r['cleared'] is None else r['cleared']
+        print(f"{r['observer']:<14} {r['seen']:>8} {r['calls']:>7} {latency}"
+              f"{dropped:>6} {cleared:>8} {r['duplicates']:>6}")
+    if results['reports']:
+        print("\n报告类工具延迟中位数（写入期间）: " +
+              '，'.join(f"{name} {ms:.1f}ms" for name, ms in results['reports'].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志写入模拟器：端到端新鲜度和吞吐量测试')
+    parser.add_argument('--rate', type=int, default=1000, help='每秒产生的日志条目数')
+    parser.add_argument('--buffer-size', type=int, default=100, help='LogCollector bufferSize')
+    parser.add_argument('--flush-interval', type=int, default=500, help='LogCollector flushInterval（毫秒）')
+    parser.add_argument('--max-file-size', type=float, default=10, help='FileManager maxFileSize（MB）')
+    parser.add_argument('--clear-every', type=float, default=0, help='每隔多少秒清空一次日志（0 表示不清空）')
+    parser.add_argument('--duration', type=float, default=5.0, help='写入时长（秒）')
+    parser.add_argument('--drain', type=float, default=2.0, help='写入结束后继续观察的时间（秒）')
+    parser.add_argument('--poll-ms', type=int, default=100, help='read_logs 游标轮询间隔（毫秒）')
+    parser.add_argument('--report-interval', type=float, default=0.5, help='报告类工具的调用间隔（秒）')
+    parser.add_argument('--notify-interval-ms', type=int, help='资源通知最小间隔（默认使用服务端配置）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    args = parser.parse_args()
+    
+    # 服务端日志输出到 stderr 会干扰结果表格
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    work_dir = tempfile.mkdtemp(prefix='writer-sim-')
+    try:
+        results = asyncio.run(run(args, work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_results(args, results)
+    dropped = sum(r['dropped'] or 0 for r in results['observers'])
+    duplicates = sum(r['duplicates'] for r in results['observers'])
+    sys.exit(1 if dropped or duplicates else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -34,7 +34,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "obsidian-logger-mcp=mcp_obsidian_logger:main",
+            "obsidian-logger-mcp=launcher:main",
         ],
     },
 )
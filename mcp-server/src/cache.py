@@ -2,15 +2,71 @@
 缓存系统模块
 
 提供多层缓存机制，提升性能
+
+线程模型：文件监听线程负责失效和写入环形缓冲区，事件循环线程负责读取和写入报告缓存。
+所有可读状态都保存在不可变快照中，写入方在锁内复制、修改后整体替换（copy-on-write），
+读取方只做一次属性读取，永远不会阻塞。报告缓存的快照带有代数（generation），
+每次失效代数加一，基于旧代数计算出的结果会被丢弃，不会覆盖新的状态。
 """
 
 import time
 import logging
+import threading
 from collections import deque
-from typing import Optional, Dict, Any, List
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Tuple, Mapping, Hashable
+
+from tail_reader import LineSpan
 
 logger = logging.getLogger(__name__)
 
+# 报告缓存的类型
+KIND_SUMMARY = 'summary'
+KIND_ERRORS = 'errors'
+KIND_ANALYSIS = 'analysis'
+
+_EMPTY: Mapping = MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """报告缓存条目"""
+    value: str
+    created_at: float
+
+
+@dataclass(frozen=True)
+class CacheSnapshot:
+    """报告缓存快照（不可变）
+    
+    entries 的键为 (类型, 参数)，例如 ('errors', 10)、('analysis', 24)
+    """
+    generation: int
+    entries: Mapping[Tuple[str, Hashable], CacheEntry] = field(default_factory=lambda: _EMPTY)
+
+
+@dataclass(frozen=True)
+class TailSnapshot:
+    """环形缓冲区快照（不可变）"""
+    state: Optional[Tuple[int, int, int]] = None  # (inode, size, mtime_ns)，None 表示与文件不同步
+    complete: bool = False                        # 是否包含文件的全部行
+    entries: Tuple[str, ...] = ()
+    level_entries: Mapping[str, Tuple[str, ...]] = field(default_factory=lambda: _EMPTY)
+    # 与 entries / level_entries 一一对应的行位置，None 表示未知
+    spans: Tuple[Optional[LineSpan], ...] = ()
+    level_spans: Mapping[str, Tuple[Optional[LineSpan], ...]] = field(default_factory=lambda: _EMPTY)
+    head: Optional[bytes] = None                  # 文件开头（生成游标用），None 表示未知
+
+
+@dataclass(frozen=True)
+class TailPage:
+    """环形缓冲区中的一页末尾日志"""
+    lines: List[str]
+    spans: List[Optional[LineSpan]]  # 每行在文件中的 (起始偏移量, 字节数)，None 表示未知
+    head: Optional[bytes]            # 文件开头，None 表示未知
+    exhausted: bool                  # 缓冲区覆盖整个文件且行数不足，前面没有更多日志
+
 
 class LogCache:
     """日志缓存系统
@@ -18,6 +74,9 @@ class LogCache:
     提供日志条目缓存、统计缓存和自动失效机制
     """
     
+    # 环形缓冲区按级别拆分的子环
+    LEVELS = ('LOG', 'ERROR', 'WARN', 'DEBUG')
+    
     def __init__(self, max_size: int = 1000, cache_ttl: int = 300):
         """初始化缓存系统
         
@@ -28,22 +87,28 @@ class LogCache:
         self.max_size = max_size
         self.cache_ttl = cache_ttl
         
-        # 日志条目缓存（环形缓冲区）
+        # 日志条目缓存（环形缓冲区），由文件监听器写入最新追加的行；
+        # deque 只在写锁内修改，读取方使用发布出去的 TailSnapshot
         self.log_entries: deque = deque(maxlen=max_size)
+        self.level_entries: Dict[str, deque] = {
+            level: deque(maxlen=max_size) for level in self.LEVELS
+        }
+        # 各行在文件中的位置（与上面的环一一对应），用于不读文件生成翻页游标
+        self.log_spans: deque = deque(maxlen=max_size)
+        self.level_spans: Dict[str, deque] = {
+            level: deque(maxlen=max_size) for level in self.LEVELS
+        }
+        self._tail_head: Optional[bytes] = None
+        self._tail_complete: bool = False
+        self._tail: TailSnapshot = TailSnapshot()
+        # add_log_entry 逐行写入时不立即发布快照，由下一次读取发布
+        self._tail_dirty: bool = False
+        self._tail_lock = threading.Lock()
         
-        # 统计数据缓存
-        self.summary_cache: Optional[str] = None
-        self.summary_cache_time: float = 0
-        
-        # 错误列表缓存
-        self.errors_cache: Optional[str] = None
-        self.errors_cache_time: float = 0
-        self.errors_cache_limit: int = 0
-        
-        # 错误分析缓存
-        self.analysis_cache: Optional[str] = None
-        self.analysis_cache_time: float = 0
-        self.analysis_cache_hours: int = 0
+        # 报告缓存（统计摘要、错误列表、错误分析）
+        self._snapshot: CacheSnapshot = CacheSnapshot(generation=0)
+        self._write_lock = threading.Lock()
+        self.dropped_stale_writes: int = 0
         
         # 文件元数据缓存
         self.file_metadata: Dict[str, Any] = {
@@ -54,13 +119,177 @@ class LogCache:
         
         logger.info(f"缓存系统已初始化 (max_size={max_size}, ttl={cache_ttl}s)")
     
+    # ------------------------------------------------------------------
+    # 环形缓冲区
+    # ------------------------------------------------------------------
+    
+    @property
+    def tail_complete(self) -> bool:
+        """环形缓冲区是否包含文件的全部行"""
+        return self._current_tail().complete
+    
+    @property
+    def tail_state(self) -> Optional[Tuple[int, int, int]]:
+        """环形缓冲区对应的文件状态，None 表示与文件不同步"""
+        return self._current_tail().state
+    
+    def _current_tail(self) -> TailSnapshot:
+        """当前的环形缓冲区快照（add_log_entry 之后的第一次读取负责发布，其余情况不加锁）"""
+        if self._tail_dirty:
+            with self._tail_lock:
+                if self._tail_dirty:
+                    self._publish_tail(self._tail.state)
+        return self._tail
+    
     def add_log_entry(self, entry: str) -> None:
         """添加日志条目到缓存
         
+        逐行写入只修改环，快照延迟到下一次读取时发布，避免每行复制整个缓冲区
+        
         Args:
             entry: 日志条目
         """
+        with self._tail_lock:
+            self._append_entry(entry)
+            self._tail_dirty = True
+    
+    def _append_entry(self, entry: str, span: Optional[LineSpan] = None) -> None:
+        """写入总环和对应级别的子环（调用方需持有锁）"""
+        if len(self.log_entries) == self.max_size:
+            # 最旧的行被挤出，缓冲区不再覆盖整个文件
+            self._tail_complete = False
         self.log_entries.append(entry)
+        self.log_spans.append(span)
+        for level in self.LEVELS:
+            if f'[{level}]' in entry:
+                self.level_entries[level].append(entry)
+                self.level_spans[level].append(span)
+    
+    def _append_entries(self, entries: List[str], spans: Optional[List[Optional[LineSpan]]]) -> None:
+        """批量写入，spans 为 None 或长度不一致时位置记为未知（调用方需持有锁）"""
+        if spans is None or len(spans) != len(entries):
+            spans = [None] * len(entries)
+        for entry, span in zip(entries, spans):
+            self._append_entry(entry, span)
+    
+    def _publish_tail(self, state: Optional[Tuple[int, int, int]]) -> None:
+        """发布新的环形缓冲区快照（调用方需持有锁）"""
+        self._tail_dirty = False
+        self._tail = TailSnapshot(
+            state=state,
+            complete=self._tail_complete,
+            entries=tuple(self.log_entries),
+            level_entries=MappingProxyType({
+                level: tuple(ring) for level, ring in self.level_entries.items()
+            }),
+            spans=tuple(self.log_spans),
+            level_spans=MappingProxyType({
+                level: tuple(ring) for level, ring in self.level_spans.items()
+            }),
+            head=self._tail_head
+        )
+    
+    def reset_tail(self, entries: List[str], complete: bool,
+                   state: Optional[Tuple[int, int, int]],
+                   spans: Optional[List[Optional[LineSpan]]] = None,
+                   head: Optional[bytes] = None) -> None:
+        """用文件末尾的行重建环形缓冲区
+        
+        Args:
+            entries: 文件末尾的日志行
+            complete: 这些行是否就是文件的全部内容
+            state: 对应的文件状态，None 表示缓冲区暂不可用
+            spans: 各行在文件中的位置，None 表示未知
+            head: 文件开头的字节（生成游标用），None 表示未知
+        """
+        with self._tail_lock:
+            self.log_entries.clear()
+            self.log_spans.clear()
+            for level in self.LEVELS:
+                self.level_entries[level].clear()
+                self.level_spans[level].clear()
+            self._append_entries(entries, spans)
+            self._tail_complete = complete
+            self._tail_head = head
+            self._publish_tail(state)
+        logger.debug(f"环形缓冲区已重建 ({len(entries)} 行, complete={complete})")
+    
+    def extend_tail(self, entries: List[str], state: Optional[Tuple[int, int, int]],
+                    spans: Optional[List[Optional[LineSpan]]] = None,
+                    head: Optional[bytes] = None) -> None:
+        """追加新写入的行
+        
+        Args:
+            entries: 新增的日志行
+            state: 追加后的文件状态，None 表示缓冲区暂不可用
+            spans: 各行在文件中的位置，None 表示未知
+            head: 文件开头的字节（生成游标用），None 表示未知
+        """
+        with self._tail_lock:
+            self._append_entries(entries, spans)
+            self._tail_head = head
+            self._publish_tail(state)
+    
+    def invalidate_tail(self) -> None:
+        """标记环形缓冲区与文件不同步，读取将回退到磁盘"""
+        with self._tail_lock:
+            if self._tail_dirty:
+                self._publish_tail(self._tail.state)
+            self._tail = replace(self._tail, state=None)
+    
+    def get_tail(self, count: int, level: str = 'all',
+                 state: Optional[Tuple[int, int, int]] = None) -> Optional[List[str]]:
+        """从环形缓冲区获取最近的日志行（不加锁）
+        
+        Args:
+            count: 需要的行数
+            level: 日志级别过滤（all/log/error/warn/debug）
+            state: 当前的文件状态，与缓冲区记录不一致时视为未命中
+        
+        Returns:
+            日志行列表；缓冲区无法给出与磁盘读取一致的结果时返回 None
+        """
+        page = self.get_tail_page(count, level, state)
+        return page.lines if page is not None else None
+    
+    def get_tail_page(self, count: int, level: str = 'all',
+                      state: Optional[Tuple[int, int, int]] = None) -> Optional[TailPage]:
+        """从环形缓冲区获取最近的日志行及其在文件中的位置（不加锁）
+        
+        Args:
+            count: 需要的行数
+            level: 日志级别过滤（all/log/error/warn/debug）
+            state: 当前的文件状态，与缓冲区记录不一致时视为未命中
+        
+        Returns:
+            末尾日志页；缓冲区无法给出与磁盘读取一致的结果时返回 None
+        """
+        if not isinstance(count, int) or count <= 0 or count > self.max_size:
+            return None
+        
+        tail = self._current_tail()
+        if tail.state is None or tail.state != state:
+            return None
+        
+        if level.lower() == 'all':
+            ring, spans = tail.entries, tail.spans
+        else:
+            ring = tail.level_entries.get(level.upper())
+            spans = tail.level_spans.get(level.upper())
+            if ring is None:
+                return None
+        
+        if len(ring) < count and not tail.complete:
+            # 更早的行已被挤出缓冲区
+            return None
+        
+        logger.debug(f"命中环形缓冲区 (lines={count}, level={level})")
+        return TailPage(
+            lines=list(ring[-count:]),
+            spans=list(spans[-count:]),
+            head=tail.head,
+            exhausted=len(ring) < count
+        )
     
     def get_log_entries(self, count: Optional[int] = None) -> List[str]:
         """获取缓存的日志条目
@@ -71,38 +300,135 @@ class LogCache:
         Returns:
             日志条目列表
         """
+        entries = list(self._current_tail().entries)
         if count is None:
-            return list(self.log_entries)
+            return entries
         else:
-            return list(self.log_entries)[-count:] if len(self.log_entries) > count else list(self.log_entries)
+            return entries[-count:] if len(entries) > count else entries
     
-    def get_cached_summary(self) -> Optional[str]:
-        """获取缓存的统计摘要（如果未过期）
+    # ------------------------------------------------------------------
+    # 报告缓存
+    # ------------------------------------------------------------------
+    
+    @property
+    def generation(self) -> int:
+        """当前缓存代数，计算结果前读取，写入时传回以丢弃过期结果"""
+        return self._snapshot.generation
+    
+    def snapshot(self) -> CacheSnapshot:
+        """获取当前报告缓存快照"""
+        return self._snapshot
+    
+    def get(self, kind: str, key: Hashable = None) -> Optional[str]:
+        """读取报告缓存（不加锁）
+        
+        Args:
+            kind: 缓存类型（summary/errors/analysis）
+            key: 参数（如 limit、hours）
         
         Returns:
-            缓存的摘要，如果过期或不存在则返回 None
+            缓存内容，过期或不存在则返回 None
         """
-        if self.summary_cache is None:
+        entry = self._snapshot.entries.get((kind, key))
+        if entry is None:
             return None
         
-        # 检查是否过期
-        if time.time() - self.summary_cache_time > self.cache_ttl:
-            logger.debug("统计摘要缓存已过期")
-            self.summary_cache = None
+        # 检查是否过期（过期条目留在快照里，下次写入或失效时被替换）
+        if time.time() - entry.created_at > self.cache_ttl:
+            logger.debug(f"{kind} 缓存已过期 (key={key})")
             return None
         
-        logger.debug("命中统计摘要缓存")
-        return self.summary_cache
+        logger.debug(f"命中 {kind} 缓存 (key={key})")
+        return entry.value
+    
+    def put(self, kind: str, key: Hashable, value: str,
+            generation: Optional[int] = None) -> bool:
+        """写入报告缓存（copy-on-write）
+        
+        Args:
+            kind: 缓存类型（summary/errors/analysis）
+            key: 参数（如 limit、hours）
+            value: 缓存内容
+            generation: 计算开始时读取的代数，None 表示不校验
+        
+        Returns:
+            是否写入；代数已变化（期间发生过失效）时丢弃并返回 False
+        """
+        with self._write_lock:
+            snapshot = self._snapshot
+            if generation is not None and generation != snapshot.generation:
+                self.dropped_stale_writes += 1
+                logger.debug(f"丢弃过期的 {kind} 结果 (generation {generation} != {snapshot.generation})")
+                return False
+            
+            now = time.time()
+            entries = {
+                k: e for k, e in snapshot.entries.items()
+                if now - e.created_at <= self.cache_ttl
+            }
+            entries[(kind, key)] = CacheEntry(value, now)
+            self._snapshot = CacheSnapshot(snapshot.generation, MappingProxyType(entries))
+        
+        logger.debug(f"已更新 {kind} 缓存 (key={key})")
+        return True
+    
+    def _invalidate_kinds(self, kinds: Optional[Tuple[str, ...]]) -> None:
+        """发布新一代快照，移除指定类型（None 表示全部）的条目"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            if kinds is None:
+                entries = _EMPTY
+            else:
+                entries = MappingProxyType({
+                    k: e for k, e in snapshot.entries.items() if k[0] not in kinds
+                })
+            self._snapshot = CacheSnapshot(snapshot.generation + 1, entries)
+    
+    def _latest(self, kind: str) -> Optional[CacheEntry]:
+        """获取指定类型最近写入的条目"""
+        latest = None
+        for (k, _), entry in self._snapshot.entries.items():
+            if k == kind and (latest is None or entry.created_at >= latest.created_at):
+                latest = entry
+        return latest
+    
+    @property
+    def summary_cache(self) -> Optional[str]:
+        """当前缓存的统计摘要"""
+        entry = self._latest(KIND_SUMMARY)
+        return entry.value if entry else None
+    
+    @property
+    def errors_cache(self) -> Optional[str]:
+        """最近缓存的错误列表"""
+        entry = self._latest(KIND_ERRORS)
+        return entry.value if entry else None
     
-    def set_summary_cache(self, summary: str) -> None:
+    @property
+    def analysis_cache(self) -> Optional[str]:
+        """最近缓存的错误分析"""
+        entry = self._latest(KIND_ANALYSIS)
+        return entry.value if entry else None
+    
+    def get_cached_summary(self) -> Optional[str]:
+        """获取缓存的统计摘要（如果未过期）
+        
+        Returns:
+            缓存的摘要，如果过期或不存在则返回 None
+        """
+        return self.get(KIND_SUMMARY)
+    
+    def set_summary_cache(self, summary: str, generation: Optional[int] = None) -> bool:
         """设置统计摘要缓存
         
         Args:
             summary: 统计摘要
+            generation: 计算开始时的缓存代数
+        
+        Returns:
+            是否写入
         """
-        self.summary_cache = summary
-        self.summary_cache_time = time.time()
-        logger.debug("已更新统计摘要缓存")
+        return self.put(KIND_SUMMARY, None, summary, generation)
     
     def get_cached_errors(self, limit: int) -> Optional[str]:
         """获取缓存的错误列表（如果未过期且参数匹配）
@@ -113,29 +439,20 @@ class LogCache:
         Returns:
             缓存的错误列表，如果过期或参数不匹配则返回 None
         """
-        if self.errors_cache is None or self.errors_cache_limit != limit:
-            return None
-        
-        # 检查是否过期
-        if time.time() - self.errors_cache_time > self.cache_ttl:
-            logger.debug("错误列表缓存已过期")
-            self.errors_cache = None
-            return None
-        
-        logger.debug(f"命中错误列表缓存 (limit={limit})")
-        return self.errors_cache
+        return self.get(KIND_ERRORS, limit)
     
-    def set_errors_cache(self, errors: str, limit: int) -> None:
+    def set_errors_cache(self, errors: str, limit: int, generation: Optional[int] = None) -> bool:
         """设置错误列表缓存
         
         Args:
             errors: 错误列表
             limit: 错误数量限制
+            generation: 计算开始时的缓存代数
+        
+        Returns:
+            是否写入
         """
-        self.errors_cache = errors
-        self.errors_cache_time = time.time()
-        self.errors_cache_limit = limit
-        logger.debug(f"已更新错误列表缓存 (limit={limit})")
+        return self.put(KIND_ERRORS, limit, errors, generation)
     
     def get_cached_analysis(self, hours: int) -> Optional[str]:
         """获取缓存的错误分析（如果未过期且参数匹配）
@@ -146,29 +463,20 @@ class LogCache:
         Returns:
             缓存的分析结果，如果过期或参数不匹配则返回 None
         """
-        if self.analysis_cache is None or self.analysis_cache_hours != hours:
-            return None
-        
-        # 检查是否过期
-        if time.time() - self.analysis_cache_time > self.cache_ttl:
-            logger.debug("错误分析缓存已过期")
-            self.analysis_cache = None
-            return None
-        
-        logger.debug(f"命中错误分析缓存 (hours={hours})")
-        return self.analysis_cache
+        return self.get(KIND_ANALYSIS, hours)
     
-    def set_analysis_cache(self, analysis: str, hours: int) -> None:
+    def set_analysis_cache(self, analysis: str, hours: int, generation: Optional[int] = None) -> bool:
         """设置错误分析缓存
         
         Args:
             analysis: 分析结果
             hours: 分析时间范围（小时）
+            generation: 计算开始时的缓存代数
+        
+        Returns:
+            是否写入
         """
-        self.analysis_cache = analysis
-        self.analysis_cache_time = time.time()
-        self.analysis_cache_hours = hours
-        logger.debug(f"已更新错误分析缓存 (hours={hours})")
+        return self.put(KIND_ANALYSIS, hours, analysis, generation)
     
     def update_file_metadata(self, size: int, mtime: float, lines: int) -> None:
         """更新文件元数据缓存
@@ -195,24 +503,22 @@ class LogCache:
     
     def invalidate(self) -> None:
         """使所有缓存失效"""
-        self.summary_cache = None
-        self.errors_cache = None
-        self.analysis_cache = None
+        self._invalidate_kinds(None)
         logger.info("所有缓存已失效")
     
     def invalidate_summary(self) -> None:
         """使统计摘要缓存失效"""
-        self.summary_cache = None
+        self._invalidate_kinds((KIND_SUMMARY,))
         logger.debug("统计摘要缓存已失效")
     
     def invalidate_errors(self) -> None:
         """使错误列表缓存失效"""
-        self.errors_cache = None
+        self._invalidate_kinds((KIND_ERRORS,))
         logger.debug("错误列表缓存已失效")
     
     def invalidate_analysis(self) -> None:
         """使错误分析缓存失效"""
-        self.analysis_cache = None
+        self._invalidate_kinds((KIND_ANALYSIS,))
         logger.debug("错误分析缓存已失效")
     
     def get_cache_stats(self) -> Dict[str, Any]:
@@ -222,22 +528,33 @@ class LogCache:
             缓存统计字典
         """
         current_time = time.time()
+        snapshot = self._snapshot
+        tail = self._current_tail()
+        
+        def age(kind: str) -> float:
+            entry = self._latest(kind)
+            return current_time - entry.created_at if entry else 0
         
         return {
-            'log_entries_count': len(self.log_entries),
+            'log_entries_count': len(tail.entries),
             'log_entries_max': self.max_size,
+            'tail_synced': tail.state is not None,
+            'tail_complete': tail.complete,
+            'generation': snapshot.generation,
+            'cached_entries': len(snapshot.entries),
+            'dropped_stale_writes': self.dropped_stale_writes,
             'summary_cached': self.summary_cache is not None,
-            'summary_age': current_time - self.summary_cache_time if self.summary_cache else 0,
+            'summary_age': age(KIND_SUMMARY),
             'errors_cached': self.errors_cache is not None,
-            'errors_age': current_time - self.errors_cache_time if self.errors_cache else 0,
+            'errors_age': age(KIND_ERRORS),
             'analysis_cached': self.analysis_cache is not None,
-            'analysis_age': current_time - self.analysis_cache_time if self.analysis_cache else 0,
+            'analysis_age': age(KIND_ANALYSIS),
             'cache_ttl': self.cache_ttl
         }
     
     def clear(self) -> None:
         """清空所有缓存"""
-        self.log_entries.clear()
+        self.reset_tail([], False, None)
         self.invalidate()
         self.file_metadata = {
             'size': 0,
@@ -245,4 +562,3 @@ class LogCache:
             'lines': 0
         }
         logger.info("缓存已清空")
-
@@ -5,13 +5,46 @@
 """
 
 import os
+import copy
 import json
+import time
+import random
+import uuid
+import hashlib
 import logging
-from typing import Dict, Optional, Any
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows 不支持 fcntl，建议锁不可用
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+# 插件重载请求队列（data.json 中的字段，由插件处理后移除）
+RELOAD_QUEUE_KEY = '_reloadQueue'
+
+# 未配置 vaults 列表时唯一仓库的名称
+DEFAULT_VAULT_NAME = 'default'
+
+# 插件配置缓存条目：((inode, 大小, mtime_ns), 内容哈希, 配置字典)
+PluginConfigState = Tuple[Tuple[int, int, int], bytes, Dict[str, Any]]
+
+
+def content_digest(raw: bytes) -> bytes:
+    """计算配置文件内容的哈希，用于检测并发修改
+    
+    Args:
+        raw: 文件内容
+    
+    Returns:
+        哈希值
+    """
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
 
 class ConfigManager:
     """配置管理器
@@ -19,15 +52,25 @@ class ConfigManager:
     管理 MCP Server 配置和 Obsidian Logger 插件配置的读写
     """
     
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, vault_name: Optional[str] = None):
         """初始化配置管理器
         
         Args:
             config_path: MCP Server 配置文件路径
+            vault_name: 仓库名称（配置了 vaults 列表时），None 表示默认仓库
         """
         self.config_path = config_path
         self.config = self._load_config()
         
+        # 多仓库：选中的仓库条目覆盖顶层配置（其余顶层配置由所有仓库共享）
+        vaults = self.vault_entries(self.config)
+        self.vault_name = vault_name or self.default_vault_name(self.config)
+        if self.vault_name not in vaults:
+            raise ValueError(f"未知的仓库: {self.vault_name}")
+        base = {key: value for key, value in self.config.items() if key not in ('vaults', 'default_vault')}
+        self.config = {**base, **vaults[self.vault_name]}
+        self.vault_names = list(vaults)
+        
         # 获取 vault 路径
         self.vault_path = self.config.get('vault_path', '')
         if not self.vault_path:
@@ -39,10 +82,66 @@ class ConfigManager:
             '.obsidian/plugins/obsidian-logger/data.json'
         )
         
+        # 插件配置缓存（按文件状态校验）
+        self._plugin_config_cache: Optional[PluginConfigState] = None
+        self._plugin_config_lock = threading.Lock()
+        self._replace_lock = threading.Lock()
+        self.plugin_config_loads = 0
+        self.plugin_config_writes = 0
+        self.plugin_config_conflicts = 0
+        
+        # 读-改-写的并发控制：乐观比较交换，可选 fcntl 建议锁（仅约束遵守该锁的进程）
+        plugin_config_options = self.config.get('plugin_config', {})
+        self.max_write_retries = plugin_config_options.get('max_write_retries', 5)
+        self.advisory_lock = plugin_config_options.get('advisory_lock', False) and fcntl is not None
+        self.lock_path = self.plugin_data_path + '.lock'
+        
+        # 同一插件在该时间窗口内的重复重载请求合并为一个
+        self.reload_coalesce_ms = plugin_config_options.get('reload_coalesce_ms', 2000)
+        
         logger.info(f"配置管理器已初始化")
         logger.info(f"Vault 路径: {self.vault_path}")
         logger.info(f"插件配置路径: {self.plugin_data_path}")
     
+    @staticmethod
+    def vault_entries(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """列出配置中的仓库
+        
+        配置了 vaults 列表时每项为一个仓库（name 缺省时取仓库目录名），
+        否则顶层的 vault_path/log_file_path 组成唯一的 default 仓库
+        
+        Args:
+            config: MCP Server 配置字典
+        
+        Returns:
+            仓库名称 -> 仓库配置
+        
+        Raises:
+            ValueError: 仓库名称重复
+        """
+        if not config.get('vaults'):
+            return {DEFAULT_VAULT_NAME: {}}
+        
+        entries: Dict[str, Dict[str, Any]] = {}
+        for entry in config['vaults']:
+            name = entry.get('name') or os.path.basename(os.path.normpath(entry.get('vault_path', '')))
+            if name in entries:
+                raise ValueError(f"仓库名称重复: {name}")
+            entries[name] = {key: value for key, value in entry.items() if key != 'name'}
+        return entries
+    
+    @classmethod
+    def default_vault_name(cls, config: Dict[str, Any]) -> str:
+        """默认仓库名称（default_vault，未指定时为第一个仓库）
+        
+        Args:
+            config: MCP Server 配置字典
+        
+        Returns:
+            仓库名称
+        """
+        return config.get('default_vault') or next(iter(cls.vault_entries(config)))
+    
     def _load_config(self) -> Dict[str, Any]:
         """加载 MCP Server 配置文件
         
@@ -79,29 +178,84 @@ class ConfigManager:
         
         return log_path
     
-    def read_plugin_config(self) -> Optional[Dict[str, Any]]:
-        """读取插件配置文件
+    def _stat_plugin_config(self) -> Optional[Tuple[int, int, int]]:
+        """获取插件配置文件的状态，用于校验缓存
         
         Returns:
-            配置字典，如果文件不存在则返回 None
+            (inode, 大小, mtime_ns)，文件不存在时返回 None
         """
         try:
-            if not os.path.exists(self.plugin_data_path):
+            return self._stat_key(os.stat(self.plugin_data_path))
+        except FileNotFoundError:
+            return None
+    
+    @staticmethod
+    def _stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+        """文件状态键：(inode, 大小, mtime_ns)"""
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+    
+    def _load_plugin_state(self) -> Optional[PluginConfigState]:
+        """读取插件配置及其文件状态和内容哈希（带缓存）
+        
+        文件的 inode、大小和 mtime_ns 均未变化时直接返回缓存，否则重新解析
+        
+        Returns:
+            (文件状态, 内容哈希, 配置字典)，配置字典为共享缓存，调用方不得修改；
+            文件不存在或格式错误时返回 None
+        """
+        with self._plugin_config_lock:
+            stat_key = self._stat_plugin_config()
+            if stat_key is None:
+                self._plugin_config_cache = None
                 logger.warning(f"插件配置文件不存在: {self.plugin_data_path}")
                 return None
             
-            with open(self.plugin_data_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            cached = self._plugin_config_cache
+            if cached is not None and cached[0] == stat_key:
+                return cached
+            
+            try:
+                with open(self.plugin_data_path, 'rb') as f:
+                    stat_key = self._stat_key(os.fstat(f.fileno()))
+                    raw = f.read()
+                config = json.loads(raw.decode('utf-8'))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                logger.error(f"插件配置文件格式错误: {e}")
+                return None
+            except Exception as e:
+                logger.error(f"读取插件配置失败: {e}")
+                return None
             
-            return config
+            self.plugin_config_loads += 1
+            self._plugin_config_cache = (stat_key, content_digest(raw), config)
+            return self._plugin_config_cache
+    
+    def _load_plugin_config(self) -> Optional[Dict[str, Any]]:
+        """读取插件配置（带缓存），返回的字典为共享缓存，调用方不得修改
         
-        except json.JSONDecodeError as e:
-            logger.error(f"插件配置文件格式错误: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"读取插件配置失败: {e}")
+        Returns:
+            配置字典，如果文件不存在或格式错误则返回 None
+        """
+        state = self._load_plugin_state()
+        return state[2] if state else None
+    
+    def _current_digest(self) -> Optional[bytes]:
+        """读取磁盘上插件配置的当前内容哈希（绕过缓存）"""
+        try:
+            with open(self.plugin_data_path, 'rb') as f:
+                return content_digest(f.read())
+        except FileNotFoundError:
             return None
     
+    def read_plugin_config(self) -> Optional[Dict[str, Any]]:
+        """读取插件配置文件
+        
+        Returns:
+            配置字典（副本，可以修改），如果文件不存在则返回 None
+        """
+        config = self._load_plugin_config()
+        return copy.deepcopy(config) if config is not None else None
+    
     def write_plugin_config(self, config: Dict[str, Any]) -> bool:
         """写入插件配置文件（原子操作）
         
@@ -111,26 +265,55 @@ class ConfigManager:
         Returns:
             是否写入成功
         """
+        return self._write_plugin_config(config) is True
+    
+    def _write_plugin_config(self, config: Dict[str, Any],
+                             base_digest: Optional[bytes] = None) -> Optional[bool]:
+        """写入插件配置文件（原子操作），可选比较交换
+        
+        给出 base_digest 时，在重命名之前重新检查磁盘内容的哈希，
+        内容已被其他进程改写时放弃写入，把冲突窗口缩小到检查与重命名之间
+        
+        Args:
+            config: 要写入的配置字典
+            base_digest: 修改所基于的内容哈希，None 表示无条件写入
+        
+        Returns:
+            是否写入成功；磁盘内容已不是 base_digest 对应的版本时返回 None
+        """
+        # 临时文件名带上进程和线程标识，避免并发写入互相覆盖
+        temp_path = f"{self.plugin_data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
             # 确保目录存在
             os.makedirs(os.path.dirname(self.plugin_data_path), exist_ok=True)
             
             # 原子写入：先写临时文件，再重命名
-            temp_path = self.plugin_data_path + '.tmp'
+            raw = json.dumps(config, indent=2, ensure_ascii=False).encode('utf-8')
+            with open(temp_path, 'wb') as f:
+                f.write(raw)
+                f.flush()
+                stat_key = self._stat_key(os.fstat(f.fileno()))
             
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            # 本进程内的写入在检查和重命名之间互斥
+            with self._replace_lock:
+                if base_digest is not None and self._current_digest() != base_digest:
+                    os.remove(temp_path)
+                    return None
+                
+                # 重命名（原子操作，inode 和 mtime 保持不变）
+                os.replace(temp_path, self.plugin_data_path)
             
-            # 重命名（原子操作）
-            os.replace(temp_path, self.plugin_data_path)
+            # 写入的内容就是最新配置，直接更新缓存
+            with self._plugin_config_lock:
+                self._plugin_config_cache = (stat_key, content_digest(raw), copy.deepcopy(config))
             
+            self.plugin_config_writes += 1
             logger.info("插件配置写入成功")
             return True
         
         except Exception as e:
             logger.error(f"写入插件配置失败: {e}")
             # 清理临时文件
-            temp_path = self.plugin_data_path + '.tmp'
             if os.path.exists(temp_path):
                 try:
                     os.remove(temp_path)
@@ -138,15 +321,89 @@ class ConfigManager:
                     pass
             return False
     
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """插件配置写入的建议锁（未启用或平台不支持时为空操作）"""
+        if not self.advisory_lock:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    
+    def modify_plugin_config(self, *mutators: Callable[[Dict[str, Any]], None]) -> bool:
+        """在一次原子写入中应用多个修改（事务）
+        
+        每个 mutator 接收配置字典的副本并就地修改，全部执行完后只写入一次；
+        内容没有变化时不写入，避免插件检测到无意义的配置变化。
+        
+        写入采用乐观并发控制：写入前比较磁盘内容的哈希与修改所基于的版本，
+        期间文件被插件或其他进程改写时，重新读取并重新应用全部修改后重试，
+        因此 mutator 可能被多次调用，应只依赖传入的字典。
+        冲突后的退避和建议锁都会阻塞调用线程，异步调用方应在线程池中执行
+        
+        Args:
+            mutators: 修改函数
+        
+        Returns:
+            是否成功（没有变化也视为成功）
+        """
+        with self._write_lock():
+            for attempt in range(self.max_write_retries + 1):
+                state = self._load_plugin_state()
+                if state is None:
+                    logger.error("无法读取插件配置，更新失败")
+                    return False
+                _, base_digest, current = state
+                
+                config = copy.deepcopy(current)
+                try:
+                    for mutate in mutators:
+                        mutate(config)
+                except Exception as e:
+                    logger.error(f"修改插件配置失败: {e}")
+                    return False
+                
+                if config == current:
+                    logger.debug("插件配置无变化，跳过写入")
+                    return True
+                
+                # 比较交换：重命名之前磁盘内容仍是修改所基于的版本时才写入
+                written = self._write_plugin_config(config, base_digest)
+                if written is not None:
+                    return written
+                
+                self.plugin_config_conflicts += 1
+                logger.info(f"插件配置已被并发修改，重新读取后重试 "
+                            f"(第 {attempt + 1}/{self.max_write_retries + 1} 次尝试冲突)")
+                with self._plugin_config_lock:
+                    self._plugin_config_cache = None
+                # 退避时间随尝试次数增加，并加入随机抖动，避免并发写入方再次同时重试
+                time.sleep(0.005 * (attempt + 1) * (1 + random.random()))
+        
+        logger.error(f"插件配置并发修改冲突，{self.max_write_retries} 次重试后仍失败")
+        return False
+    
+    @staticmethod
+    def _auto_reload_section(config: Dict[str, Any]) -> Dict[str, Any]:
+        """获取（必要时创建）配置中的 autoReload 字段"""
+        if not isinstance(config.get('autoReload'), dict):
+            config['autoReload'] = {}
+        return config['autoReload']
+    
     def get_auto_reload_config(self) -> Optional[Dict[str, Any]]:
         """获取 Auto-Reload 配置
         
         Returns:
             Auto-Reload 配置字典，如果不存在则返回 None
         """
-        config = self.read_plugin_config()
+        config = self._load_plugin_config()
         if config and 'autoReload' in config:
-            return config['autoReload']
+            return copy.deepcopy(config['autoReload'])
         return None
     
     def update_auto_reload_config(self, updates: Dict[str, Any]) -> bool:
@@ -158,20 +415,64 @@ class ConfigManager:
         Returns:
             是否更新成功
         """
-        config = self.read_plugin_config()
-        if not config:
-            logger.error("无法读取插件配置，更新失败")
-            return False
+        return self.modify_plugin_config(
+            lambda config: self._auto_reload_section(config).update(updates)
+        )
+    
+    def enqueue_plugin_reloads(self, plugin_ids: List[str]) -> Optional[Dict[str, str]]:
+        """批量提交插件重载请求（一次写入）
         
-        # 确保 autoReload 字段存在
-        if 'autoReload' not in config:
-            config['autoReload'] = {}
+        请求追加到 data.json 的 ``_reloadQueue`` 队列，插件按顺序处理并在日志中记录请求 ID。
+        同一插件在 reload_coalesce_ms 内已有待处理请求时合并，返回已有请求的 ID
+        
+        Args:
+            plugin_ids: 要重载的插件 ID 列表
+        
+        Returns:
+            插件 ID 到请求 ID 的映射，写入失败时返回 None
+        """
+        request_ids: Dict[str, str] = {}
+        
+        def enqueue(config: Dict[str, Any]) -> None:
+            # 比较交换重试时会重新执行，每次都基于最新的队列重新计算
+            request_ids.clear()
+            now = int(time.time() * 1000)
+            queue = config.get(RELOAD_QUEUE_KEY)
+            if not isinstance(queue, list):
+                queue = []
+            
+            pending = {}
+            for entry in queue:
+                if now - entry.get('timestamp', 0) <= self.reload_coalesce_ms:
+                    pending[entry.get('pluginId')] = entry.get('id')
+            
+            for plugin_id in plugin_ids:
+                if plugin_id in request_ids:
+                    continue
+                if plugin_id in pending:
+                    request_ids[plugin_id] = pending[plugin_id]
+                    continue
+                request_id = uuid.uuid4().hex[:12]
+                queue.append({'id': request_id, 'pluginId': plugin_id, 'timestamp': now})
+                request_ids[plugin_id] = request_id
+            
+            config[RELOAD_QUEUE_KEY] = queue
         
-        # 更新配置
-        config['autoReload'].update(updates)
+        if not self.modify_plugin_config(enqueue):
+            return None
         
-        # 写入配置
-        return self.write_plugin_config(config)
+        logger.info(f"已添加重载请求: {request_ids}")
+        return dict(request_ids)
+    
+    def get_pending_reloads(self) -> List[Dict[str, Any]]:
+        """获取尚未被插件处理的重载请求
+        
+        Returns:
+            请求列表（id、pluginId、timestamp）
+        """
+        config = self._load_plugin_config()
+        queue = config.get(RELOAD_QUEUE_KEY) if config else None
+        return copy.deepcopy(queue) if isinstance(queue, list) else []
     
     def trigger_plugin_reload(self, plugin_id: str) -> bool:
         """触发插件重载（通过配置文件）
@@ -182,25 +483,7 @@ class ConfigManager:
         Returns:
             是否成功添加重载请求
         """
-        config = self.read_plugin_config()
-        if not config:
-            logger.error("无法读取插件配置，无法触发重载")
-            return False
-        
-        # 添加重载请求
-        import time
-        config['_reloadRequest'] = {
-            'pluginId': plugin_id,
-            'timestamp': int(time.time() * 1000)
-        }
-        
-        # 写入配置
-        result = self.write_plugin_config(config)
-        
-        if result:
-            logger.info(f"已添加重载请求: {plugin_id}")
-        
-        return result
+        return self.enqueue_plugin_reloads([plugin_id]) is not None
     
     def get_watched_plugins(self) -> list:
         """获取监控的插件列表
@@ -208,9 +491,10 @@ class ConfigManager:
         Returns:
             插件 ID 列表
         """
-        auto_reload = self.get_auto_reload_config()
+        config = self._load_plugin_config()
+        auto_reload = config.get('autoReload') if config else None
         if auto_reload and 'watchedPlugins' in auto_reload:
-            return auto_reload['watchedPlugins']
+            return list(auto_reload['watchedPlugins'])
         return []
     
     def set_watched_plugins(self, plugins: list) -> bool:
@@ -223,9 +507,44 @@ class ConfigManager:
             是否设置成功
         """
         return self.update_auto_reload_config({
-            'watchedPlugins': plugins
+            'watchedPlugins': list(plugins)
         })
     
+    def add_watched_plugins(self, plugin_ids: List[str]) -> bool:
+        """批量添加监控的插件（一次写入）
+        
+        Args:
+            plugin_ids: 插件 ID 列表
+        
+        Returns:
+            是否添加成功
+        """
+        def add(config: Dict[str, Any]) -> None:
+            watched = self._auto_reload_section(config).setdefault('watchedPlugins', [])
+            for plugin_id in plugin_ids:
+                if plugin_id not in watched:
+                    watched.append(plugin_id)
+        
+        return self.modify_plugin_config(add)
+    
+    def remove_watched_plugins(self, plugin_ids: List[str]) -> bool:
+        """批量移除监控的插件（一次写入）
+        
+        Args:
+            plugin_ids: 插件 ID 列表
+        
+        Returns:
+            是否移除成功
+        """
+        def remove(config: Dict[str, Any]) -> None:
+            auto_reload = self._auto_reload_section(config)
+            if 'watchedPlugins' in auto_reload:
+                auto_reload['watchedPlugins'] = [
+                    p for p in auto_reload['watchedPlugins'] if p not in plugin_ids
+                ]
+        
+        return self.modify_plugin_config(remove)
+    
     def add_watched_plugin(self, plugin_id: str) -> bool:
         """添加监控的插件
         
@@ -235,11 +554,7 @@ class ConfigManager:
         Returns:
             是否添加成功
         """
-        plugins = self.get_watched_plugins()
-        if plugin_id not in plugins:
-            plugins.append(plugin_id)
-            return self.set_watched_plugins(plugins)
-        return True
+        return self.add_watched_plugins([plugin_id])
     
     def remove_watched_plugin(self, plugin_id: str) -> bool:
         """移除监控的插件
@@ -250,11 +565,7 @@ class ConfigManager:
         Returns:
             是否移除成功
         """
-        plugins = self.get_watched_plugins()
-        if plugin_id in plugins:
-            plugins.remove(plugin_id)
-            return self.set_watched_plugins(plugins)
-        return True
+        return self.remove_watched_plugins([plugin_id])
     
     def get_auto_reload_mode(self) -> str:
         """获取 Auto-Reload 模式
@@ -262,7 +573,8 @@ class ConfigManager:
         Returns:
             模式名称（auto/smart/manual）
         """
-        auto_reload = self.get_auto_reload_config()
+        config = self._load_plugin_config()
+        auto_reload = config.get('autoReload') if config else None
         if auto_reload and 'mode' in auto_reload:
             return auto_reload['mode']
         return 'smart'  # 默认模式
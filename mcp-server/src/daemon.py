@@ -0,0 +1,471 @@
+"""
+守护进程模块
+
+一个长期运行的进程负责一个仓库（vault）的文件监听、缓存和索引，通过本地套接字同时服务多个 MCP 客户端；
+每个 Cursor 窗口启动的 stdio 进程只是一个轻量转发器（shim），把 stdin/stdout 原样转发到守护进程，
+守护进程未运行时由转发器自动启动
+
+- POSIX：Unix 套接字 ~/.obsidian-logger/run/<id>.sock，权限 0600
+- Windows：回环 TCP（127.0.0.1，端口和随机令牌写入 ~/.obsidian-logger/run/<id>.port，权限 0600），
+  本机其他用户也能连接回环端口，因此客户端连接后必须先发送一行令牌，不匹配的连接直接关闭
+
+<id> 由日志文件路径和仓库路径计算，同一仓库的所有客户端连接到同一个守护进程。
+消息按行分隔的 JSON-RPC（与 stdio 传输相同），转发器不需要解析消息
+"""
+
+import os
+import sys
+import hmac
+import time
+import socket
+import asyncio
+import hashlib
+import secrets
+import logging
+import threading
+import subprocess
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 使用 msvcrt 文件锁
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+logger = logging.getLogger(__name__)
+
+# 运行时文件目录（套接字、端口、锁和守护进程日志）
+DEFAULT_RUN_DIR = os.path.join(os.path.expanduser('~'), '.obsidian-logger', 'run')
+
+# 没有客户端连接时自动退出的等待时间（秒）
+DEFAULT_IDLE_TIMEOUT = 600
+
+# 转发器等待守护进程就绪的时间（秒）
+DEFAULT_STARTUP_TIMEOUT = 10
+
+# 单条消息的最大长度
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+# TCP 连接发送令牌的等待时间（秒）
+AUTH_TIMEOUT = 5
+
+USE_UNIX_SOCKET = hasattr(socket, 'AF_UNIX') and sys.platform != 'win32'
+
+
+@dataclass(frozen=True)
+class DaemonPaths:
+    """守护进程的运行时文件"""
+    run_dir: str
+    daemon_id: str
+    
+    @property
+    def socket_path(self) -> str:
+        return os.path.join(self.run_dir, f'{self.daemon_id}.sock')
+    
+    @property
+    def port_path(self) -> str:
+        return os.path.join(self.run_dir, f'{self.daemon_id}.port')
+    
+    @property
+    def lock_path(self) -> str:
+        return os.path.join(self.run_dir, f'{self.daemon_id}.lock')
+    
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.run_dir, f'{self.daemon_id}.log')
+
+
+def daemon_paths(log_file_path: str, vault_path: str = '',
+                 run_dir: Optional[str] = None) -> DaemonPaths:
+    """计算仓库对应的守护进程运行时文件
+    
+    Args:
+        log_file_path: 日志文件路径
+        vault_path: 仓库路径
+        run_dir: 运行时文件目录，None 表示 ~/.obsidian-logger/run
+    
+    Returns:
+        运行时文件路径
+    """
+    key = f"{os.path.realpath(log_file_path)}\0{os.path.realpath(vault_path) if vault_path else ''}"
+    daemon_id = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+    return DaemonPaths(run_dir or DEFAULT_RUN_DIR, daemon_id)
+
+
+def write_port_file(path: str, port: int, token: str) -> None:
+    """写入端口文件（权限 0600）
+    
+    Args:
+        path: 端口文件路径
+        port: 监听端口
+        token: 客户端连接后需要先发送的令牌
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='ascii') as f:
+        f.write(f"{port}\n{token}\n")
+
+
+def read_port_file(path: str) -> Optional[Tuple[int, str]]:
+    """读取端口文件
+    
+    Args:
+        path: 端口文件路径
+    
+    Returns:
+        (端口, 令牌)，文件不存在或格式无效时返回 None
+    """
+    try:
+        with open(path, 'r', encoding='ascii') as f:
+            port, token = f.read().split()
+        return int(port), token
+    except (OSError, ValueError):
+        return None
+
+
+def connect(paths: DaemonPaths, timeout: float = 1.0) -> Optional[socket.socket]:
+    """连接守护进程
+    
+    Args:
+        paths: 运行时文件
+        timeout: 连接超时（秒）
+    
+    Returns:
+        已连接的阻塞套接字，守护进程未运行时返回 None
+    """
+    token = None
+    try:
+        if USE_UNIX_SOCKET:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address: Any = paths.socket_path
+        else:
+            endpoint = read_port_file(paths.port_path)
+            if endpoint is None:
+                return None
+            port, token = endpoint
+            address = ('127.0.0.1', port)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    except OSError:
+        return None
+    
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+        if token is not None:
+            sock.sendall(token.encode('ascii') + b'\n')
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def spawn_daemon(paths: DaemonPaths, command: List[str]) -> subprocess.Popen:
+    """在后台启动守护进程（与当前进程脱离）
+    
+    Args:
+        paths: 运行时文件
+        command: 启动命令
+    
+    Returns:
+        子进程
+    """
+    os.makedirs(paths.run_dir, exist_ok=True)
+    kwargs: dict = {}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = (subprocess.DETACHED_PROCESS
+                                   | subprocess.CREATE_NEW_PROCESS_GROUP)
+    else:
+        kwargs['start_new_session'] = True
+    with open(paths.log_path, 'ab') as log:
+        return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=log, close_fds=True, **kwargs)
+
+
+def ensure_daemon(paths: DaemonPaths, command: List[str],
+                  timeout: float = DEFAULT_STARTUP_TIMEOUT) -> Optional[socket.socket]:
+    """连接守护进程，未运行时启动并等待就绪
+    
+    Args:
+        paths: 运行时文件
+        command: 启动守护进程的命令
+        timeout: 等待就绪的时间（秒）
+    
+    Returns:
+        已连接的套接字，启动失败时返回 None
+    """
+    sock = connect(paths)
+    if sock is not None:
+        return sock
+    
+    process = spawn_daemon(paths, command)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        sock = connect(paths)
+        if sock is not None:
+            return sock
+        if process.poll() not in (None, 0):
+            # 启动失败（退出码 0 表示已有其他守护进程在启动，继续等待）
+            logger.error(f"守护进程启动失败，退出码 {process.returncode}，详见 {paths.log_path}")
+            return None
+        time.sleep(0.05)
+    logger.error(f"等待守护进程就绪超时（{timeout}s），详见 {paths.log_path}")
+    return None
+
+
+def relay(sock: socket.socket, stdin=None, stdout=None) -> None:
+    """在 stdin/stdout 和守护进程套接字之间双向转发字节，直到任一方关闭
+    
+    Args:
+        sock: 已连接的套接字
+        stdin: 输入（二进制），默认 sys.stdin.buffer
+        stdout: 输出（二进制），默认 sys.stdout.buffer
+    """
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    
+    def upstream():
+        try:
+            while True:
+                data = stdin.read1(65536) if hasattr(stdin, 'read1') else stdin.read(65536)
+                if not data:
+                    break
+                sock.sendall(data)
+        except OSError:
+            pass
+        finally:
+            try:
+                sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+    
+    thread = threading.Thread(target=upstream, name='shim-upstream', daemon=True)
+    thread.start()
+    try:
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            stdout.write(data)
+            stdout.flush()
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+@asynccontextmanager
+async def socket_transport(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """把一个套接字连接包装为 MCP 会话的读写流（按行分隔的 JSON-RPC，与 stdio 传输相同）
+    
+    Args:
+        reader: 连接的读端
+        writer: 连接的写端
+    
+    Yields:
+        (read_stream, write_stream)，可直接传给 Server.run
+    """
+    # 只有守护进程需要 MCP SDK，转发器导入本模块时不加载
+    import anyio
+    import anyio.lowlevel
+    from mcp import types
+    from mcp.shared.message import SessionMessage
+    
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    
+    async def socket_reader():
+        try:
+            async with read_stream_writer:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    try:
+                        message = types.JSONRPCMessage.model_validate_json(line)
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+                    await read_stream_writer.send(SessionMessage(message))
+        except (anyio.ClosedResourceError, ConnectionError):
+            await anyio.lowlevel.checkpoint()
+    
+    async def socket_writer():
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    data = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                    writer.write(data.encode('utf-8') + b'\n')
+                    await writer.drain()
+        except (anyio.ClosedResourceError, ConnectionError):
+            await anyio.lowlevel.checkpoint()
+    
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(socket_reader)
+        tg.start_soon(socket_writer)
+        try:
+            yield read_stream, write_stream
+        finally:
+            tg.cancel_scope.cancel()
+            writer.close()
+
+
+class DaemonServer:
+    """守护进程：在本地套接字上接受连接，每个连接运行一个独立的 MCP 会话，共享同一组组件"""
+    
+    def __init__(self, paths: DaemonPaths, run_session: Callable,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        """初始化守护进程
+        
+        Args:
+            paths: 运行时文件
+            run_session: async (read_stream, write_stream) -> None，运行一个 MCP 会话
+            idle_timeout: 没有客户端连接时自动退出的等待时间（秒），0 表示不退出
+        """
+        self.paths = paths
+        self.run_session = run_session
+        self.idle_timeout = idle_timeout
+        
+        self.active_connections = 0
+        self.total_connections = 0
+        self._lock_file = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopped = asyncio.Event()
+        self._last_active = time.monotonic()
+        # TCP 传输的连接令牌（Unix 套接字靠文件权限限制访问，不需要）
+        self._token: Optional[str] = None
+        self.rejected_connections = 0
+    
+    def acquire_lock(self) -> bool:
+        """获取单实例锁
+        
+        Returns:
+            是否获取成功；其他守护进程已持有时返回 False
+        """
+        os.makedirs(self.paths.run_dir, exist_ok=True)
+        if fcntl is None and msvcrt is None:
+            return True
+        self._lock_file = open(self.paths.lock_path, 'a')
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._lock_file.seek(0)
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        return True
+    
+    async def start(self) -> None:
+        """开始监听连接"""
+        if USE_UNIX_SOCKET:
+            # 持有单实例锁时残留的套接字文件一定已失效
+            if os.path.exists(self.paths.socket_path):
+                os.unlink(self.paths.socket_path)
+            old_umask = os.umask(0o177)
+            try:
+                self._server = await asyncio.start_unix_server(
+                    self._handle, self.paths.socket_path, limit=MAX_MESSAGE_BYTES)
+            finally:
+                os.umask(old_umask)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle, '127.0.0.1', 0, limit=MAX_MESSAGE_BYTES)
+            port = self._server.sockets[0].getsockname()[1]
+            self._token = secrets.token_hex(16)
+            write_port_file(self.paths.port_path, port, self._token)
+        self._last_active = asyncio.get_running_loop().time()
+        logger.info(f"守护进程已启动: {self.paths.socket_path if USE_UNIX_SOCKET else self.paths.port_path}")
+    
+    async def _authenticate(self, reader: asyncio.StreamReader) -> bool:
+        """校验 TCP 连接发送的第一行令牌
+        
+        Args:
+            reader: 连接的读端
+        
+        Returns:
+            是否通过；不需要令牌时总是通过
+        """
+        if self._token is None:
+            return True
+        try:
+            line = await asyncio.wait_for(reader.readline(), AUTH_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            return False
+        return hmac.compare_digest(line.strip(), self._token.encode('ascii'))
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个客户端连接"""
+        if not await self._authenticate(reader):
+            self.rejected_connections += 1
+            logger.warning("拒绝了令牌不匹配的连接")
+            writer.close()
+            return
+        self.active_connections += 1
+        self.total_connections += 1
+        try:
+            async with socket_transport(reader, writer) as (read_stream, write_stream):
+                await self.run_session(read_stream, write_stream)
+        except Exception as e:
+            logger.error(f"客户端会话异常结束: {e}")
+        finally:
+            self.active_connections -= 1
+            self._last_active = asyncio.get_running_loop().time()
+    
+    async def serve_until_idle(self) -> None:
+        """运行直到没有客户端连接的时间超过 idle_timeout，或 stop() 被调用"""
+        loop = asyncio.get_running_loop()
+        check_interval = min(1.0, self.idle_timeout) if self.idle_timeout > 0 else None
+        try:
+            while not self._stopped.is_set():
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), check_interval)
+                except asyncio.TimeoutError:
+                    pass
+                if (self.active_connections == 0
+                        and loop.time() - self._last_active >= self.idle_timeout):
+                    logger.info(f"{self.idle_timeout}s 内没有客户端连接，守护进程退出")
+                    break
+        finally:
+            self.close()
+    
+    def stop(self) -> None:
+        """请求停止"""
+        self._stopped.set()
+    
+    def close(self) -> None:
+        """关闭监听并清理本守护进程创建的运行时文件"""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            # 端口文件可能已被新启动的守护进程改写，只删除仍然记录着本进程令牌的文件
+            port_file = read_port_file(self.paths.port_path) if not USE_UNIX_SOCKET else None
+            if USE_UNIX_SOCKET or (port_file is not None and port_file[1] == self._token):
+                try:
+                    os.unlink(self.paths.socket_path if USE_UNIX_SOCKET else self.paths.port_path)
+                except OSError:
+                    pass
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+    
+    def get_stats(self) -> dict:
+        """获取守护进程统计信息
+        
+        Returns:
+            统计字典
+        """
+        return {
+            'pid': os.getpid(),
+            'active_connections': self.active_connections,
+            'total_connections': self.total_connections,
+            'rejected_connections': self.rejected_connections,
+            'endpoint': self.paths.socket_path if USE_UNIX_SOCKET else self.paths.port_path
+        }
+
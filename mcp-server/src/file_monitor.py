@@ -1,67 +1,436 @@
 """
 文件监听模块
 
-使用 watchdog 监听日志文件变化，自动更新缓存
+监听日志文件变化（watchdog 或 stat 轮询后端），自动更新缓存并把新追加的行送入环形缓冲区
+
+每次变化都会根据 inode、文件大小和文件头校验和分类为追加、截断、轮转或重建事件，
+并通知订阅者，方便增量读取方正确处理插件的日志轮转（重命名）和清空（截断）
 """
 
 import os
 import time
+import zlib
+import asyncio
 import logging
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler, FileModifiedEvent
-from typing import Callable, Optional
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional
+
+from tail_reader import TailReader, HEAD_CHECKSUM_BYTES
+from monitor_backends import (
+    MonitorBackend, create_backend, backend_candidates,
+    BACKEND_AUTO, BACKEND_POLLING
+)
 
 logger = logging.getLogger(__name__)
 
+# 文件变化类型
+CHANGE_APPEND = 'append'      # 同一文件追加内容
+CHANGE_TRUNCATE = 'truncate'  # 同一文件被截断或原地重写（插件的 clearLogs）
+CHANGE_ROTATE = 'rotate'      # 原文件被重命名（插件的 rotateLog）
+CHANGE_RECREATE = 'recreate'  # 原文件被删除后重新创建
+
+
+@dataclass(frozen=True)
+class FileIdentity:
+    """日志文件身份：用于区分追加、截断和替换"""
+    inode: int
+    size: int
+    head_length: int
+    head_checksum: int
+
+
+@dataclass(frozen=True)
+class FileChangeEvent:
+    """日志文件变化事件"""
+    kind: str
+    path: str
+    inode: Optional[int]                  # 当前文件的 inode，文件不存在时为 None
+    size: int                             # 当前文件大小
+    previous_size: int = 0                # 变化前记录的文件大小
+    rotated_path: Optional[str] = None    # 轮转后旧文件的路径（仅 rotate）
+    final_offset: Optional[int] = None    # 轮转后旧文件的最终大小（仅 rotate）
+    timestamp: float = field(default_factory=time.time)
+
+
+def read_file_identity(path: str) -> Optional[FileIdentity]:
+    """读取文件身份
+    
+    Args:
+        path: 文件路径
+    
+    Returns:
+        文件身份，文件不存在时返回 None
+    """
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            head = f.read(min(st.st_size, HEAD_CHECKSUM_BYTES))
+    except (FileNotFoundError, PermissionError):
+        return None
+    return FileIdentity(st.st_ino, st.st_size, len(head), zlib.crc32(head))
+
+
+def head_matches(path: str, identity: FileIdentity) -> bool:
+    """检查文件开头是否仍与记录的校验和一致
+    
+    Args:
+        path: 文件路径
+        identity: 之前记录的文件身份
+    
+    Returns:
+        是否一致
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(identity.head_length)
+    except OSError:
+        return False
+    return len(head) == identity.head_length and zlib.crc32(head) == identity.head_checksum
+
+
+def find_rotated_file(log_dir: str, inode: int, exclude: str) -> Optional[str]:
+    """在日志目录中查找指定 inode 的文件（被重命名的旧日志）
+    
+    Args:
+        log_dir: 日志目录
+        inode: 旧文件的 inode
+        exclude: 需要排除的路径（当前日志文件）
+    
+    Returns:
+        旧文件路径，未找到返回 None
+    """
+    try:
+        with os.scandir(log_dir) as entries:
+            for entry in entries:
+                if entry.path == exclude or not entry.is_file(follow_symlinks=False):
+                    continue
+                if entry.inode() == inode:
+                    return entry.path
+    except OSError:
+        pass
+    return None
+
+
+def follow_change(reader: TailReader, event: FileChangeEvent) -> List[str]:
+    """根据文件变化事件推进增量读取器
+    
+    轮转时先读完旧文件剩余部分（直到 final_offset），再从新文件开头继续，无需全量重扫
+    
+    Args:
+        reader: 增量读取器
+        event: 文件变化事件
+    
+    Returns:
+        新读取到的日志行
+    """
+    lines: List[str] = []
+    if event.kind == CHANGE_ROTATE:
+        if event.rotated_path and event.final_offset is not None:
+            lines.extend(reader.finish_rotated(event.rotated_path, event.final_offset))
+        reader.restart()
+    elif event.kind in (CHANGE_TRUNCATE, CHANGE_RECREATE):
+        reader.restart()
+    
+    appended = reader.read_appended()
+    if appended:
+        lines.extend(appended)
+    return lines
+
 
-class LogFileHandler(FileSystemEventHandler):
-    """日志文件事件处理器
+def merge_events(older: FileChangeEvent, newer: FileChangeEvent) -> FileChangeEvent:
+    """合并两个相继的变化事件（消费方跟不上时使用）
+    
+    结构性变化（轮转、截断、重建）优先于追加；合并结果的 previous_size 取较早事件的值，
+    轮转信息保留较早事件的旧文件路径，读取方仍能先读完旧文件
     
-    处理日志文件的修改事件，支持防抖
+    Args:
+        older: 较早的事件
+        newer: 较新的事件
+    
+    Returns:
+        合并后的事件
     """
+    kind = older.kind if newer.kind == CHANGE_APPEND else newer.kind
+    if kind == CHANGE_ROTATE and older.kind == CHANGE_ROTATE:
+        rotated_path, final_offset = older.rotated_path, older.final_offset
+    else:
+        rotated_path, final_offset = newer.rotated_path, newer.final_offset
+    return replace(newer, kind=kind, previous_size=older.previous_size,
+                   rotated_path=rotated_path, final_offset=final_offset)
+
+
+class CoalescingScheduler:
+    """合并调度器
+    
+    把一段时间内的多次触发合并为一次回调：
+    - 尾沿触发：最后一次事件之后静默 window 毫秒才执行回调，突发写入的最后一次刷新不会丢失
+    - 最长等待：持续写入时，距第一次未处理事件最多 max_wait_ms 毫秒必定执行一次
+    - 自适应窗口：根据观察到的写入间隔（插件 LogCollector 的刷新节奏）调整窗口
+    """
+    
+    # 写入间隔的指数移动平均系数
+    EWMA_ALPHA = 0.2
     
-    def __init__(self, log_file_path: str, on_modified: Callable, debounce_ms: int = 100):
-        """初始化事件处理器
+    def __init__(self, callback: Callable, debounce_ms: int = 100, max_wait_ms: int = 1000,
+                 adaptive: bool = True, min_debounce_ms: int = 20, max_debounce_ms: int = 500,
+                 flush_interval_ms: Optional[float] = None):
+        """初始化调度器
         
         Args:
-            log_file_path: 日志文件路径
-            on_modified: 文件修改时的回调函数
-            debounce_ms: 防抖延迟（毫秒）
+            callback: 合并后执行的回调函数
+            debounce_ms: 初始防抖窗口（毫秒）
+            max_wait_ms: 最长等待时间（毫秒）
+            adaptive: 是否根据写入节奏调整窗口
+            min_debounce_ms: 自适应窗口下限（毫秒），间隔小于它的事件视为同一次写入
+            max_debounce_ms: 自适应窗口上限（毫秒）
+            flush_interval_ms: 插件刷新间隔的初始估计（毫秒），可选
         """
-        super().__init__()
-        self.log_file_path = os.path.abspath(log_file_path)
-        self.on_modified = on_modified
+        self.callback = callback
         self.debounce_ms = debounce_ms
-        self.last_event_time = 0
+        self.max_wait_ms = max(max_wait_ms, debounce_ms)
+        self.adaptive = adaptive
+        self.min_debounce_ms = min_debounce_ms
+        self.max_debounce_ms = max(max_debounce_ms, min_debounce_ms)
+        
+        # 写入间隔估计（毫秒）
+        self.write_interval_ms: Optional[float] = flush_interval_ms
+        self.window_ms: float = self._compute_window()
         
-        logger.info(f"事件处理器已初始化: {self.log_file_path}")
+        # 调度状态
+        self._first_pending: Optional[float] = None
+        self._last_event: float = 0
+        self._pending_count: int = 0
+        self._fired_count: int = 0
+        self._coalesced_count: int = 0
+        
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
     
-    def on_modified(self, event):
-        """文件修改事件处理
+    def _compute_window(self) -> float:
+        """根据写入间隔计算防抖窗口
         
-        Args:
-            event: 文件系统事件
+        窗口取写入间隔的 1/4（限制在上下限之间）：足以覆盖同一次刷新产生的多次事件，
+        又能在下一次刷新之前触发；写入风暴时窗口大于间隔，由最长等待保证刷新频率
         """
-        # 只处理文件修改事件
-        if not isinstance(event, FileModifiedEvent):
+        if not self.adaptive or self.write_interval_ms is None:
+            return float(self.debounce_ms)
+        window = self.write_interval_ms / 4
+        return min(max(window, self.min_debounce_ms), self.max_debounce_ms)
+    
+    def _observe(self, now: float) -> None:
+        """记录一次事件，更新写入间隔估计（调用方需持有锁）"""
+        if not self._last_event:
             return
-        
-        # 只处理目标日志文件
-        event_path = os.path.abspath(event.src_path)
-        if event_path != self.log_file_path:
+        gap_ms = (now - self._last_event) * 1000
+        if gap_ms < self.min_debounce_ms:
+            # 同一次写入产生的多个事件
             return
+        # 长时间空闲不计入，避免窗口被拉到上限
+        gap_ms = min(gap_ms, self.max_debounce_ms * 8)
+        if self.write_interval_ms is None:
+            self.write_interval_ms = gap_ms
+        else:
+            self.write_interval_ms += self.EWMA_ALPHA * (gap_ms - self.write_interval_ms)
+        self.window_ms = self._compute_window()
+    
+    def start(self) -> None:
+        """启动调度线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='log-monitor-scheduler', daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """停止调度线程，丢弃尚未触发的事件"""
+        with self._cond:
+            self._running = False
+            self._first_pending = None
+            self._pending_count = 0
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+    
+    def trigger(self) -> None:
+        """记录一次事件，稍后合并触发回调"""
+        now = time.monotonic()
+        with self._cond:
+            self._observe(now)
+            self._last_event = now
+            if self._first_pending is None:
+                self._first_pending = now
+            else:
+                self._coalesced_count += 1
+            self._pending_count += 1
+            self._cond.notify()
+    
+    def _deadline(self) -> float:
+        """计算下一次触发时间（调用方需持有锁）"""
+        trailing = self._last_event + self.window_ms / 1000
+        bound = self._first_pending + self.max_wait_ms / 1000
+        return min(trailing, bound)
+    
+    def _run(self) -> None:
+        """调度线程主循环"""
+        while True:
+            with self._cond:
+                while self._running and self._first_pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                
+                remaining = self._deadline() - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                
+                count = self._pending_count
+                self._first_pending = None
+                self._pending_count = 0
+                self._fired_count += 1
+            
+            logger.debug(f"合并 {count} 个事件后触发回调 (window={self.window_ms:.0f}ms)")
+            try:
+                self.callback()
+            except Exception as e:
+                logger.error(f"文件变化回调执行失败: {e}")
+    
+    def get_stats(self) -> dict:
+        """获取调度统计信息
+        
+        Returns:
+            统计字典
+        """
+        with self._cond:
+            return {
+                'window_ms': self.window_ms,
+                'write_interval_ms': self.write_interval_ms,
+                'fired': self._fired_count,
+                'coalesced': self._coalesced_count,
+                'pending': self._pending_count
+            }
+
+
+class ChangeStream:
+    """文件变化事件的异步迭代器
+    
+    监听线程通过 loop.call_soon_threadsafe 把事件投递到事件循环中的 asyncio.Queue，
+    消费方在事件循环里 ``async for`` 逐个处理。队列已满时不阻塞监听线程，
+    而是把后续事件合并成一个待投递事件，待消费方取走队列中的事件后再放入
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 64):
+        """初始化事件流
+        
+        Args:
+            loop: 消费方所在的事件循环
+            maxsize: 队列容量
+        """
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.closed = False
+        self.delivered = 0
+        self.coalesced = 0
+        
+        # 队列满时合并的事件（仅在事件循环线程访问）
+        self._overflow: Optional[FileChangeEvent] = None
+        self._unsubscribe: Optional[Callable[[], None]] = None
+    
+    def deliver(self, event: FileChangeEvent) -> None:
+        """投递事件（可在任意线程调用）
         
-        # 防抖处理
-        current_time = time.time() * 1000
-        if current_time - self.last_event_time < self.debounce_ms:
-            logger.debug("事件被防抖过滤")
+        Args:
+            event: 文件变化事件
+        """
+        if self.closed:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # 事件循环已关闭
+            self.closed = True
+    
+    def _put(self, event: Optional[FileChangeEvent]) -> None:
+        """在事件循环中放入队列，队列已满时合并"""
+        if event is None:
+            # 关闭标记：唤醒等待中的消费方
+            if self.queue.empty():
+                self.queue.put_nowait(None)
+            return
+        if self.closed:
             return
+        if self._overflow is not None:
+            self._overflow = merge_events(self._overflow, event)
+            self.coalesced += 1
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._overflow = event
+            self.coalesced += 1
+    
+    def close(self) -> None:
+        """关闭事件流，取消订阅并结束迭代（可在任意线程调用）"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+        try:
+            self.loop.call_soon_threadsafe(self._put, None)
+        except RuntimeError:
+            pass
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> FileChangeEvent:
+        if self.closed and self.queue.empty():
+            raise StopAsyncIteration
+        event = await self.queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        if self._overflow is not None:
+            # 队列腾出了位置，放入合并后的事件
+            self.queue.put_nowait(self._overflow)
+            self._overflow = None
+        self.delivered += 1
+        return event
+    
+    def drain(self) -> List[FileChangeEvent]:
+        """取出已到达但尚未消费的全部事件（不等待），用于把突发写入合并处理
         
-        self.last_event_time = current_time
+        Returns:
+            按到达顺序排列的事件
+        """
+        events = []
+        while not self.queue.empty():
+            event = self.queue.get_nowait()
+            if event is not None:
+                events.append(event)
+        if self._overflow is not None:
+            events.append(self._overflow)
+            self._overflow = None
+        self.delivered += len(events)
+        return events
+    
+    def get_stats(self) -> dict:
+        """获取事件流统计信息
         
-        # 调用回调
-        logger.debug(f"检测到文件修改: {event.src_path}")
-        self.on_modified()
+        Returns:
+            统计字典
+        """
+        return {
+            'queued': self.queue.qsize(),
+            'delivered': self.delivered,
+            'coalesced': self.coalesced,
+            'closed': self.closed
+        }
 
 
 class FileMonitor:
@@ -70,33 +439,216 @@ class FileMonitor:
     监听日志文件的变化并触发缓存更新
     """
     
-    def __init__(self, log_file_path: str, cache, debounce_ms: int = 100):
+    def __init__(self, log_file_path: str, cache, debounce_ms: int = 100,
+                 max_wait_ms: int = 1000, adaptive_debounce: bool = True,
+                 flush_interval_ms: Optional[float] = None, backend: str = BACKEND_AUTO,
+                 poll_min_interval_ms: int = 100, poll_max_interval_ms: int = 2000):
         """初始化文件监听器
         
         Args:
             log_file_path: 日志文件路径
             cache: 缓存对象
             debounce_ms: 防抖延迟（毫秒）
+            max_wait_ms: 持续写入时的最长等待时间（毫秒）
+            adaptive_debounce: 是否根据写入节奏调整防抖窗口
+            flush_interval_ms: 插件日志刷新间隔（毫秒），作为写入节奏的初始估计
+            backend: 监听后端（auto/inotify/watchdog/polling）
+            poll_min_interval_ms: 轮询后端在文件活跃时的间隔（毫秒）
+            poll_max_interval_ms: 轮询后端在文件空闲时的最大间隔（毫秒）
         """
         self.log_file_path = log_file_path
         self.cache = cache
         self.debounce_ms = debounce_ms
+        self.max_wait_ms = max_wait_ms
+        self.adaptive_debounce = adaptive_debounce
+        self.flush_interval_ms = flush_interval_ms
+        self.backend_name = backend
+        self.poll_options = {
+            'min_interval_ms': poll_min_interval_ms,
+            'max_interval_ms': poll_max_interval_ms
+        }
         
         # 确定监听目录
         self.log_dir = os.path.dirname(os.path.abspath(log_file_path))
         
-        # 创建观察者和事件处理器
-        self.observer: Optional[Observer] = None
-        self.handler: Optional[LogFileHandler] = None
+        # 监听后端和事件合并调度器（启动时创建）
+        self.backend: Optional[MonitorBackend] = None
+        self.scheduler: Optional[CoalescingScheduler] = None
+        
+        # 增量读取器，负责向缓存的环形缓冲区输送新行
+        self.tail_reader = TailReader(log_file_path)
+        
+        # 文件身份和变化订阅者
+        self.identity: Optional[FileIdentity] = None
+        self._subscribers: List[Callable[[FileChangeEvent], None]] = []
+        self._subscribers_lock = threading.Lock()
+        
+        # 事件循环中的增量读取任务（启动后环形缓冲区由事件循环维护）
+        self._ingest_stream: Optional[ChangeStream] = None
+        self._ingest_task: Optional[asyncio.Task] = None
         
         logger.info(f"文件监听器已初始化")
         logger.info(f"监听目录: {self.log_dir}")
         logger.info(f"目标文件: {os.path.basename(log_file_path)}")
     
+    def subscribe(self, callback: Callable[[FileChangeEvent], None]) -> Callable[[], None]:
+        """订阅文件变化事件
+        
+        回调在监听线程中执行，应尽快返回
+        
+        Args:
+            callback: 接收 FileChangeEvent 的回调函数
+        
+        Returns:
+            取消订阅的函数
+        """
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+        
+        def unsubscribe():
+            with self._subscribers_lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        
+        return unsubscribe
+    
+    def open_stream(self, loop: Optional[asyncio.AbstractEventLoop] = None,
+                    maxsize: int = 64) -> ChangeStream:
+        """打开一个投递到事件循环的变化事件流
+        
+        Args:
+            loop: 目标事件循环，None 表示当前运行中的事件循环
+            maxsize: 队列容量，消费方跟不上时多余事件会被合并
+        
+        Returns:
+            可 ``async for`` 迭代的事件流，用完后调用 close()
+        """
+        stream = ChangeStream(loop or asyncio.get_running_loop(), maxsize)
+        stream._unsubscribe = self.subscribe(stream.deliver)
+        return stream
+    
+    def start_ingest(self) -> asyncio.Task:
+        """把环形缓冲区的增量读取移到当前事件循环中执行
+        
+        监听线程只负责分类变化和使报告缓存失效，新行的读取由事件循环中的任务按事件顺序调度，
+        文件读取本身在线程池中执行，不阻塞事件循环
+        
+        Returns:
+            增量读取任务
+        """
+        if self._ingest_task is None or self._ingest_task.done():
+            self._ingest_stream = self.open_stream()
+            self._ingest_task = asyncio.get_running_loop().create_task(
+                self._ingest(self._ingest_stream)
+            )
+        return self._ingest_task
+    
+    async def _ingest(self, stream: ChangeStream) -> None:
+        """消费变化事件，更新环形缓冲区（逐个等待，保证按事件顺序读取）"""
+        loop = asyncio.get_running_loop()
+        async for event in stream:
+            await loop.run_in_executor(None, self._feed_tail, event)
+    
+    def _emit(self, event: FileChangeEvent) -> None:
+        """通知所有订阅者"""
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"文件变化订阅者执行失败: {e}")
+    
+    def _detect_change(self) -> Optional[FileChangeEvent]:
+        """比较文件身份，判断变化类型并更新记录
+        
+        Returns:
+            变化事件，无实质变化时返回 None
+        """
+        path = self.log_file_path
+        previous = self.identity
+        current = read_file_identity(path)
+        self.identity = current
+        previous_size = previous.size if previous else 0
+        
+        if previous is None:
+            if current is None:
+                return None
+            return FileChangeEvent(CHANGE_RECREATE, path, current.inode, current.size, previous_size)
+        
+        if current is None or current.inode != previous.inode:
+            rotated_path = find_rotated_file(self.log_dir, previous.inode, os.path.abspath(path))
+            inode = current.inode if current else None
+            size = current.size if current else 0
+            if rotated_path:
+                try:
+                    final_offset = os.path.getsize(rotated_path)
+                except OSError:
+                    final_offset = previous_size
+                return FileChangeEvent(CHANGE_ROTATE, path, inode, size, previous_size,
+                                       rotated_path=rotated_path, final_offset=final_offset)
+            if current is None:
+                # 文件被删除，重新创建时再通知
+                logger.info("日志文件已删除")
+                return None
+            return FileChangeEvent(CHANGE_RECREATE, path, inode, size, previous_size)
+        
+        if current.size < previous.size or not head_matches(path, previous):
+            return FileChangeEvent(CHANGE_TRUNCATE, path, current.inode, current.size, previous_size)
+        
+        if current.size > previous.size:
+            return FileChangeEvent(CHANGE_APPEND, path, current.inode, current.size, previous_size)
+        
+        return None
+    
     def _on_file_modified(self):
-        """文件修改回调"""
+        """文件变化回调（合并后执行）"""
+        previous = self.identity
+        event = self._detect_change()
+        if event is None and (previous is None) == (self.identity is None):
+            return
+        
         logger.info("日志文件已修改，使缓存失效")
         self.cache.invalidate()
+        
+        if event is None:
+            # 文件被删除
+            self.cache.invalidate_tail()
+            return
+        
+        logger.debug(f"文件变化: {event.kind} (size {event.previous_size} -> {event.size})")
+        # 启用事件循环增量读取后，新行由 _ingest 任务读取（期间读取回退到磁盘）
+        if self._ingest_stream is None:
+            self._feed_tail(event)
+        self._emit(event)
+    
+    def _prime_tail(self) -> None:
+        """从文件末尾预读，重建环形缓冲区"""
+        reader = self.tail_reader
+        entries, complete = reader.read_tail(self.cache.max_size)
+        self.cache.reset_tail(entries, complete, reader.file_state, reader.last_spans, reader.head)
+    
+    def _feed_tail(self, event: FileChangeEvent) -> None:
+        """把新追加的行送入环形缓冲区
+        
+        Args:
+            event: 文件变化事件
+        """
+        try:
+            entries = None
+            if event.kind == CHANGE_APPEND:
+                entries = self.tail_reader.read_appended()
+            if entries is None:
+                # 文件被截断、轮转或重建，重新预读；期间读取会回退到磁盘
+                logger.info(f"日志文件已{event.kind}，重建环形缓冲区")
+                self.cache.invalidate_tail()
+                self._prime_tail()
+            else:
+                reader = self.tail_reader
+                self.cache.extend_tail(entries, reader.file_state, reader.last_spans, reader.head)
+        except Exception as e:
+            logger.error(f"更新环形缓冲区失败: {e}")
+            self.cache.invalidate_tail()
     
     def start(self) -> bool:
         """启动文件监听
@@ -111,43 +663,72 @@ class FileMonitor:
                 logger.info("将在目录创建后开始监听")
                 os.makedirs(self.log_dir, exist_ok=True)
             
-            # 创建事件处理器
-            self.handler = LogFileHandler(
-                self.log_file_path,
-                self._on_file_modified,
-                self.debounce_ms
-            )
+            # 记录文件身份，预读文件末尾填充环形缓冲区
+            self.identity = read_file_identity(self.log_file_path)
+            self._prime_tail()
             
-            # 创建观察者
-            self.observer = Observer()
-            self.observer.schedule(
-                self.handler,
-                self.log_dir,
-                recursive=False
+            # 创建事件合并调度器
+            self.scheduler = CoalescingScheduler(
+                self._on_file_modified,
+                self.debounce_ms,
+                max_wait_ms=self.max_wait_ms,
+                adaptive=self.adaptive_debounce,
+                flush_interval_ms=self.flush_interval_ms
             )
+            self.scheduler.start()
             
-            # 启动观察者
-            self.observer.start()
+            # 选择并启动监听后端，启动失败时按 inotify → watchdog → 轮询 的顺序回退
+            candidates = backend_candidates(self.backend_name, self.log_file_path)
+            for i, name in enumerate(candidates):
+                try:
+                    self.backend = self._start_backend(name)
+                    break
+                except Exception as e:
+                    if i == len(candidates) - 1:
+                        raise
+                    logger.warning(f"{name} 后端启动失败（{e}），改用 {candidates[i + 1]} 后端")
             
-            logger.info("文件监听已启动")
+            logger.info(f"文件监听已启动 (后端: {self.backend.name})")
             return True
         
         except Exception as e:
             logger.error(f"启动文件监听失败: {e}")
+            if self.scheduler:
+                self.scheduler.stop()
+                self.scheduler = None
             return False
     
+    def _start_backend(self, name: str) -> MonitorBackend:
+        """创建并启动监听后端
+        
+        Args:
+            name: 后端名称
+        
+        Returns:
+            已启动的后端
+        """
+        options = self.poll_options if name == BACKEND_POLLING else {}
+        backend = create_backend(name, self.log_file_path, self.scheduler.trigger, **options)
+        backend.start()
+        return backend
+    
     def stop(self) -> None:
         """停止文件监听"""
-        if self.observer:
+        if self.backend:
             try:
-                self.observer.stop()
-                self.observer.join(timeout=5)
+                self.backend.stop()
                 logger.info("文件监听已停止")
             except Exception as e:
                 logger.error(f"停止文件监听失败: {e}")
             finally:
-                self.observer = None
-                self.handler = None
+                self.backend = None
+        if self.scheduler:
+            self.scheduler.stop()
+            self.scheduler = None
+        if self._ingest_stream:
+            self._ingest_stream.close()
+            self._ingest_stream = None
+            self._ingest_task = None
     
     def is_running(self) -> bool:
         """检查监听器是否运行中
@@ -155,7 +736,7 @@ class FileMonitor:
         Returns:
             是否运行中
         """
-        return self.observer is not None and self.observer.is_alive()
+        return self.backend is not None and self.backend.is_alive()
     
     def __del__(self):
         """析构函数，确保停止监听"""
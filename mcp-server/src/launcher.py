@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+启动器
+
+命令行入口：决定以哪种模式运行，并尽量少加载模块
+- 默认：独立 stdio 模式，导入服务端模块（MCP SDK、工具定义）后运行
+- --daemon：守护进程模式
+- --connect 或配置 daemon.enabled：stdio 转发器，只需配置和套接字，不加载 MCP SDK，
+  进程启动后立即开始转发
+"""
+
+import os
+import sys
+import json
+import asyncio
+import logging
+from typing import Optional
+
+# 添加 src 目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config_manager import ConfigManager
+from daemon import daemon_paths, ensure_daemon, relay
+
+# 配置日志 - 只输出到 stderr（避免干扰 STDIO 通信）
+logging.basicConfig(
+    level=logging.ERROR,  # 只输出错误级别
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stderr
+)
+
+logger = logging.getLogger(__name__)
+
+
+def find_config_file() -> Optional[str]:
+    """查找配置文件
+    
+    按以下顺序查找:
+    1. 命令行参数指定的路径
+    2. 当前工作目录的 config.json
+    3. 用户主目录 ~/.obsidian-logger/config.json
+    4. 脚本目录的 ../config.json
+    
+    Returns:
+        配置文件路径，如果未找到返回 None
+    """
+    # 1. 命令行参数（跳过 --daemon 等选项）
+    positional = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if positional:
+        config_path = positional[0]
+        if os.path.exists(config_path):
+            return os.path.abspath(config_path)
+        else:
+            logger.error(f"配置文件不存在: {config_path}")
+            return None
+    
+    # 2. 当前工作目录
+    cwd_config = os.path.join(os.getcwd(), 'config.json')
+    if os.path.exists(cwd_config):
+        return cwd_config
+    
+    # 3. 用户主目录
+    home_config = os.path.join(os.path.expanduser('~'), '.obsidian-logger', 'config.json')
+    if os.path.exists(home_config):
+        return home_config
+    
+    # 4. 脚本目录
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    script_config = os.path.join(os.path.dirname(script_dir), 'config.json')
+    if os.path.exists(script_config):
+        return script_config
+    
+    return None
+
+
+def run_shim(config_path: str) -> bool:
+    """stdio 转发器：连接（必要时启动）守护进程，把 stdin/stdout 转发过去
+    
+    Args:
+        config_path: 配置文件路径（传给守护进程）
+    
+    Returns:
+        是否已连接到守护进程；返回 False 时调用方应以独立模式运行
+    """
+    try:
+        shim_config = ConfigManager(config_path)
+        log_file_path = shim_config.get_log_file_path()
+    except Exception as e:
+        logger.error(f"读取配置失败，以独立模式运行: {e}")
+        return False
+    
+    daemon_config = shim_config.config.get('daemon', {})
+    paths = daemon_paths(log_file_path, shim_config.config.get('vault_path', ''),
+                         daemon_config.get('run_dir'))
+    command = [sys.executable, os.path.abspath(__file__), '--daemon', config_path]
+    sock = ensure_daemon(paths, command)
+    if sock is None:
+        logger.error("无法连接守护进程，以独立模式运行")
+        return False
+    relay(sock)
+    return True
+
+
+def use_daemon(config_path: Optional[str]) -> bool:
+    """是否以转发器模式运行（命令行 --connect 或配置 daemon.enabled）"""
+    if '--connect' in sys.argv[1:]:
+        return config_path is not None
+    if config_path is None:
+        return False
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return bool(json.load(f).get('daemon', {}).get('enabled', False))
+    except (OSError, ValueError):
+        return False
+
+
+def main():
+    """主入口点（用于 uvx 和命令行启动）
+    
+    - 默认：stdio 模式，进程独占一组组件
+    - --daemon：守护进程模式，通过本地套接字服务多个客户端
+    - --connect 或配置 daemon.enabled：stdio 转发器，连接（必要时启动）守护进程
+    
+    服务端模块（以及 MCP SDK）只在需要时导入，转发器不加载
+    """
+    try:
+        if '--daemon' in sys.argv[1:]:
+            from mcp_obsidian_logger import run_daemon
+            asyncio.run(run_daemon())
+            return
+        config_path = find_config_file()
+        if use_daemon(config_path) and run_shim(config_path):
+            return
+        from mcp_obsidian_logger import run_server
+        asyncio.run(run_server())
+    except KeyboardInterrupt:
+        logger.info("MCP Server 正在关闭...")
+        # 停止所有仓库的文件监听
+        server = sys.modules.get('mcp_obsidian_logger')
+        if server is not None and server.vaults:
+            server.vaults.stop()
+        sys.exit(0)
+    except Exception as e:
+        logger.error(f"MCP Server 启动失败: {e}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
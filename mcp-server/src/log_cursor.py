@@ -0,0 +1,416 @@
+"""
+日志游标模块
+
+游标记录日志文件身份（inode 和文件头校验和）以及字节偏移量，编码为不透明字符串交给客户端。
+客户端传回游标时只读取此后追加的内容；文件被轮转（重命名）时先读完旧文件剩余部分，
+被清空（截断或原地重写）时从新文件开头读取
+
+游标同时用于分页：从偏移量处向后或向前（反向按块读取）逐行扫描，每页的代价只与页大小有关，
+与文件总大小无关；每页的行数、返回字节数和扫描字节数都有上限
+"""
+
+import os
+import zlib
+import base64
+import struct
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Pattern, Tuple, Union
+
+from tail_reader import decode_lines
+from file_monitor import FileIdentity, head_matches, find_rotated_file, HEAD_CHECKSUM_BYTES
+
+logger = logging.getLogger(__name__)
+
+# 游标编码：版本、inode、偏移量、文件头长度、文件头校验和
+CURSOR_VERSION = 1
+_CURSOR_STRUCT = struct.Struct('>BQQHI')
+
+# 单次增量读取的默认字节上限
+DEFAULT_MAX_BYTES = 1024 * 1024
+
+# 分页默认上限：每页行数、每页返回字节数、每页扫描字节数（按级别过滤时可能需要扫描更多内容）
+MAX_PAGE_LINES = 500
+MAX_PAGE_BYTES = 256 * 1024
+MAX_SCAN_BYTES = 16 * 1024 * 1024
+
+# 扫描时每次读取的块大小
+SCAN_BLOCK_SIZE = 64 * 1024
+
+# 行过滤条件：包含的字节串或字节正则
+LineMarker = Union[bytes, Pattern[bytes]]
+
+
+@dataclass(frozen=True)
+class LogCursor:
+    """日志游标"""
+    inode: int
+    offset: int
+    head_length: int
+    head_checksum: int
+    
+    def encode(self) -> str:
+        """编码为不透明字符串"""
+        raw = _CURSOR_STRUCT.pack(CURSOR_VERSION, self.inode, self.offset,
+                                  self.head_length, self.head_checksum)
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @classmethod
+    def decode(cls, token: str) -> 'LogCursor':
+        """从字符串解码
+        
+        Args:
+            token: encode() 生成的字符串
+        
+        Returns:
+            游标
+        
+        Raises:
+            ValueError: 游标格式无效
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            version, inode, offset, head_length, head_checksum = _CURSOR_STRUCT.unpack(raw)
+        except (ValueError, struct.error, TypeError) as e:
+            raise ValueError(f"无效的游标: {token}") from e
+        if version != CURSOR_VERSION:
+            raise ValueError(f"不支持的游标版本: {version}")
+        return cls(inode, offset, head_length, head_checksum)
+    
+    def identity(self) -> FileIdentity:
+        """游标对应的文件身份（用于校验文件头）"""
+        return FileIdentity(self.inode, self.offset, self.head_length, self.head_checksum)
+
+
+def make_cursor(f, inode: int, offset: int) -> LogCursor:
+    """为已打开的文件生成指定偏移量处的游标
+    
+    Args:
+        f: 以二进制模式打开的文件对象
+        inode: 文件 inode
+        offset: 字节偏移量（应位于行首）
+    
+    Returns:
+        游标
+    """
+    position = f.tell()
+    f.seek(0)
+    head = f.read(min(offset, HEAD_CHECKSUM_BYTES))
+    f.seek(position)
+    return cursor_from_head(inode, offset, head)
+
+
+def cursor_from_head(inode: int, offset: int, head: bytes) -> LogCursor:
+    """用已知的文件开头生成指定偏移量处的游标，无需读取文件
+    
+    Args:
+        inode: 文件 inode
+        offset: 字节偏移量（应位于行首）
+        head: 文件开头至少 min(offset, HEAD_CHECKSUM_BYTES) 字节
+    
+    Returns:
+        游标
+    """
+    head = head[:min(offset, HEAD_CHECKSUM_BYTES)]
+    return LogCursor(inode, offset, len(head), zlib.crc32(head))
+
+
+def cursor_at_end(path: str) -> Optional[LogCursor]:
+    """生成指向文件末尾最后一个完整行之后的游标
+    
+    Args:
+        path: 日志文件路径
+    
+    Returns:
+        游标，文件不存在时返回 None
+    """
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            return make_cursor(f, st.st_ino, line_start_before(f, st.st_size))
+    except FileNotFoundError:
+        return None
+
+
+def line_start_before(f, offset: int, block_size: int = 4096) -> int:
+    """向前查找 offset 之前最近的行首（即上一个换行符之后的位置）
+    
+    Args:
+        f: 以二进制模式打开的文件对象
+        offset: 起始偏移量
+        block_size: 反向读取的块大小
+    
+    Returns:
+        行首偏移量（offset 本身位于行首时返回 offset）
+    """
+    pos = offset
+    while pos > 0:
+        step = min(block_size, pos)
+        f.seek(pos - step)
+        block = f.read(step)
+        index = block.rfind(b'\n')
+        if index >= 0:
+            return pos - step + index + 1
+        pos -= step
+    return 0
+
+
+def _line_matcher(marker: Optional[LineMarker]) -> Optional[Callable[[bytes], bool]]:
+    """把过滤条件转换为判断函数，None 表示不过滤"""
+    if marker is None:
+        return None
+    if isinstance(marker, bytes):
+        return lambda line: marker in line
+    return lambda line: marker.search(line) is not None
+
+
+def scan_forward(f, start: int, end: int, max_lines: Optional[int] = None,
+                 marker: Optional[LineMarker] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_scan: int = MAX_SCAN_BYTES) -> Tuple[List[bytes], int]:
+    """从 start 向后逐行扫描 [start, end)，按块读取，代价只与扫描的字节数有关
+    
+    Args:
+        f: 以二进制模式打开的文件对象
+        start: 起始偏移量（位于行首）
+        end: 结束偏移量（位于行首）
+        max_lines: 最多返回的行数，None 表示不限
+        marker: 只返回包含该字节串（如 b'[ERROR]'）或匹配该正则的行，None 表示全部
+        max_bytes: 返回内容的字节上限（至少返回一行以保证前进）
+        max_scan: 扫描的字节上限
+    
+    Returns:
+        (选中的行, 扫描停止处的偏移量，即下一页的起点)
+    """
+    match = _line_matcher(marker)
+    selected: List[bytes] = []
+    out_bytes = 0
+    position = start
+    pos = start
+    buf = b''
+    lo = 0
+    f.seek(start)
+    while position < end and (max_lines is None or len(selected) < max_lines):
+        index = buf.find(b'\n', lo)
+        if index < 0:
+            if pos >= end or position - start >= max_scan:
+                break
+            chunk = f.read(min(SCAN_BLOCK_SIZE, end - pos))
+            if not chunk:
+                break
+            pos += len(chunk)
+            buf = buf[lo:] + chunk
+            lo = 0
+            continue
+        
+        line = buf[lo:index + 1]
+        if match is None or match(line):
+            if selected and out_bytes + len(line) > max_bytes:
+                break
+            selected.append(line)
+            out_bytes += len(line)
+        lo = index + 1
+        position += len(line)
+        if position - start >= max_scan:
+            break
+    return selected, position
+
+
+def scan_backward(f, end: int, max_lines: Optional[int] = None,
+                  marker: Optional[LineMarker] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                  max_scan: int = MAX_SCAN_BYTES) -> Tuple[List[bytes], int]:
+    """从 end 向前逐行扫描，反向按块读取，代价只与扫描的字节数有关
+    
+    Args:
+        f: 以二进制模式打开的文件对象
+        end: 结束偏移量（位于行首）
+        max_lines: 最多返回的行数，None 表示不限
+        marker: 只返回包含该字节串或匹配该正则的行，None 表示全部
+        max_bytes: 返回内容的字节上限（至少返回一行以保证前进）
+        max_scan: 扫描的字节上限
+    
+    Returns:
+        (选中的行（按文件顺序）, 扫描停止处的偏移量，即上一页的终点)
+    """
+    match = _line_matcher(marker)
+    selected: List[bytes] = []
+    out_bytes = 0
+    position = end
+    pos = end
+    buf = b''
+    hi = 0
+    while position > 0 and (max_lines is None or len(selected) < max_lines):
+        # buf[:hi] 对应 [pos, position)，以换行符结尾
+        index = buf.rfind(b'\n', 0, hi - 1) if hi > 0 else -1
+        if index < 0 and pos > 0:
+            if end - position >= max_scan:
+                break
+            step = min(SCAN_BLOCK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            buf = block + buf[:hi]
+            hi = len(block) + hi
+            continue
+        
+        line = buf[index + 1:hi]
+        if match is None or match(line):
+            if selected and out_bytes + len(line) > max_bytes:
+                break
+            selected.append(line)
+            out_bytes += len(line)
+        hi = index + 1
+        position -= len(line)
+        if end - position >= max_scan:
+            break
+    selected.reverse()
+    return selected, position
+
+
+@dataclass
+class CursorRead:
+    """增量读取结果"""
+    lines: List[str]
+    cursor: Optional[LogCursor]     # 下次读取使用的游标，文件不存在时为 None
+    rotated_from: Optional[str] = None  # 发生轮转时已读完的旧文件
+    reset: bool = False             # 文件被清空或替换，从新文件开头读取
+    gap: bool = False               # 找不到被替换的旧文件，期间的日志可能丢失
+    more: bool = False              # 超出行数或字节上限，还有未读取的内容
+    before: Optional[LogCursor] = None  # 本页第一行之前的位置（向前翻页）
+
+
+def read_since(path: str, cursor: LogCursor, max_bytes: int = DEFAULT_MAX_BYTES,
+               max_lines: Optional[int] = None, marker: Optional[LineMarker] = None,
+               max_scan: int = MAX_SCAN_BYTES) -> CursorRead:
+    """读取游标之后追加的完整行（向后翻页）
+    
+    Args:
+        path: 日志文件路径
+        cursor: 上次返回的游标
+        max_bytes: 本次最多返回的字节数，超出时返回部分内容并设置 more
+        max_lines: 本次最多返回的行数，None 表示不限
+        marker: 只返回包含该字节串或匹配该正则的行，None 表示全部
+        max_scan: 本次最多扫描的字节数
+    
+    Returns:
+        增量读取结果
+    """
+    result = CursorRead([], None)
+    start = cursor.offset
+    
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return result
+    
+    with f:
+        st = os.fstat(f.fileno())
+        if st.st_ino != cursor.inode:
+            # 文件被替换：先读完被重命名的旧文件
+            rotated = find_rotated_file(os.path.dirname(os.path.abspath(path)), cursor.inode,
+                                        os.path.abspath(path))
+            if rotated and head_matches(rotated, cursor.identity()):
+                with open(rotated, 'rb') as old:
+                    old_end = line_start_before(old, os.fstat(old.fileno()).st_size)
+                    selected, stop = scan_forward(old, cursor.offset, old_end, max_lines, marker,
+                                                  max_bytes, max_scan)
+                    result.lines.extend(decode_lines(b''.join(selected)))
+                    result.before = make_cursor(old, cursor.inode, cursor.offset)
+                    if stop < old_end:
+                        # 旧文件还没读完，游标仍指向旧文件
+                        result.more = True
+                        result.cursor = make_cursor(old, cursor.inode, stop)
+                        return result
+                    used = sum(len(line) for line in selected)
+                    max_bytes = max(max_bytes - used, 0)
+                    max_scan = max(max_scan - (stop - cursor.offset), 0)
+                    if max_lines is not None:
+                        max_lines -= len(selected)
+                result.rotated_from = rotated
+            else:
+                result.gap = True
+                result.reset = True
+            start = 0
+        elif st.st_size < cursor.offset or not head_matches(path, cursor.identity()):
+            # 同一文件被截断或原地重写
+            result.reset = True
+            start = 0
+        
+        end = line_start_before(f, st.st_size)
+        if result.before is None:
+            result.before = make_cursor(f, st.st_ino, start)
+        stop = start
+        if max_lines is None or max_lines > 0:
+            selected, stop = scan_forward(f, start, end, max_lines, marker, max_bytes, max_scan)
+            result.lines.extend(decode_lines(b''.join(selected)))
+        result.more = stop < end
+        result.cursor = make_cursor(f, st.st_ino, stop)
+    return result
+
+
+@dataclass
+class LogPage:
+    """向前翻页的结果"""
+    lines: List[str]
+    before: Optional[LogCursor]     # 本页第一行之前的位置，已到文件开头时为 None
+    after: Optional[LogCursor]      # 本页最后一行之后的位置（传回 cursor 继续向后读取）
+    scanned_bytes: int = 0
+    source: Optional[str] = None    # 游标指向已轮转的旧文件时为该文件路径
+
+
+def read_page_before(path: str, cursor: Optional[LogCursor] = None,
+                     max_lines: int = MAX_PAGE_LINES, marker: Optional[LineMarker] = None,
+                     max_bytes: int = MAX_PAGE_BYTES, max_scan: int = MAX_SCAN_BYTES) -> Optional[LogPage]:
+    """读取游标之前的一页日志（向前翻页），cursor 为 None 时读取文件末尾一页
+    
+    Args:
+        path: 日志文件路径
+        cursor: 上一页返回的 before 游标
+        max_lines: 本页最多返回的行数
+        marker: 只返回包含该字节串或匹配该正则的行，None 表示全部
+        max_bytes: 本页最多返回的字节数
+        max_scan: 本页最多扫描的字节数
+    
+    Returns:
+        一页日志，文件不存在时返回 None
+    
+    Raises:
+        ValueError: 游标对应的内容已被清空、重写或删除
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    
+    with f:
+        st = os.fstat(f.fileno())
+        if cursor is None:
+            # 末尾页包含尚未以换行结尾的最后一行；after 游标停在该行行首，增量读取在它写完后再完整读取
+            return _page_before(f, st.st_ino, st.st_size, max_lines, marker, max_bytes, max_scan,
+                                after=line_start_before(f, st.st_size))
+        
+        if st.st_ino == cursor.inode:
+            if st.st_size < cursor.offset or not head_matches(path, cursor.identity()):
+                raise ValueError("日志已被清空或重写，before 游标已失效，请重新从末尾读取")
+            return _page_before(f, st.st_ino, cursor.offset, max_lines, marker, max_bytes, max_scan)
+    
+    # 游标指向已被轮转的旧文件
+    rotated = find_rotated_file(os.path.dirname(os.path.abspath(path)), cursor.inode,
+                                os.path.abspath(path))
+    if not rotated or not head_matches(rotated, cursor.identity()):
+        raise ValueError("游标对应的日志文件已不存在，before 游标已失效，请重新从末尾读取")
+    with open(rotated, 'rb') as old:
+        page = _page_before(old, cursor.inode, cursor.offset, max_lines, marker, max_bytes, max_scan)
+    page.source = rotated
+    return page
+
+
+def _page_before(f, inode: int, end: int, max_lines: int, marker: Optional[LineMarker],
+                 max_bytes: int, max_scan: int, after: Optional[int] = None) -> LogPage:
+    """在已打开的文件中读取 end 之前的一页（after 为增量读取游标的位置，默认为 end）"""
+    selected, start = scan_backward(f, end, max_lines, marker, max_bytes, max_scan)
+    return LogPage(
+        lines=decode_lines(b''.join(selected)),
+        before=make_cursor(f, inode, start) if start > 0 else None,
+        after=make_cursor(f, inode, end if after is None else after),
+        scanned_bytes=end - start
+    )
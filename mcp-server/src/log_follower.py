@@ -0,0 +1,301 @@
+"""
+日志跟随模块
+
+从指定时刻的文件末尾开始跟随日志，只读取新追加的字节，用于等待重载结果、等待指定日志等阻塞式工具
+
+有文件监听器时由文件变化事件唤醒（经事件循环投递），否则退化为定时 stat 轮询；
+日志轮转和清空会按变化事件正确衔接，不会重复或遗漏已写入的行
+"""
+
+import re
+import time
+import asyncio
+import logging
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from tail_reader import TailReader
+from file_monitor import FileChangeEvent, FileMonitor, follow_change, CHANGE_APPEND
+
+logger = logging.getLogger(__name__)
+
+# 重载结果日志（Auto-Reload 模块自动重载，以及配置监听处理 MCP 的重载请求）
+RELOAD_SUCCESS_PATTERN = re.compile(
+    r'\[(?:Auto-Reload|Config Monitor)\] ✅ 插件已重载: (\S+)(?: \(用时: (\d+)ms)?'
+)
+RELOAD_FAILURE_PATTERN = re.compile(
+    r'\[(?:Auto-Reload\] ❌ 插件重载失败|Config Monitor\] (?:❌ 重载失败|插件不存在|插件未启用)): (\S+)'
+)
+REQUEST_ID_PATTERN = re.compile(r'请求: ([0-9A-Za-z,-]+)')
+
+# 没有文件监听器时的轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 0.2
+
+
+class LogFollower:
+    """日志跟随器
+    
+    start() 记录当前文件末尾，之后 follow() 只产出此后追加的完整行
+    """
+    
+    def __init__(self, log_file_path: str, monitor: Optional[FileMonitor] = None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        """初始化跟随器
+        
+        Args:
+            log_file_path: 日志文件路径
+            monitor: 文件监听器，运行中时用其变化事件唤醒
+            poll_interval: 没有监听器时的轮询间隔（秒）
+        """
+        self.log_file_path = log_file_path
+        self.monitor = monitor
+        self.poll_interval = poll_interval
+        self.reader = TailReader(log_file_path)
+        self.bytes_read = 0
+    
+    def start(self) -> None:
+        """记录当前文件末尾作为跟随起点"""
+        self.reader.seek_end()
+    
+    def _advance(self, events: List[FileChangeEvent]) -> List[str]:
+        """读取追加的行，并按变化事件处理轮转和截断
+        
+        Args:
+            events: 自上次读取以来收到的变化事件
+        
+        Returns:
+            新的完整行
+        """
+        start = self.reader.offset
+        lines: List[str] = []
+        for event in events:
+            if event.kind != CHANGE_APPEND:
+                lines.extend(follow_change(self.reader, event))
+                start = 0
+        
+        appended = self.reader.read_appended()
+        if appended is None:
+            # 没有收到对应事件的轮转或截断（轮询模式），从新文件开头继续
+            self.reader.restart()
+            start = 0
+            appended = self.reader.read_appended() or []
+        lines.extend(appended)
+        self.bytes_read += max(self.reader.offset - start, 0)
+        return lines
+    
+    async def follow(self, timeout: float) -> AsyncIterator[str]:
+        """逐行产出 start() 之后追加的日志，直到超时
+        
+        Args:
+            timeout: 最长等待时间（秒）
+        
+        Yields:
+            新追加的日志行
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        stream = None
+        if self.monitor is not None and self.monitor.is_running():
+            stream = self.monitor.open_stream()
+        
+        events: List[FileChangeEvent] = []
+        try:
+            while True:
+                for line in self._advance(events):
+                    yield line
+                events = []
+                
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                
+                if stream is None:
+                    await asyncio.sleep(min(remaining, self.poll_interval))
+                    continue
+                try:
+                    events.append(await asyncio.wait_for(stream.__anext__(), remaining))
+                except asyncio.TimeoutError:
+                    pass
+                except StopAsyncIteration:
+                    # 监听器已停止，改为轮询
+                    stream = None
+        finally:
+            if stream is not None:
+                stream.close()
+
+
+def make_line_filter(pattern: str, levels: Optional[List[str]] = None,
+                     ignore_case: bool = False) -> Callable[[str], bool]:
+    """构造日志行过滤函数
+    
+    Args:
+        pattern: 正则表达式（在整行中搜索）
+        levels: 日志级别过滤（LOG/ERROR/WARN/DEBUG），None 或空表示全部
+        ignore_case: 是否忽略大小写
+    
+    Returns:
+        过滤函数
+    
+    Raises:
+        re.error: 正则表达式无效
+    """
+    regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    markers = tuple(f'[{level.upper()}]' for level in levels or [])
+    
+    def matches(line: str) -> bool:
+        if markers and not any(marker in line for marker in markers):
+            return False
+        return regex.search(line) is not None
+    
+    return matches
+
+
+async def wait_for_line(follower: LogFollower, predicate: Callable[[str], bool],
+                        timeout: float) -> Optional[str]:
+    """等待第一条满足条件的新日志行
+    
+    Args:
+        follower: 已 start() 的跟随器
+        predicate: 过滤函数
+        timeout: 最长等待时间（秒）
+    
+    Returns:
+        匹配的日志行（去掉换行符），超时返回 None
+    """
+    async with aclosing(follower.follow(timeout)) as lines:
+        async for line in lines:
+            if predicate(line):
+                return line.rstrip('\n')
+    return None
+
+
+@dataclass
+class ReloadOutcome:
+    """单个插件的重载结果"""
+    plugin_id: str
+    request_id: Optional[str] = None
+    success: Optional[bool] = None          # None 表示超时前未看到结果
+    latency_ms: Optional[float] = None      # 从触发到看到结果日志的端到端延迟
+    reload_ms: Optional[int] = None         # 插件日志报告的重载用时
+    message: str = ''
+
+
+@dataclass
+class ReloadWaitResult:
+    """等待重载的结果"""
+    outcomes: Dict[str, ReloadOutcome]
+    errors: List[str] = field(default_factory=list)
+    timed_out: bool = False
+    bytes_read: int = 0
+
+
+def match_reload_line(line: str, outcomes: Dict[str, ReloadOutcome]) -> Optional[ReloadOutcome]:
+    """判断日志行是否为某个待等待插件的重载结果
+    
+    日志带有请求 ID 时提交的请求必须在其中（插件把合并进同一次重载的请求 ID 以逗号分隔全部记录）；
+    不带请求 ID 的 Auto-Reload 日志按插件 ID 匹配
+    
+    Args:
+        line: 日志行
+        outcomes: 插件 ID 到重载结果的映射
+    
+    Returns:
+        已更新的重载结果，不匹配时返回 None
+    """
+    success = RELOAD_SUCCESS_PATTERN.search(line)
+    failure = None if success else RELOAD_FAILURE_PATTERN.search(line)
+    match = success or failure
+    if not match:
+        return None
+    
+    outcome = outcomes.get(match.group(1))
+    if outcome is None or outcome.success is not None:
+        return None
+    
+    request = REQUEST_ID_PATTERN.search(line)
+    if request and outcome.request_id and outcome.request_id not in request.group(1).split(','):
+        return None
+    
+    outcome.success = success is not None
+    if success and success.group(2):
+        outcome.reload_ms = int(success.group(2))
+    outcome.message = line.strip()
+    return outcome
+
+
+async def wait_for_reloads(follower: LogFollower, request_ids: Dict[str, str],
+                           started_at: float, timeout: float,
+                           max_errors: int = 20) -> ReloadWaitResult:
+    """跟随日志直到所有插件的重载结果出现或超时
+    
+    Args:
+        follower: 已在触发前 start() 的跟随器
+        request_ids: 插件 ID 到请求 ID 的映射
+        started_at: 触发时刻（time.monotonic()）
+        timeout: 最长等待时间（秒）
+        max_errors: 最多收集的 ERROR 日志行数
+    
+    Returns:
+        等待结果
+    """
+    outcomes = {
+        plugin_id: ReloadOutcome(plugin_id, request_id)
+        for plugin_id, request_id in request_ids.items()
+    }
+    result = ReloadWaitResult(outcomes)
+    pending = len(outcomes)
+    
+    async with aclosing(follower.follow(timeout)) as lines:
+        async for line in lines:
+            if '[ERROR]' in line and len(result.errors) < max_errors:
+                result.errors.append(line.rstrip('\n'))
+            outcome = match_reload_line(line, outcomes)
+            if outcome is not None:
+                outcome.latency_ms = (time.monotonic() - started_at) * 1000
+                pending -= 1
+                if pending == 0:
+                    break
+    
+    result.timed_out = pending > 0
+    result.bytes_read = follower.bytes_read
+    return result
+
+
+def format_reload_wait_result(result: ReloadWaitResult, timeout: float) -> str:
+    """格式化等待重载的结果
+    
+    Args:
+        result: 等待结果
+        timeout: 超时时间（秒）
+    
+    Returns:
+        格式化的文本
+    """
+    text = f"🔄 插件重载结果\n{'━' * 60}\n"
+    for outcome in result.outcomes.values():
+        request = f" (请求 ID: {outcome.request_id})" if outcome.request_id else ""
+        if outcome.success is None:
+            text += f"⏱️ 等待超时（{timeout:g}s）：未在日志中看到 {outcome.plugin_id} 的重载结果{request}\n"
+            continue
+        icon = "✅ 插件已重载" if outcome.success else "❌ 重载失败"
+        text += f"{icon}: {outcome.plugin_id}{request}\n"
+        text += f"   ⏱️ 端到端延迟: {outcome.latency_ms:.0f}ms"
+        if outcome.reload_ms is not None:
+            text += f"（插件内重载用时 {outcome.reload_ms}ms）"
+        text += "\n"
+        if not outcome.success:
+            text += f"   📝 {outcome.message}\n"
+    
+    if result.errors:
+        text += f"\n⚠️ 重载期间的错误日志 ({len(result.errors)} 条):\n"
+        for line in result.errors:
+            text += f"  {line}\n"
+    else:
+        text += "\n✅ 重载期间无错误日志\n"
+    
+    if result.timed_out:
+        text += "\n💡 插件可能未运行或未启用 MCP 配置监听，可稍后用 read_logs 查看\n"
+    
+    text += f"{'━' * 60}"
+    return text
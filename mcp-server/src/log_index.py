@@ -0,0 +1,556 @@
+"""
+日志索引模块
+
+为日志文件建立持久化的增量索引，供同一日志的多个服务进程共享：
+- 聚合统计：总行数、各级别行数、首条/末条日志时间（get_log_summary 不再全量扫描）
+
+索引文件位于 ~/.obsidian-logger/index/<id>.idx，只有一个固定长度的头部。
+多个进程通过锁文件选举唯一的写入者（flock / msvcrt 非阻塞锁，写入者退出后其他进程自动接管），
+写入者增量扫描新追加的行并原地更新索引；其他进程只读映射（mmap）索引文件，
+通过头部的代数（generation）以顺序锁方式读取一致的快照，只需自行统计索引之后尚未覆盖的少量内容。
+日志被轮转或清空时写入者重置索引
+"""
+
+import os
+import re
+import time
+import mmap
+import zlib
+import struct
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from tail_reader import decode_lines
+from log_cursor import line_start_before
+from file_monitor import FileChangeEvent, HEAD_CHECKSUM_BYTES
+
+try:
+    import fcntl
+except ImportError:  # Windows 使用 msvcrt 文件锁
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser('~'), '.obsidian-logger', 'index')
+
+# 写入者每次最多读取的字节数（每读完一块发布一次进度）
+INDEX_BLOCK_SIZE = 4 * 1024 * 1024
+
+INDEX_MAGIC = b'OLIX'
+INDEX_VERSION = 2
+
+# 头部：魔数、版本、代数、inode、文件头长度和校验和、已索引字节数、总行数、可解析行数、
+# LOG/ERROR/WARN/DEBUG 行数、首条和末条日志时间
+_HEADER_STRUCT = struct.Struct('>4sH2xQQHIQQQQQQQ12s12s')
+_GENERATION_OFFSET = 8
+HEADER_SIZE = 256
+
+LEVELS = ('LOG', 'ERROR', 'WARN', 'DEBUG')
+
+# 日志格式：[HH:MM:SS.mmm] [LEVEL] message（与 LogManager.LOG_PATTERN 一致）
+LOG_PATTERN = re.compile(r'\[(\d{2}:\d{2}:\d{2}\.\d{3})\]\s+\[(\w+)\]\s+(.*)')
+
+
+@dataclass
+class IndexAggregates:
+    """聚合统计"""
+    total_lines: int = 0
+    parsed_lines: int = 0
+    level_counts: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(LEVELS, 0))
+    first_time: Optional[str] = None
+    last_time: Optional[str] = None
+    
+    def add_line(self, text: str) -> Optional[str]:
+        """统计一行
+        
+        Args:
+            text: 解码后的日志行
+        
+        Returns:
+            该行的时间戳，无法解析时返回 None
+        """
+        self.total_lines += 1
+        match = LOG_PATTERN.match(text)
+        if not match:
+            return None
+        timestamp, level = match.group(1), match.group(2)
+        self.parsed_lines += 1
+        if level in self.level_counts:
+            self.level_counts[level] += 1
+        if self.first_time is None:
+            self.first_time = timestamp
+        self.last_time = timestamp
+        return timestamp
+    
+    def merge(self, later: 'IndexAggregates') -> 'IndexAggregates':
+        """合并之后一段内容的统计
+        
+        Args:
+            later: 紧接在本段之后的统计
+        
+        Returns:
+            合并后的新统计
+        """
+        return IndexAggregates(
+            total_lines=self.total_lines + later.total_lines,
+            parsed_lines=self.parsed_lines + later.parsed_lines,
+            level_counts={level: self.level_counts[level] + later.level_counts[level] for level in LEVELS},
+            first_time=self.first_time or later.first_time,
+            last_time=later.last_time or self.last_time
+        )
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """索引头部的一致快照"""
+    generation: int
+    inode: int
+    head_length: int
+    head_checksum: int
+    indexed_offset: int
+    aggregates: IndexAggregates
+
+
+def index_path_for(log_file_path: str, index_dir: Optional[str] = None) -> str:
+    """日志文件对应的索引文件路径
+    
+    Args:
+        log_file_path: 日志文件路径
+        index_dir: 索引目录，None 表示 ~/.obsidian-logger/index
+    
+    Returns:
+        索引文件路径
+    """
+    key = os.path.realpath(log_file_path).encode('utf-8')
+    name = hashlib.blake2b(key, digest_size=8).hexdigest()
+    return os.path.join(index_dir or DEFAULT_INDEX_DIR, f'{name}.idx')
+
+
+def scan_aggregates(f, start: int, end: Optional[int] = None, progress=None) -> IndexAggregates:
+    """统计 [start, end) 的内容（end 为 None 时到文件末尾，包括未以换行结尾的残行）
+    
+    Args:
+        f: 以二进制模式打开的文件对象
+        start: 起始偏移量（位于行首）
+        end: 结束偏移量
+        progress: 扫描进度（ScanProgress），到达截止时间时只返回已扫描的完整行的统计
+    
+    Returns:
+        聚合统计
+    """
+    aggregates = IndexAggregates()
+    f.seek(start)
+    remaining = None if end is None else end - start
+    position = start
+    pending = b''
+    while remaining is None or remaining > 0:
+        block = f.read(INDEX_BLOCK_SIZE if remaining is None else min(INDEX_BLOCK_SIZE, remaining))
+        if not block:
+            break
+        if remaining is not None:
+            remaining -= len(block)
+        data = pending + block
+        cut = data.rfind(b'\n') + 1
+        pending = data[cut:]
+        for text in decode_lines(data[:cut]):
+            aggregates.add_line(text)
+        position += cut
+        if progress is not None and position < progress.total and not progress.advance(position):
+            return aggregates
+    for text in decode_lines(pending):
+        aggregates.add_line(text)
+    if progress is not None:
+        progress.done = position + len(pending)
+    return aggregates
+
+
+def _try_lock(lock_file) -> bool:
+    """非阻塞地获取排他锁（进程退出时自动释放）"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class LogIndex:
+    """共享日志索引
+    
+    同一日志的多个进程各自创建 LogIndex，通过锁文件选出一个写入者；
+    非写入者每次查询时尝试接管（写入者退出后），否则只读共享索引
+    """
+    
+    def __init__(self, log_file_path: str, index_dir: Optional[str] = None):
+        """初始化索引
+        
+        Args:
+            log_file_path: 日志文件路径
+            index_dir: 索引目录
+        """
+        self.log_file_path = log_file_path
+        self.index_path = index_path_for(log_file_path, index_dir)
+        
+        self.is_writer = False
+        self._lock_file = None
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        
+        # 写入者在内存中维护的状态
+        self._state: Optional[IndexSnapshot] = None
+        # 正在进行的大批量更新：(最近发布的快照, 目标偏移量)，查询可不等待地读取部分结果
+        self._building: Optional[Tuple[IndexSnapshot, int]] = None
+        
+        self.updates = 0
+        self.indexed_bytes = 0
+        self.tail_bytes = 0
+        self.snapshot_retries = 0
+    
+    # ------------------------------------------------------------------
+    # 写入者选举和映射
+    # ------------------------------------------------------------------
+    
+    def elect(self) -> bool:
+        """尝试成为写入者
+        
+        Returns:
+            当前进程是否为写入者
+        """
+        # 切换映射期间持有 _lock，避免读取方使用已关闭的只读映射
+        with self._lock:
+            if self.is_writer:
+                return True
+            try:
+                os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+                lock_file = open(self.index_path + '.lock', 'a+b')
+            except OSError as e:
+                logger.warning(f"无法打开索引锁文件: {e}")
+                return False
+            if not _try_lock(lock_file):
+                lock_file.close()
+                return False
+            
+            self._lock_file = lock_file
+            self.is_writer = True
+            self._close_map()
+            self._open_writer()
+            logger.info(f"成为索引写入者: {self.index_path}")
+            return True
+    
+    def _open_writer(self) -> None:
+        """以读写方式打开索引文件，格式不符时重建"""
+        mode = 'r+b' if os.path.exists(self.index_path) else 'w+b'
+        self._file = open(self.index_path, mode)
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_SIZE:
+            self._file.truncate(HEADER_SIZE)
+            size = HEADER_SIZE
+        self._map = mmap.mmap(self._file.fileno(), size)
+        
+        snapshot = self._read_snapshot()
+        if snapshot is None:
+            snapshot = self._empty_snapshot(2)
+            self._publish(snapshot)
+        self._state = snapshot
+    
+    def _open_reader(self) -> bool:
+        """只读映射索引文件"""
+        if self._map is not None:
+            return True
+        try:
+            size = os.path.getsize(self.index_path)
+        except OSError:
+            return False
+        if size < HEADER_SIZE:
+            return False
+        self._close_map()
+        self._file = open(self.index_path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return True
+    
+    def _close_map(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def close(self) -> None:
+        """关闭映射并释放写入者锁"""
+        with self._lock:
+            self._close_map()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+            self.is_writer = False
+    
+    # ------------------------------------------------------------------
+    # 头部读写（顺序锁）
+    # ------------------------------------------------------------------
+    
+    def _empty_snapshot(self, generation: int) -> IndexSnapshot:
+        return IndexSnapshot(generation, 0, 0, 0, 0, IndexAggregates())
+    
+    def _read_snapshot(self) -> Optional[IndexSnapshot]:
+        """读取一致的头部快照：代数为奇数（正在写入）或前后不一致时重试"""
+        for _ in range(1000):
+            generation = struct.unpack_from('>Q', self._map, _GENERATION_OFFSET)[0]
+            if generation % 2:
+                self.snapshot_retries += 1
+                continue
+            raw = self._map[:_HEADER_STRUCT.size]
+            if struct.unpack_from('>Q', self._map, _GENERATION_OFFSET)[0] != generation:
+                self.snapshot_retries += 1
+                continue
+            break
+        else:
+            return None
+        
+        (magic, version, generation, inode, head_length, head_checksum, indexed_offset,
+         total_lines, parsed_lines, log_count, error_count, warn_count, debug_count,
+         first_time, last_time) = _HEADER_STRUCT.unpack(raw)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            return None
+        aggregates = IndexAggregates(
+            total_lines, parsed_lines,
+            dict(zip(LEVELS, (log_count, error_count, warn_count, debug_count))),
+            first_time.rstrip(b'\0').decode('ascii') or None,
+            last_time.rstrip(b'\0').decode('ascii') or None
+        )
+        return IndexSnapshot(generation, inode, head_length, head_checksum, indexed_offset, aggregates)
+    
+    def _publish(self, snapshot: IndexSnapshot) -> None:
+        """写入新的头部（写入者）
+        
+        先把代数置为奇数，写完后置为新的偶数，读取方据此判断快照是否一致
+        """
+        aggregates = snapshot.aggregates
+        struct.pack_into('>Q', self._map, _GENERATION_OFFSET, snapshot.generation - 1)
+        _HEADER_STRUCT.pack_into(
+            self._map, 0, INDEX_MAGIC, INDEX_VERSION, snapshot.generation - 1,
+            snapshot.inode, snapshot.head_length, snapshot.head_checksum, snapshot.indexed_offset,
+            aggregates.total_lines, aggregates.parsed_lines,
+            *(aggregates.level_counts[level] for level in LEVELS),
+            (aggregates.first_time or '').encode('ascii'), (aggregates.last_time or '').encode('ascii')
+        )
+        struct.pack_into('>Q', self._map, _GENERATION_OFFSET, snapshot.generation)
+    
+    # ------------------------------------------------------------------
+    # 增量更新（写入者）
+    # ------------------------------------------------------------------
+    
+    def update(self, deadline: Optional[float] = None) -> bool:
+        """写入者：把新追加的完整行加入索引，日志被替换或清空时重置
+        
+        Args:
+            deadline: 绝对截止时间（time.monotonic()），到达后发布已索引的部分并返回，剩余内容留给下次更新
+        
+        Returns:
+            索引是否有变化
+        """
+        with self._lock:
+            if not self.is_writer:
+                return False
+            try:
+                return self._update(deadline)
+            except OSError as e:
+                logger.error(f"更新索引失败: {e}")
+                return False
+    
+    def _update(self, deadline: Optional[float]) -> bool:
+        state = self._state
+        try:
+            f = open(self.log_file_path, 'rb')
+        except FileNotFoundError:
+            return False
+        
+        with f:
+            st = os.fstat(f.fileno())
+            head = f.read(min(state.head_length, st.st_size)) if state.head_length else b''
+            if (st.st_ino != state.inode or st.st_size < state.indexed_offset
+                    or len(head) != state.head_length or zlib.crc32(head) != state.head_checksum):
+                # 日志被轮转、清空或重写：重置索引
+                state = IndexSnapshot(state.generation, st.st_ino, 0, 0, 0, IndexAggregates())
+            
+            end = line_start_before(f, st.st_size)
+            if end == state.indexed_offset and state is self._state:
+                return False
+            
+            if end - state.indexed_offset > INDEX_BLOCK_SIZE:
+                # 大批量更新（启动预热、长时间离线后追赶）：期间查询可读取部分结果
+                self._building = (state, end)
+            f.seek(state.indexed_offset)
+            try:
+                state = self._index_blocks(f, st.st_ino, state, end, deadline)
+            finally:
+                self._building = None
+        
+        self._state = state
+        self.updates += 1
+        return True
+    
+    def _index_blocks(self, f, inode: int, state: IndexSnapshot, end: int,
+                      deadline: Optional[float] = None) -> IndexSnapshot:
+        """从 state 的偏移量开始逐块建立索引到 end，每块发布一次
+        
+        Args:
+            f: 以二进制打开、已定位到 state.indexed_offset 的日志文件
+            inode: 日志文件的 inode
+            state: 起始状态
+            end: 目标偏移量（完整行的末尾）
+            deadline: 绝对截止时间，到达后在块边界停止
+        
+        Returns:
+            最终状态（到达截止时间时只覆盖到已发布的块）
+        """
+        offset = state.indexed_offset
+        aggregates = state.aggregates
+        while True:
+            block = f.read(min(INDEX_BLOCK_SIZE, end - offset))
+            while b'\n' not in block and offset + len(block) < end:
+                # 超长的行：继续读到行尾
+                block += f.read(min(INDEX_BLOCK_SIZE, end - offset - len(block)))
+            block = block[:block.rfind(b'\n') + 1]
+            chunk = IndexAggregates()
+            for raw in block.split(b'\n')[:-1]:
+                texts = decode_lines(raw + b'\n') if b'\r' in raw else [raw.decode('utf-8', errors='ignore')]
+                for text in texts:
+                    chunk.add_line(text)
+            position = offset + len(block)
+            
+            aggregates = aggregates.merge(chunk)
+            self.indexed_bytes += position - offset
+            offset = position
+            
+            f.seek(0)
+            head = f.read(min(offset, HEAD_CHECKSUM_BYTES))
+            f.seek(offset)
+            state = IndexSnapshot(state.generation + 2, inode, len(head), zlib.crc32(head),
+                                  offset, aggregates)
+            if self._building is not None:
+                self._building = (state, end)
+            self._publish(state)
+            if offset >= end or not block:
+                return state
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.debug(f"到达截止时间，索引暂停在 {offset}/{end} 字节")
+                return state
+    
+    def attach(self, monitor) -> None:
+        """写入者随文件变化事件即时更新索引（在监听线程中执行）
+        
+        Args:
+            monitor: 文件监听器
+        """
+        def on_change(event: FileChangeEvent) -> None:
+            # 大批量更新进行中时跳过，新内容由下一次更新或查询补上
+            if self.is_writer and self._building is None:
+                self.update()
+        
+        monitor.subscribe(on_change)
+    
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    
+    def snapshot(self, deadline: Optional[float] = None) -> Optional[IndexSnapshot]:
+        """读取索引头部的一致快照（写入者先增量更新）
+        
+        Args:
+            deadline: 绝对截止时间，写入者的增量更新到达后停止；
+                大批量更新进行中时不等待，直接返回最近发布的快照
+        
+        Returns:
+            快照，索引不可用时返回 None
+        """
+        if not self.is_writer:
+            self.elect()
+        if self.is_writer:
+            building = self._building
+            if building is not None and deadline is not None:
+                return building[0]
+            self.update(deadline)
+            return self._state
+        with self._lock:
+            if not self._open_reader():
+                return None
+            return self._read_snapshot()
+    
+    def aggregates(self, progress=None) -> Optional[IndexAggregates]:
+        """整个日志文件的聚合统计：索引覆盖的部分直接取用，之后的少量内容现场统计
+        
+        Args:
+            progress: 扫描进度（ScanProgress），到达截止时间时只统计到已扫描的位置
+        
+        Returns:
+            聚合统计，日志文件不存在时返回 None
+        """
+        snapshot = self.snapshot(progress.deadline if progress is not None else None)
+        try:
+            f = open(self.log_file_path, 'rb')
+        except FileNotFoundError:
+            return None
+        
+        with f:
+            st = os.fstat(f.fileno())
+            base = IndexAggregates()
+            start = 0
+            if snapshot is not None and snapshot.inode == st.st_ino and st.st_size >= snapshot.indexed_offset:
+                head = f.read(snapshot.head_length)
+                if len(head) == snapshot.head_length and zlib.crc32(head) == snapshot.head_checksum:
+                    base, start = snapshot.aggregates, snapshot.indexed_offset
+            self.tail_bytes += st.st_size - start
+            if progress is not None:
+                progress.start(st.st_size, start)
+            return base.merge(scan_aggregates(f, start, progress=progress))
+    
+    def build_progress(self) -> Optional[Tuple[int, int]]:
+        """大批量更新的进度（不等待）
+        
+        Returns:
+            (已索引字节数, 目标字节数)，没有进行中的大批量更新时返回 None
+        """
+        building = self._building
+        if building is None:
+            return None
+        return building[0].indexed_offset, building[1]
+    
+    def partial_aggregates(self) -> Optional[Tuple[IndexAggregates, int, int]]:
+        """大批量更新进行中时，已索引部分的聚合统计（不等待、不扫描剩余内容）
+        
+        Returns:
+            (聚合统计, 已索引字节数, 目标字节数)，没有进行中的大批量更新时返回 None
+        """
+        building = self._building
+        if building is None:
+            return None
+        snapshot, end = building
+        return snapshot.aggregates, snapshot.indexed_offset, end
+    
+    def get_stats(self) -> dict:
+        """获取索引统计信息
+        
+        Returns:
+            统计字典
+        """
+        return {
+            'index_path': self.index_path,
+            'is_writer': self.is_writer,
+            'updates': self.updates,
+            'building': self.build_progress() is not None,
+            'indexed_bytes': self.indexed_bytes,
+            'tail_bytes': self.tail_bytes,
+            'snapshot_retries': self.snapshot_retries
+        }
@@ -8,10 +8,19 @@ import os
 import re
 import time
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from tail_reader import decode_lines
+from cache import TailPage
+from log_index import LogIndex, IndexAggregates, scan_aggregates, INDEX_BLOCK_SIZE
+from scan_progress import ScanProgress
+from log_cursor import (
+    LogCursor, CursorRead, LogPage, make_cursor, cursor_from_head, read_since, read_page_before,
+    DEFAULT_MAX_BYTES, MAX_PAGE_LINES, MAX_PAGE_BYTES, MAX_SCAN_BYTES
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,13 +33,23 @@ class LogManager:
     # 日志格式：[HH:MM:SS.mmm] [LEVEL] message
     LOG_PATTERN = re.compile(r'\[(\d{2}:\d{2}:\d{2}\.\d{3})\]\s+\[(\w+)\]\s+(.*)')
     
-    def __init__(self, log_file_path: str):
+    def __init__(self, log_file_path: str, max_page_lines: int = MAX_PAGE_LINES,
+                 max_page_bytes: int = MAX_PAGE_BYTES, max_scan_bytes: int = MAX_SCAN_BYTES,
+                 index: Optional[LogIndex] = None):
         """初始化日志管理器
         
         Args:
             log_file_path: 日志文件路径
+            max_page_lines: read_logs 每页最多返回的行数
+            max_page_bytes: read_logs 每页最多返回的字节数
+            max_scan_bytes: read_logs 每页最多扫描的字节数（按级别过滤时）
+            index: 共享日志索引，None 时统计摘要全量扫描日志
         """
         self.log_file_path = log_file_path
+        self.max_page_lines = max_page_lines
+        self.max_page_bytes = max_page_bytes
+        self.max_scan_bytes = max_scan_bytes
+        self.index = index
         logger.info(f"日志管理器已初始化: {log_file_path}")
     
     def file_exists(self) -> bool:
@@ -61,12 +80,132 @@ class LogManager:
             return None
         return os.path.getmtime(self.log_file_path)
     
-    def read_logs(self, lines: int = 50, level: str = 'all') -> str:
+    def get_file_state(self) -> Optional[Tuple[int, int, int]]:
+        """获取文件状态，用于校验环形缓冲区是否与文件同步
+        
+        Returns:
+            (inode, 文件大小, mtime_ns)，如果文件不存在则返回 None
+        """
+        try:
+            st = os.stat(self.log_file_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+    
+    def format_logs(self, selected_lines: List[str], level: str = 'all') -> str:
+        """格式化日志行（添加头部信息）
+        
+        Args:
+            selected_lines: 要输出的日志行
+            level: 日志级别过滤（all/log/error/warn/debug）
+        
+        Returns:
+            日志内容字符串
+        """
+        header = f"📋 最近 {len(selected_lines)} 条日志"
+        if level.lower() != 'all':
+            header += f" (级别: {level.upper()})"
+        header += f"\n{'─' * 60}\n"
+        
+        return header + ''.join(selected_lines)
+    
+    def format_cursor(self, cursor: Optional[LogCursor]) -> str:
+        """格式化游标提示（附加在响应末尾）
+        
+        Args:
+            cursor: 游标
+        
+        Returns:
+            游标提示文本，cursor 为 None 时返回空字符串
+        """
+        if cursor is None:
+            return ""
+        return f"\n🔖 cursor: {cursor.encode()}（传回 cursor 参数只获取此后新增的内容）"
+    
+    def format_before(self, before: Optional[LogCursor]) -> str:
+        """格式化向前翻页的提示
+        
+        Args:
+            before: 本页第一行之前的游标，None 表示已到文件开头
+        
+        Returns:
+            提示文本
+        """
+        if before is None:
+            return "\n⬆️ 已到达日志开头"
+        return f"\n⬆️ before: {before.encode()}（传回 before 参数向前翻页，获取更早的日志）"
+    
+    @staticmethod
+    def _level_marker(level: str) -> Optional[bytes]:
+        """级别过滤对应的字节串，all 返回 None"""
+        if level.lower() == 'all':
+            return None
+        return f'[{level.upper()}]'.encode('ascii')
+    
+    def _page_size(self, lines: Optional[int]) -> Tuple[int, str]:
+        """按服务端上限确定每页行数
+        
+        Args:
+            lines: 请求的行数，None 表示使用上限
+        
+        Returns:
+            (实际行数, 超出上限时的说明文字)
+        """
+        if lines is None:
+            return self.max_page_lines, ""
+        lines = max(int(lines), 1)
+        if lines > self.max_page_lines:
+            return self.max_page_lines, (
+                f"\n⚠️ 每页最多 {self.max_page_lines} 行，已按 {self.max_page_lines} 行返回，"
+                f"传回 before 继续向前翻页"
+            )
+        return lines, ""
+    
+    def _page_notes(self, page: LogPage, requested: int) -> str:
+        """页未填满但还未到文件开头时的说明（达到字节或扫描上限）"""
+        if page.before is None or len(page.lines) >= requested:
+            return ""
+        if page.scanned_bytes >= self.max_scan_bytes:
+            return (f"\n📄 已向前扫描 {self._format_file_size(page.scanned_bytes)}，本页未填满，"
+                    f"传回 before 继续向前查找")
+        return f"\n📄 本页已达到 {self._format_file_size(self.max_page_bytes)} 上限，传回 before 继续向前翻页"
+    
+    def _read_all_lines(self) -> Tuple[List[str], Optional[LogCursor]]:
+        """读取整个文件
+        
+        Returns:
+            (行列表, 指向最后一个完整行之后的游标)
+        """
+        with open(self.log_file_path, 'rb') as f:
+            inode = os.fstat(f.fileno()).st_ino
+            data = f.read()
+            cursor = make_cursor(f, inode, data.rfind(b'\n') + 1)
+        return decode_lines(data), cursor
+    
+    def read_logs(self, lines: int = 50, level: str = 'all', with_cursor: bool = False) -> str:
         """读取日志内容
         
+        从文件末尾反向按块读取，只读取一页所需的内容
+        
         Args:
-            lines: 读取的行数（从文件末尾开始）
+            lines: 读取的行数（从文件末尾开始，不超过每页上限）
             level: 日志级别过滤（all/log/error/warn/debug）
+            with_cursor: 是否在末尾附加 before/cursor 游标
+        
+        Returns:
+            日志内容字符串
+        """
+        return self.read_logs_before(None, lines, level, with_cursor)
+    
+    def read_logs_before(self, token: Optional[str], lines: int = 50, level: str = 'all',
+                         with_cursor: bool = True) -> str:
+        """读取 before 游标之前的一页日志（向前翻页）
+        
+        Args:
+            token: 上一页的 before 游标，None 表示从文件末尾开始
+            lines: 每页行数（不超过每页上限）
+            level: 日志级别过滤（all/log/error/warn/debug）
+            with_cursor: 是否在末尾附加 before/cursor 游标
         
         Returns:
             日志内容字符串
@@ -74,35 +213,124 @@ class LogManager:
         if not self.file_exists():
             return "⚠️ 日志文件不存在"
         
+        page_lines, notes = self._page_size(lines)
         try:
-            # 读取文件末尾指定行数
-            with open(self.log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                all_lines = f.readlines()
-            
-            # 根据级别过滤
-            if level.lower() != 'all':
-                level_upper = level.upper()
-                filtered_lines = [
-                    line for line in all_lines
-                    if f'[{level_upper}]' in line
-                ]
-            else:
-                filtered_lines = all_lines
-            
-            # 取最后 N 行
-            selected_lines = filtered_lines[-lines:] if len(filtered_lines) > lines else filtered_lines
-            
-            # 添加头部信息
-            header = f"📋 最近 {len(selected_lines)} 条日志"
+            cursor = LogCursor.decode(token) if token else None
+            page = read_page_before(self.log_file_path, cursor, page_lines,
+                                    self._level_marker(level), self.max_page_bytes,
+                                    self.max_scan_bytes)
+        except ValueError as e:
+            return f"❌ {e}"
+        except Exception as e:
+            logger.error(f"读取日志失败: {e}")
+            return f"❌ 读取日志失败: {str(e)}"
+        if page is None:
+            return "⚠️ 日志文件不存在"
+        
+        if token:
+            header = f"📋 更早的 {len(page.lines)} 条日志"
             if level.lower() != 'all':
                 header += f" (级别: {level.upper()})"
-            header += f"\n{'─' * 60}\n"
-            
-            return header + ''.join(selected_lines)
+            result = f"{header}\n{'─' * 60}\n"
+            if page.source:
+                result += f"🔄 日志已轮转，以下内容来自旧文件 {os.path.basename(page.source)}\n"
+            result += ''.join(page.lines)
+        else:
+            result = self.format_logs(page.lines, level)
+        
+        result += notes + self._page_notes(page, page_lines)
+        if with_cursor:
+            result += self.format_before(page.before) + self.format_cursor(page.after)
+        return result
+    
+    def format_tail_page(self, page: TailPage, level: str,
+                         state: Tuple[int, int, int]) -> Optional[str]:
+        """格式化来自环形缓冲区的末尾日志，用缓冲区记录的行位置生成 before 游标（不读取文件）
+        
+        Args:
+            page: 环形缓冲区中的末尾日志页
+            level: 日志级别过滤
+            state: 环形缓冲区对应的文件状态
+        
+        Returns:
+            日志内容字符串；行位置未知或超出每页字节上限时返回 None（应从文件读取）
+        """
+        if page.head is None or not page.lines or any(span is None for span in page.spans):
+            return None
+        if len(page.lines) > 1 and sum(length for _, length in page.spans) > self.max_page_bytes:
+            return None
+        
+        inode, end = state[0], state[1]
+        start = page.spans[0][0]
+        before = None
+        if start > 0 and not page.exhausted:
+            before = cursor_from_head(inode, start, page.head)
+        after = cursor_from_head(inode, end, page.head)
+        return self.format_logs(page.lines, level) + self.format_before(before) + self.format_cursor(after)
+    
+    def _read_since(self, token: str, max_bytes: int, max_lines: Optional[int] = None,
+                    level: str = 'all') -> Tuple[CursorRead, str]:
+        """按游标增量读取
+        
+        Args:
+            token: 游标字符串
+            max_bytes: 本次最多返回的字节数
+            max_lines: 本次最多返回的行数，None 表示不限
+            level: 日志级别过滤
+        
+        Returns:
+            (读取结果, 轮转/清空的说明文字)
+        
+        Raises:
+            ValueError: 游标无效
+        """
+        cursor = LogCursor.decode(token)
+        read = read_since(self.log_file_path, cursor, max_bytes, max_lines,
+                          self._level_marker(level), self.max_scan_bytes)
+        notes = ""
+        if read.rotated_from:
+            notes += f"🔄 日志已轮转，已读完旧文件 {os.path.basename(read.rotated_from)} 的剩余部分\n"
+        if read.gap:
+            notes += "⚠️ 日志文件已被替换且找不到旧文件，期间的日志可能丢失\n"
+        elif read.reset:
+            notes += "⚠️ 日志已被清空，从新文件开头读取\n"
+        return read, notes
+    
+    def read_logs_since(self, token: str, level: str = 'all',
+                        max_bytes: Optional[int] = None, lines: Optional[int] = None) -> str:
+        """读取游标之后新增的日志（向后翻页）
+        
+        Args:
+            token: 上次响应中的游标
+            level: 日志级别过滤（all/log/error/warn/debug）
+            max_bytes: 本次最多返回的字节数，None 表示每页字节上限
+            lines: 本次最多返回的行数，None 表示每页行数上限
         
+        Returns:
+            日志内容字符串（末尾附加 before 和新的游标）
+        """
+        if not self.file_exists():
+            return "⚠️ 日志文件不存在"
+        
+        max_bytes = self.max_page_bytes if max_bytes is None else max_bytes
+        page_lines, _ = self._page_size(lines)
+        try:
+            read, notes = self._read_since(token, max_bytes, page_lines, level)
+        except ValueError as e:
+            return f"❌ {e}"
         except Exception as e:
-            logger.error(f"读取日志失败: {e}")
+            logger.error(f"增量读取日志失败: {e}")
             return f"❌ 读取日志失败: {str(e)}"
+        
+        header = f"📋 自上次读取以来新增 {len(read.lines)} 条日志"
+        if level.lower() != 'all':
+            header += f" (级别: {level.upper()})"
+        result = f"{header}\n{'─' * 60}\n{notes}" + ''.join(read.lines)
+        if read.more:
+            result += "\n📄 新增内容超过每页上限，本次只返回一部分，传回新的 cursor 继续读取"
+        if read.before is not None and read.before.offset > 0:
+            result += self.format_before(read.before)
+        return result + self.format_cursor(read.cursor)
     
     def parse_log_line(self, line: str) -> Optional[Tuple[str, str, str]]:
         """解析日志行
@@ -118,9 +346,86 @@ class LogManager:
             return match.group(1), match.group(2), match.group(3)
         return None
     
-    def get_summary(self) -> str:
+    def _get_aggregates(self, progress: Optional[ScanProgress] = None) -> IndexAggregates:
+        """获取整个日志的聚合统计：有索引时只统计索引之后的新内容，否则全量扫描
+        
+        Args:
+            progress: 扫描进度，到达截止时间时只统计已扫描的部分
+        
+        Returns:
+            聚合统计
+        """
+        if self.index is not None:
+            aggregates = self.index.aggregates(progress)
+            if aggregates is not None:
+                return aggregates
+        with open(self.log_file_path, 'rb') as f:
+            if progress is not None:
+                progress.start(os.fstat(f.fileno()).st_size)
+            return scan_aggregates(f, 0, progress=progress)
+    
+    def iter_lines(self, progress: Optional[ScanProgress] = None) -> Iterator[str]:
+        """逐块读取整个日志并逐行返回
+        
+        Args:
+            progress: 扫描进度，到达截止时间后停止（只返回已读取的完整行）
+        
+        Yields:
+            日志行（包含换行符）
+        """
+        with open(self.log_file_path, 'rb') as f:
+            if progress is not None:
+                progress.start(os.fstat(f.fileno()).st_size)
+            position = 0
+            pending = b''
+            while True:
+                block = f.read(INDEX_BLOCK_SIZE)
+                if not block:
+                    break
+                data = pending + block
+                cut = data.rfind(b'\n') + 1
+                pending = data[cut:]
+                yield from decode_lines(data[:cut])
+                position += cut
+                if progress is not None and position < progress.total and not progress.advance(position):
+                    return
+            yield from decode_lines(pending)
+            if progress is not None:
+                progress.done = position + len(pending)
+    
+    def format_partial(self, progress: Optional[ScanProgress]) -> str:
+        """到达截止时间时的覆盖范围说明
+        
+        Args:
+            progress: 扫描进度
+        
+        Returns:
+            说明文本（以换行开头），扫描已完成时返回空字符串
+        """
+        if progress is None or not progress.expired:
+            return ""
+        percent = progress.done / progress.total * 100 if progress.total else 100
+        reason = f"已到达截止时间（{progress.deadline_ms} ms）" if progress.deadline_ms is not None else "已停止扫描"
+        return (f"\n⏱️ {reason}，以上为部分结果："
+                f"只扫描了前 {self._format_file_size(progress.done)} / {self._format_file_size(progress.total)}"
+                f"（{percent:.0f}%）")
+    
+    def index_building(self) -> bool:
+        """日志索引是否正在大批量更新（启动预热或追赶大量新内容）
+        
+        Returns:
+            是否正在更新
+        """
+        return self.index is not None and self.index.build_progress() is not None
+    
+    def get_summary(self, allow_partial: bool = False, progress: Optional[ScanProgress] = None) -> str:
         """获取日志统计摘要
         
+        Args:
+            allow_partial: 索引正在大批量更新时，是否立即返回已索引部分的统计（标注覆盖范围）
+                而不是等待更新完成
+            progress: 扫描进度，到达截止时间时返回已扫描部分的统计（标注覆盖范围）
+        
         Returns:
             格式化的统计摘要
         """
@@ -128,18 +433,21 @@ class LogManager:
             return "⚠️ 日志文件不存在"
         
         try:
-            # 读取文件
-            with open(self.log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            # 统计信息
-            total_lines = len(lines)
-            level_counts = defaultdict(int)
-            first_time = None
-            last_time = None
+            partial = self.index.partial_aggregates() if allow_partial and self.index is not None else None
+            if partial is not None:
+                aggregates, indexed, target = partial
+                coverage = (f"\n⏳ 索引预热中：以上统计只覆盖前 {self._format_file_size(indexed)} / "
+                            f"{self._format_file_size(target)}（{indexed / target * 100:.0f}%），稍后再次查询可获得完整结果")
+            else:
+                aggregates = self._get_aggregates(progress)
+                coverage = self.format_partial(progress)
+            total_lines = aggregates.total_lines
+            level_counts = aggregates.level_counts
+            first_time = aggregates.first_time
+            last_time = aggregates.last_time
             
             # 如果文件为空，返回特殊提示
-            if total_lines == 0:
+            if total_lines == 0 and not coverage:
                 file_size = self.get_file_size()
                 size_str = self._format_file_size(file_size)
                 mtime = self.get_file_mtime()
@@ -157,16 +465,6 @@ class LogManager:
 {'━' * 60}
 """.strip()
             
-            for line in lines:
-                parsed = self.parse_log_line(line)
-                if parsed:
-                    timestamp, level, message = parsed
-                    level_counts[level] += 1
-                    
-                    if first_time is None:
-                        first_time = timestamp
-                    last_time = timestamp
-            
             # 计算统计数据
             log_count = level_counts.get('LOG', 0)
             error_count = level_counts.get('ERROR', 0)
@@ -174,6 +472,8 @@ class LogManager:
             debug_count = level_counts.get('DEBUG', 0)
             
             error_rate = (error_count / total_lines * 100) if total_lines > 0 else 0
+            # 部分结果可能还没有统计到任何行
+            percent_base = total_lines or 1
             
             # 文件信息
             file_size = self.get_file_size()
@@ -192,17 +492,17 @@ class LogManager:
 ⏱️ 最后更新：{time_str}
 
 📝 日志级别分布：
-├─ 🔵 普通日志（LOG）：{log_count:,} ({(log_count/total_lines*100):.1f}%)
-├─ 🟡 警告日志（WARN）：{warn_count:,} ({(warn_count/total_lines*100):.1f}%)
-├─ 🔴 错误日志（ERROR）：{error_count:,} ({(error_count/total_lines*100):.1f}%)
-└─ ⚪ 调试日志（DEBUG）：{debug_count:,} ({(debug_count/total_lines*100):.1f}%)
+├─ 🔵 普通日志（LOG）：{log_count:,} ({(log_count/percent_base*100):.1f}%)
+├─ 🟡 警告日志（WARN）：{warn_count:,} ({(warn_count/percent_base*100):.1f}%)
+├─ 🔴 错误日志（ERROR）：{error_count:,} ({(error_count/percent_base*100):.1f}%)
+└─ ⚪ 调试日志（DEBUG）：{debug_count:,} ({(debug_count/percent_base*100):.1f}%)
 
 📊 统计指标：
 ├─ 错误率：{error_rate:.2f}%
 ├─ 首条日志：{first_time or 'N/A'}
 └─ 末条日志：{last_time or 'N/A'}
 
-{'⚠️ 警告：错误率较高，建议检查' if error_rate > 5 else '✅ 日志状态良好'}
+{'⚠️ 警告：错误率较高，建议检查' if error_rate > 5 else '✅ 日志状态良好'}{coverage}
 {'━' * 60}
 """.strip()
             
@@ -212,12 +512,78 @@ class LogManager:
             logger.error(f"获取统计失败: {e}")
             return f"❌ 获取统计失败: {str(e)}"
     
-    def get_recent_errors(self, limit: int = 10, include_stack: bool = False) -> str:
+    def _extract_errors(self, lines: List[str], include_stack: bool,
+                        line_numbers: bool = True) -> List[Dict]:
+        """从日志行中提取错误
+        
+        Args:
+            lines: 日志行
+            include_stack: 是否包含堆栈信息
+            line_numbers: 行号是否为文件中的真实行号
+        
+        Returns:
+            错误信息列表
+        """
+        errors = []
+        for i, line in enumerate(lines):
+            if '[ERROR]' in line:
+                parsed = self.parse_log_line(line)
+                if parsed:
+                    timestamp, level, message = parsed
+                    error_info = {
+                        'timestamp': timestamp,
+                        'message': message,
+                        'line_num': i + 1 if line_numbers else None
+                    }
+                    
+                    # 如果需要堆栈信息，查找后续行
+                    if include_stack and i + 1 < len(lines):
+                        stack_lines = []
+                        for j in range(i + 1, min(i + 10, len(lines))):
+                            next_line = lines[j]
+                            # 如果下一行还是错误相关，添加到堆栈
+                            if not self.parse_log_line(next_line):
+                                stack_lines.append(next_line.strip())
+                            else:
+                                break
+                        if stack_lines:
+                            error_info['stack'] = '\n'.join(stack_lines)
+                    
+                    errors.append(error_info)
+        return errors
+    
+    def _format_errors(self, errors: List[Dict], include_stack: bool, header: str) -> str:
+        """格式化错误列表
+        
+        Args:
+            errors: 错误信息列表
+            include_stack: 是否包含堆栈信息
+            header: 标题
+        
+        Returns:
+            格式化的错误列表
+        """
+        result = f"{header}\n{'─' * 60}\n"
+        
+        for i, error in enumerate(errors, 1):
+            location = f" (行 {error['line_num']})" if error['line_num'] else ""
+            result += f"\n{i}. [{error['timestamp']}]{location}\n"
+            result += f"   {error['message']}\n"
+            if include_stack and 'stack' in error:
+                result += f"   堆栈:\n"
+                for stack_line in error['stack'].split('\n'):
+                    result += f"     {stack_line}\n"
+        
+        return result
+    
+    def get_recent_errors(self, limit: int = 10, include_stack: bool = False,
+                          with_cursor: bool = False) -> str:
         """获取最近的错误日志
         
         Args:
             limit: 返回的错误数量
             include_stack: 是否包含堆栈信息
+            with_cursor: 是否在末尾附加游标
         
         Returns:
             格式化的错误列表
@@ -226,66 +592,72 @@ class LogManager:
             return "⚠️ 日志文件不存在"
         
         try:
-            with open(self.log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
+            lines, cursor = self._read_all_lines()
             
             # 提取错误日志
-            errors = []
-            for i, line in enumerate(lines):
-                if '[ERROR]' in line:
-                    parsed = self.parse_log_line(line)
-                    if parsed:
-                        timestamp, level, message = parsed
-                        error_info = {
-                            'timestamp': timestamp,
-                            'message': message,
-                            'line_num': i + 1
-                        }
-                        
-                        # 如果需要堆栈信息，查找后续行
-                        if include_stack and i + 1 < len(lines):
-                            stack_lines = []
-                            for j in range(i + 1, min(i + 10, len(lines))):
-                                next_line = lines[j]
-                                # 如果下一行还是错误相关，添加到堆栈
-                                if not self.parse_log_line(next_line):
-                                    stack_lines.append(next_line.strip())
-                                else:
-                                    break
-                            if stack_lines:
-                                error_info['stack'] = '\n'.join(stack_lines)
-                        
-                        errors.append(error_info)
+            errors = self._extract_errors(lines, include_stack)
             
             # 取最近的 N 个
             recent_errors = errors[-limit:] if len(errors) > limit else errors
             
             if not recent_errors:
-                return "✅ 未发现错误日志"
-            
-            # 格式化输出
-            header = f"🔴 最近 {len(recent_errors)} 个错误\n{'─' * 60}\n"
-            result = header
-            
-            for i, error in enumerate(recent_errors, 1):
-                result += f"\n{i}. [{error['timestamp']}] (行 {error['line_num']})\n"
-                result += f"   {error['message']}\n"
-                if include_stack and 'stack' in error:
-                    result += f"   堆栈:\n"
-                    for stack_line in error['stack'].split('\n'):
-                        result += f"     {stack_line}\n"
+                result = "✅ 未发现错误日志"
+            else:
+                result = self._format_errors(recent_errors, include_stack,
+                                             f"🔴 最近 {len(recent_errors)} 个错误")
             
+            if with_cursor:
+                result += self.format_cursor(cursor)
             return result
         
         except Exception as e:
             logger.error(f"获取错误日志失败: {e}")
             return f"❌ 获取错误日志失败: {str(e)}"
     
-    def analyze_errors(self, time_range_hours: int = 24) -> str:
+    def get_errors_since(self, token: str, limit: int = 10, include_stack: bool = False,
+                         max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+        """获取游标之后新增的错误日志
+        
+        Args:
+            token: 上次响应中的游标
+            limit: 返回的错误数量（取最近的）
+            include_stack: 是否包含堆栈信息
+            max_bytes: 本次最多读取的字节数
+        
+        Returns:
+            格式化的错误列表（末尾附加新的游标）
+        """
+        if not self.file_exists():
+            return "⚠️ 日志文件不存在"
+        
+        try:
+            read, notes = self._read_since(token, max_bytes)
+        except ValueError as e:
+            return f"❌ {e}"
+        except Exception as e:
+            logger.error(f"增量获取错误日志失败: {e}")
+            return f"❌ 获取错误日志失败: {str(e)}"
+        
+        errors = self._extract_errors(read.lines, include_stack, line_numbers=False)
+        recent_errors = errors[-limit:] if len(errors) > limit else errors
+        
+        if not recent_errors:
+            result = f"{notes}✅ 自上次读取以来未发现新的错误日志"
+        else:
+            header = f"{notes}🔴 自上次读取以来新增 {len(errors)} 个错误"
+            if len(errors) > len(recent_errors):
+                header += f"（显示最近 {len(recent_errors)} 个）"
+            result = self._format_errors(recent_errors, include_stack, header)
+        if read.more:
+            result += f"\n📄 新增内容超过 {max_bytes} 字节，本次只检查了一部分，传回新的 cursor 继续读取"
+        return result + self.format_cursor(read.cursor)
+    
+    def analyze_errors(self, time_range_hours: int = 24, progress: Optional[ScanProgress] = None) -> str:
         """深度错误分析
         
         Args:
             time_range_hours: 分析的时间范围（小时）
+            progress: 扫描进度，到达截止时间时返回已扫描部分的分析（标注覆盖范围）
         
         Returns:
             格式化的分析报告
@@ -294,15 +666,12 @@ class LogManager:
             return "⚠️ 日志文件不存在"
         
         try:
-            with open(self.log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
             # 错误分类统计
             error_patterns = defaultdict(int)
             error_examples = defaultdict(list)
             total_errors = 0
             
-            for line in lines:
+            for line in self.iter_lines(progress):
                 if '[ERROR]' in line:
                     total_errors += 1
                     parsed = self.parse_log_line(line)
@@ -321,7 +690,7 @@ class LogManager:
                             })
             
             if total_errors == 0:
-                return "✅ 分析范围内未发现错误"
+                return "✅ 分析范围内未发现错误" + self.format_partial(progress)
             
             # 生成报告
             report = f"""
@@ -353,7 +722,7 @@ class LogManager:
                     for suggestion in suggestions:
                         report += f"  • {suggestion}\n"
             
-            report += f"{'━' * 60}"
+            report += f"{'━' * 60}" + self.format_partial(progress)
             
             return report
         
@@ -0,0 +1,329 @@
+"""
+日志资源模块
+
+把调试日志以 MCP 资源的形式提供给客户端，并支持订阅：
+- obsidian-log://debug             完整日志
+- obsidian-log://errors            只含 ERROR 级别的日志
+- obsidian-log://source/{source}   只含指定来源的日志（级别之后的 [Source] 前缀，如 [Auto-Reload]）
+
+读取资源返回末尾一页，并在 _meta 中附带 cursor/before 游标；URI 带 ?cursor= 时只返回此后新增的行，
+带 ?before= 时向前翻页，多仓库时用 ?vault= 选择仓库。订阅后由文件变化事件驱动发送 resources/updated 通知：只在视图确有新的匹配行
+（或日志被轮转、清空）时通知，两次通知之间至少间隔 min_interval，期间的写入合并为一次通知
+"""
+
+import re
+import asyncio
+import logging
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+from pydantic import AnyUrl
+
+from log_manager import LogManager
+from file_monitor import FileMonitor
+from log_cursor import LogCursor, LineMarker, cursor_at_end, read_since, read_page_before
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_SCHEME = 'obsidian-log'
+DEBUG_URI = f'{RESOURCE_SCHEME}://debug'
+ERRORS_URI = f'{RESOURCE_SCHEME}://errors'
+SOURCE_URI_TEMPLATE = f'{RESOURCE_SCHEME}://source/{{source}}'
+
+# 日志行中的来源前缀：[HH:MM:SS.mmm] [LEVEL] [Source] message
+SOURCE_PATTERN = re.compile(r'^\[[^\]]*\]\s+\[\w+\]\s+\[([^\[\]]+)\]')
+
+# 不带游标读取资源时返回的行数（不超过每页上限）
+DEFAULT_RESOURCE_LINES = 200
+
+# 两次 resources/updated 通知之间的最小间隔（秒）
+DEFAULT_MIN_NOTIFY_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class LogView:
+    """日志视图（一个资源）"""
+    uri: str
+    name: str
+    description: str
+    marker: Optional[LineMarker] = None
+
+
+def source_view(source: str) -> LogView:
+    """指定来源的日志视图
+    
+    Args:
+        source: 来源名称（不含方括号），如 Auto-Reload
+    
+    Returns:
+        日志视图
+    """
+    marker = re.compile(rb'^\[[^\]]*\]\s+\[\w+\]\s+\[' + re.escape(source.encode('utf-8')) + rb'\]')
+    return LogView(
+        uri=f'{RESOURCE_SCHEME}://source/{quote(source, safe="")}',
+        name=f'[{source}] 日志',
+        description=f'只包含来源为 [{source}] 的日志',
+        marker=marker
+    )
+
+
+DEBUG_VIEW = LogView(DEBUG_URI, 'Obsidian 调试日志', '插件输出的完整调试日志')
+ERRORS_VIEW = LogView(ERRORS_URI, 'Obsidian 错误日志', '只包含 ERROR 级别的日志', b'[ERROR]')
+
+
+def vault_view(view: LogView, vault: str) -> LogView:
+    """指定仓库的日志视图（URI 带 ?vault= 查询参数，多仓库时使用）
+    
+    Args:
+        view: 日志视图
+        vault: 仓库名称
+    
+    Returns:
+        日志视图
+    """
+    return replace(view, uri=f'{view.uri}?vault={quote(vault, safe="")}', name=f'{view.name}（{vault}）')
+
+
+def parse_view_uri(uri: str) -> Tuple[LogView, Dict[str, str]]:
+    """解析资源 URI
+    
+    Args:
+        uri: 资源 URI，可带 cursor/before/vault 查询参数
+    
+    Returns:
+        (日志视图, 查询参数)
+    
+    Raises:
+        ValueError: 未知的资源
+    """
+    parts = urlsplit(str(uri))
+    query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+    if parts.scheme == RESOURCE_SCHEME:
+        if parts.netloc == 'debug' and parts.path in ('', '/'):
+            return DEBUG_VIEW, query
+        if parts.netloc == 'errors' and parts.path in ('', '/'):
+            return ERRORS_VIEW, query
+        source = unquote(parts.path.lstrip('/'))
+        if parts.netloc == 'source' and source and '/' not in source:
+            return source_view(source), query
+    raise ValueError(f"未知的资源: {uri}")
+
+
+def recent_sources(log_manager: LogManager, lines: int = 1000) -> List[str]:
+    """列出日志末尾出现过的来源（按出现次数排序）
+    
+    Args:
+        log_manager: 日志管理器
+        lines: 检查的行数
+    
+    Returns:
+        来源名称列表
+    """
+    page = read_page_before(log_manager.log_file_path, None, lines,
+                            max_bytes=log_manager.max_page_bytes * 4,
+                            max_scan=log_manager.max_scan_bytes)
+    counts: Dict[str, int] = {}
+    for line in page.lines if page else []:
+        match = SOURCE_PATTERN.match(line)
+        if match:
+            counts[match.group(1)] = counts.get(match.group(1), 0) + 1
+    return sorted(counts, key=lambda source: -counts[source])
+
+
+def read_view(log_manager: LogManager, uri: str) -> Tuple[str, Dict[str, Any]]:
+    """读取资源内容
+    
+    Args:
+        log_manager: 日志管理器（提供日志路径和每页上限）
+        uri: 资源 URI
+    
+    Returns:
+        (日志文本, _meta 元数据)
+    
+    Raises:
+        ValueError: 资源或游标无效
+    """
+    view, query = parse_view_uri(uri)
+    path = log_manager.log_file_path
+    
+    if query.get('cursor'):
+        read = read_since(path, LogCursor.decode(query['cursor']), log_manager.max_page_bytes,
+                          log_manager.max_page_lines, view.marker, log_manager.max_scan_bytes)
+        meta: Dict[str, Any] = {
+            'cursor': read.cursor.encode() if read.cursor else None,
+            'more': read.more
+        }
+        if read.reset:
+            meta['reset'] = True
+        if read.gap:
+            meta['gap'] = True
+        return ''.join(read.lines), meta
+    
+    before = LogCursor.decode(query['before']) if query.get('before') else None
+    page = read_page_before(path, before, min(DEFAULT_RESOURCE_LINES, log_manager.max_page_lines),
+                            view.marker, log_manager.max_page_bytes, log_manager.max_scan_bytes)
+    if page is None:
+        return '', {'cursor': None, 'before': None}
+    return ''.join(page.lines), {
+        'cursor': page.after.encode() if page.after else None,
+        'before': page.before.encode() if page.before else None
+    }
+
+
+class ResourceSubscriptions:
+    """资源订阅管理
+    
+    记录每个资源的订阅会话；后台任务等待文件变化事件（没有监听器时定时检查），
+    按最小间隔合并后检查各视图自上次通知以来是否有新的匹配行，有则向订阅会话发送 resources/updated
+    """
+    
+    def __init__(self, log_manager: LogManager, monitor: Optional[FileMonitor] = None,
+                 min_interval: float = DEFAULT_MIN_NOTIFY_INTERVAL):
+        """初始化订阅管理
+        
+        Args:
+            log_manager: 日志管理器
+            monitor: 文件监听器，运行中时由其变化事件驱动
+            min_interval: 两次通知之间的最小间隔（秒），同时是没有监听器时的检查间隔
+        """
+        self.log_manager = log_manager
+        self.monitor = monitor
+        self.min_interval = min_interval
+        
+        # 资源 URI -> 订阅会话；资源 URI -> 上次检查到的位置
+        self._subscribers: Dict[str, Set[Any]] = {}
+        self._positions: Dict[str, Optional[LogCursor]] = {}
+        self._task: Optional[asyncio.Task] = None
+        
+        self.notifications_sent = 0
+        self.coalesced_changes = 0
+    
+    def subscribe(self, uri: str, session: Any) -> None:
+        """订阅资源（需在事件循环中调用）
+        
+        Args:
+            uri: 资源 URI
+            session: 接收通知的会话（ServerSession）
+        
+        Raises:
+            ValueError: 未知的资源
+        """
+        uri = str(uri)
+        parse_view_uri(uri)
+        if uri not in self._subscribers:
+            self._subscribers[uri] = set()
+            self._positions[uri] = cursor_at_end(self.log_manager.log_file_path)
+        self._subscribers[uri].add(session)
+        
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    def unsubscribe(self, uri: str, session: Any) -> None:
+        """取消订阅
+        
+        Args:
+            uri: 资源 URI
+            session: 订阅时的会话
+        """
+        uri = str(uri)
+        sessions = self._subscribers.get(uri)
+        if sessions is None:
+            return
+        sessions.discard(session)
+        if not sessions:
+            del self._subscribers[uri]
+            self._positions.pop(uri, None)
+        if not self._subscribers:
+            self.stop()
+    
+    def stop(self) -> None:
+        """停止后台通知任务"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    def _has_update(self, uri: str) -> bool:
+        """检查视图自上次检查以来是否有新的匹配行，并推进检查位置"""
+        path = self.log_manager.log_file_path
+        position = self._positions.get(uri)
+        if position is None:
+            self._positions[uri] = cursor_at_end(path)
+            return self._positions[uri] is not None
+        
+        view, _ = parse_view_uri(uri)
+        read = read_since(path, position, max_lines=1, marker=view.marker,
+                          max_scan=self.log_manager.max_scan_bytes)
+        if read.cursor is None:
+            return False
+        changed = bool(read.lines) or read.reset or read.rotated_from is not None
+        # 有更新时直接跳到末尾：内容由客户端带游标读取，这里不必逐行检查
+        self._positions[uri] = cursor_at_end(path) if changed else read.cursor
+        return changed
+    
+    async def _notify(self) -> None:
+        """向有更新的资源的订阅会话发送通知"""
+        for uri, sessions in list(self._subscribers.items()):
+            try:
+                if not self._has_update(uri):
+                    continue
+            except Exception as e:
+                logger.error(f"检查资源更新失败: {uri}: {e}")
+                continue
+            for session in list(sessions):
+                try:
+                    await session.send_resource_updated(AnyUrl(uri))
+                    self.notifications_sent += 1
+                except Exception as e:
+                    # 会话已断开
+                    logger.info(f"发送资源更新通知失败，移除订阅: {uri}: {e}")
+                    sessions.discard(session)
+            if not sessions:
+                self._subscribers.pop(uri, None)
+                self._positions.pop(uri, None)
+    
+    async def _run(self) -> None:
+        """后台任务：等待变化，按最小间隔合并后发送通知"""
+        loop = asyncio.get_running_loop()
+        stream = None
+        if self.monitor is not None and self.monitor.is_running():
+            stream = self.monitor.open_stream()
+        
+        last_sent = float('-inf')
+        try:
+            while self._subscribers:
+                if stream is None:
+                    await asyncio.sleep(self.min_interval)
+                else:
+                    try:
+                        await stream.__anext__()
+                    except StopAsyncIteration:
+                        # 监听器已停止，改为定时检查
+                        stream = None
+                        continue
+                
+                delay = last_sent + self.min_interval - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if stream is not None:
+                    # 等待期间到达的变化合并为一次通知
+                    self.coalesced_changes += len(stream.drain())
+                
+                await self._notify()
+                last_sent = loop.time()
+        finally:
+            if stream is not None:
+                stream.close()
+    
+    def get_stats(self) -> dict:
+        """获取订阅统计信息
+        
+        Returns:
+            统计字典
+        """
+        return {
+            'subscriptions': sum(len(sessions) for sessions in self._subscribers.values()),
+            'resources': sorted(self._subscribers),
+            'notifications_sent': self.notifications_sent,
+            'coalesced_changes': self.coalesced_changes
+        }
@@ -4,7 +4,7 @@ Obsidian Logger MCP Server
 
 为 Cursor IDE 提供日志分析和 Auto-Reload 管理工具接口
 
-工具列表（12个）：
+工具列表（13个）：
 【日志工具】
 1. read_logs: 读取日志内容
 2. get_log_summary: 获取统计摘要
@@ -20,13 +20,28 @@ Obsidian Logger MCP Server
 10. manage_watched_plugins: 管理监控插件列表
 11. trigger_plugin_reload: 手动触发插件重载
 12. get_reload_statistics: 获取重载统计
+
+【等待工具】
+13. wait_for_log: 等待匹配的新日志
+
+多仓库：每个工具都接受 vault 参数选择仓库（config.json 的 vaults 列表），
+报告类工具（get_log_summary/get_recent_errors/analyze_errors/get_reload_statistics）
+可用 vault="*" 在工作线程池中并行查询所有仓库
+
+资源（支持订阅，日志变化时推送 resources/updated）：
+- obsidian-log://debug: 完整日志
+- obsidian-log://errors: 错误日志
+- obsidian-log://source/{source}: 指定来源的日志
 """
 
+import re
 import sys
 import os
+import time
 import logging
 import asyncio
-from typing import Optional
+import contextlib
+from typing import Any, Callable, List, Optional
 
 # 添加 src 目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -35,6 +50,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 try:
     from mcp.server import Server
     from mcp.server.stdio import stdio_server
+    from mcp.server.lowlevel.helper_types import ReadResourceContents
     from mcp import types
 except ImportError:
     print("错误: 无法导入 MCP SDK，请运行: pip install mcp", file=sys.stderr)
@@ -45,6 +61,20 @@ from config_manager import ConfigManager
 from log_manager import LogManager
 from cache import LogCache
 from file_monitor import FileMonitor
+from log_cursor import MAX_PAGE_LINES, MAX_PAGE_BYTES, MAX_SCAN_BYTES
+from log_index import LogIndex
+from scan_progress import ScanProgress, deadline_from_ms
+from report_refresh import ReportRefresher, DEFAULT_SETTLE, DEFAULT_MAX_REPORTS
+from log_follower import (
+    LogFollower, make_line_filter, wait_for_line, wait_for_reloads, format_reload_wait_result
+)
+from vaults import VaultComponents, VaultRegistry, ALL_VAULTS, DEFAULT_FAN_OUT_WORKERS, PREWARM_ANALYSIS_HOURS
+from daemon import DaemonServer, daemon_paths, DEFAULT_IDLE_TIMEOUT
+from launcher import find_config_file, main
+from log_resources import (
+    ResourceSubscriptions, DEBUG_VIEW, ERRORS_VIEW, SOURCE_URI_TEMPLATE, DEFAULT_MIN_NOTIFY_INTERVAL,
+    source_view, vault_view, parse_view_uri, recent_sources, read_view
+)
 
 # 配置日志 - 只输出到 stderr（避免干扰 STDIO 通信）
 logging.basicConfig(
@@ -60,46 +90,94 @@ config_manager: Optional[ConfigManager] = None
 log_manager: Optional[LogManager] = None
 cache: Optional[LogCache] = None
 file_monitor: Optional[FileMonitor] = None
+subscriptions: Optional[ResourceSubscriptions] = None
+vaults: Optional[VaultRegistry] = None
 
+# 后台启动任务（握手完成或第一次请求时创建）
+startup_task: Optional[asyncio.Task] = None
 
-def find_config_file() -> Optional[str]:
-    """查找配置文件
+
+def create_vault_components(config_manager: ConfigManager) -> VaultComponents:
+    """为一个仓库创建组件（日志管理器、缓存、文件监听、资源订阅、日志索引）
+    
+    只创建对象，文件监听和索引写入者选举由 ensure_started 在握手完成后启动
     
-    按以下顺序查找:
-    1. 命令行参数指定的路径
-    2. 当前工作目录的 config.json
-    3. 用户主目录 ~/.obsidian-logger/config.json
-    4. 脚本目录的 ../config.json
+    Args:
+        config_manager: 该仓库的配置管理器
     
     Returns:
-        配置文件路径，如果未找到返回 None
+        仓库组件
     """
-    # 1. 命令行参数
-    if len(sys.argv) > 1:
-        config_path = sys.argv[1]
-        if os.path.exists(config_path):
-            return os.path.abspath(config_path)
-        else:
-            logger.error(f"配置文件不存在: {config_path}")
-            return None
+    file_monitor = None
+    
+    # 获取日志文件路径
+    log_file_path = config_manager.get_log_file_path()
     
-    # 2. 当前工作目录
-    cwd_config = os.path.join(os.getcwd(), 'config.json')
-    if os.path.exists(cwd_config):
-        return cwd_config
+    # 初始化共享日志索引（启动时多个进程选举一个写入者，其余只读）
+    index_config = config_manager.config.get('index', {})
+    log_index = None
+    if index_config.get('enabled', True):
+        log_index = LogIndex(log_file_path, index_dir=index_config.get('dir'))
     
-    # 3. 用户主目录
-    home_config = os.path.join(os.path.expanduser('~'), '.obsidian-logger', 'config.json')
-    if os.path.exists(home_config):
-        return home_config
+    # 初始化日志管理器（read_logs 分页上限）
+    pagination_config = config_manager.config.get('pagination', {})
+    log_manager = LogManager(
+        log_file_path,
+        max_page_lines=pagination_config.get('max_page_lines', MAX_PAGE_LINES),
+        max_page_bytes=pagination_config.get('max_page_bytes', MAX_PAGE_BYTES),
+        max_scan_bytes=pagination_config.get('max_scan_bytes', MAX_SCAN_BYTES),
+        index=log_index
+    )
     
-    # 4. 脚本目录
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    script_config = os.path.join(os.path.dirname(script_dir), 'config.json')
-    if os.path.exists(script_config):
-        return script_config
+    # 初始化缓存
+    cache_size = config_manager.config.get('cache_size', 1000)
+    cache_ttl = config_manager.config.get('cache_ttl_seconds', 300)
+    cache = LogCache(max_size=cache_size, cache_ttl=cache_ttl)
     
-    return None
+    # 初始化文件监听
+    file_monitor_config = config_manager.config.get('file_monitor', {})
+    if file_monitor_config.get('enabled', True):
+        debounce_ms = file_monitor_config.get('debounce_ms', 100)
+        
+        # 以插件的日志刷新间隔作为写入节奏的初始估计
+        plugin_config = config_manager.read_plugin_config() or {}
+        flush_interval_ms = plugin_config.get('logger', {}).get('flushInterval')
+        
+        file_monitor = FileMonitor(
+            log_file_path,
+            cache,
+            debounce_ms,
+            max_wait_ms=file_monitor_config.get('max_wait_ms', 1000),
+            adaptive_debounce=file_monitor_config.get('adaptive_debounce', True),
+            flush_interval_ms=flush_interval_ms,
+            backend=file_monitor_config.get('backend', 'auto'),
+            poll_min_interval_ms=file_monitor_config.get('poll_min_interval_ms', 100),
+            poll_max_interval_ms=file_monitor_config.get('poll_max_interval_ms', 2000)
+        )
+    
+    # 初始化资源订阅（通知最小间隔）
+    resources_config = config_manager.config.get('resources', {})
+    min_interval_ms = resources_config.get('min_notify_interval_ms', DEFAULT_MIN_NOTIFY_INTERVAL * 1000)
+    subscriptions = ResourceSubscriptions(log_manager, file_monitor, min_interval_ms / 1000)
+    
+    # 初始化报告缓存的后台重算（日志变化后空闲时重算最近请求过的报告）
+    refresh_config = config_manager.config.get('refresh', {})
+    refresher = None
+    if refresh_config.get('enabled', True):
+        refresher = ReportRefresher(
+            log_manager,
+            cache,
+            file_monitor,
+            settle=refresh_config.get('settle_ms', DEFAULT_SETTLE * 1000) / 1000,
+            max_reports=refresh_config.get('max_reports', DEFAULT_MAX_REPORTS)
+        )
+    
+    # 启动后在后台预热（建立索引、缓存统计摘要和错误分析）
+    prewarm_config = config_manager.config.get('prewarm', {})
+    
+    return VaultComponents(config_manager.vault_name, config_manager, log_manager, cache,
+                           file_monitor, subscriptions, log_index, refresher,
+                           prewarm=prewarm_config.get('enabled', True))
 
 
 def initialize_components(config_path: Optional[str] = None) -> bool:
@@ -111,7 +189,7 @@ def initialize_components(config_path: Optional[str] = None) -> bool:
     Returns:
         是否初始化成功
     """
-    global config_manager, log_manager, cache, file_monitor
+    global config_manager, log_manager, cache, file_monitor, subscriptions, vaults, startup_task
     
     try:
         # 查找配置文件
@@ -130,26 +208,23 @@ def initialize_components(config_path: Optional[str] = None) -> bool:
             print("  4. 脚本目录: ../config.json", file=sys.stderr)
             return False
         
-        # 初始化配置管理器
-        config_manager = ConfigManager(config_path)
-        
-        # 获取日志文件路径
-        log_file_path = config_manager.get_log_file_path()
-        
-        # 初始化日志管理器
-        log_manager = LogManager(log_file_path)
+        # 初始化各仓库的组件（每个仓库独立的配置、日志管理器、缓存和文件监听）
+        default_config = ConfigManager(config_path)
+        vaults = VaultRegistry(default_config.vault_name,
+                               default_config.config.get('fan_out_workers', DEFAULT_FAN_OUT_WORKERS))
+        for vault_name in default_config.vault_names:
+            vault_config = default_config if vault_name == default_config.vault_name \
+                else ConfigManager(config_path, vault_name)
+            vaults.add(create_vault_components(vault_config))
         
-        # 初始化缓存
-        cache_size = config_manager.config.get('cache_size', 1000)
-        cache_ttl = config_manager.config.get('cache_ttl_seconds', 300)
-        cache = LogCache(max_size=cache_size, cache_ttl=cache_ttl)
-        
-        # 初始化文件监听
-        file_monitor_config = config_manager.config.get('file_monitor', {})
-        if file_monitor_config.get('enabled', True):
-            debounce_ms = file_monitor_config.get('debounce_ms', 100)
-            file_monitor = FileMonitor(log_file_path, cache, debounce_ms)
-            file_monitor.start()
+        # 默认仓库的组件
+        default = vaults.default
+        config_manager = default.config_manager
+        log_manager = default.log_manager
+        cache = default.cache
+        file_monitor = default.file_monitor
+        subscriptions = default.subscriptions
+        startup_task = None
         
         logger.info("所有组件初始化成功")
         return True
@@ -163,6 +238,26 @@ def initialize_components(config_path: Optional[str] = None) -> bool:
 app = Server("obsidian-logger")
 
 
+def ensure_started() -> asyncio.Task:
+    """在后台启动各仓库的文件监听和日志索引（只启动一次，不阻塞握手）
+    
+    Returns:
+        启动任务；依赖缓存失效的请求应等待其完成
+    """
+    global startup_task
+    if startup_task is None:
+        startup_task = asyncio.get_running_loop().create_task(vaults.start())
+    return startup_task
+
+
+async def on_initialized(notification: types.InitializedNotification) -> None:
+    """客户端完成握手后开始启动组件"""
+    ensure_started()
+
+
+app.notification_handlers[types.InitializedNotification] = on_initialized
+
+
 # ============================================================================
 # 日志工具（1-6）
 # ============================================================================
@@ -170,17 +265,17 @@ app = Server("obsidian-logger")
 @app.list_tools()
 async def list_tools() -> list[types.Tool]:
     """列出所有可用工具"""
-    return [
+    tools = [
         # 日志工具
         types.Tool(
             name="read_logs",
-            description="读取日志内容，支持按级别过滤",
+            description="读取日志内容，支持按级别过滤和双向分页（响应末尾附带 before/cursor 游标）",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "lines": {
                         "type": "number",
-                        "description": "读取的行数（从文件末尾开始）",
+                        "description": "每页行数（从文件末尾开始，服务端上限默认 500 行）",
                         "default": 50
                     },
                     "level": {
@@ -188,6 +283,14 @@ async def list_tools() -> list[types.Tool]:
                         "description": "日志级别过滤（all/log/error/warn/debug）",
                         "enum": ["all", "log", "error", "warn", "debug"],
                         "default": "all"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "上次响应末尾的 cursor，传入时只返回此后新增的日志（向后翻页）"
+                    },
+                    "before": {
+                        "type": "string",
+                        "description": "上次响应末尾的 before，传入时返回该页之前更早的日志（向前翻页）"
                     }
                 }
             }
@@ -215,6 +318,10 @@ async def list_tools() -> list[types.Tool]:
                         "type": "boolean",
                         "description": "是否包含堆栈信息",
                         "default": False
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "上次响应末尾的 cursor，传入时只返回此后新增的错误"
                     }
                 }
             }
@@ -310,16 +417,32 @@ async def list_tools() -> list[types.Tool]:
         ),
         types.Tool(
             name="trigger_plugin_reload",
-            description="手动触发指定插件重载",
+            description="手动触发指定插件重载（可一次提交多个插件）",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "plugin_id": {
                         "type": "string",
                         "description": "要重载的插件 ID"
+                    },
+                    "plugin_ids": {
+                        "type": "array",
+                        "description": "要重载的多个插件 ID（一次写入，按顺序重载）",
+                        "items": {"type": "string"}
+                    },
+                    "wait": {
+                        "type": "boolean",
+                        "description": "是否等待日志中出现重载结果后再返回",
+                        "default": False
+                    },
+                    "timeout_seconds": {
+                        "type": "number",
+                        "description": "等待重载结果的超时时间（秒，仅 wait=true）",
+                        "default": 15,
+                        "minimum": MIN_WAIT_TIMEOUT,
+                        "maximum": MAX_WAIT_TIMEOUT
                     }
-                },
-                "required": ["plugin_id"]
+                }
             }
         ),
         types.Tool(
@@ -339,48 +462,146 @@ async def list_tools() -> list[types.Tool]:
                     }
                 }
             }
+        ),
+        types.Tool(
+            name="wait_for_log",
+            description="阻塞等待一条匹配的新日志（调用之后追加的行），替代循环调用 read_logs",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "pattern": {
+                        "type": "string",
+                        "description": "正则表达式，在整行中搜索"
+                    },
+                    "levels": {
+                        "type": "array",
+                        "description": "日志级别过滤（不指定则匹配全部级别）",
+                        "items": {"type": "string", "enum": ["LOG", "ERROR", "WARN", "DEBUG"]}
+                    },
+                    "timeout_seconds": {
+                        "type": "number",
+                        "description": "最长等待时间（秒）",
+                        "default": 30,
+                        "minimum": MIN_WAIT_TIMEOUT,
+                        "maximum": MAX_WAIT_TIMEOUT
+                    },
+                    "ignore_case": {
+                        "type": "boolean",
+                        "description": "是否忽略大小写",
+                        "default": False
+                    }
+                },
+                "required": ["pattern"]
+            }
         )
     ]
+    
+    # 每个工具都可以用 vault 参数选择仓库
+    for tool in tools:
+        tool.inputSchema["properties"]["vault"] = {
+            "type": "string",
+            "description": "仓库名称（config.json 中 vaults 的 name，默认为 default_vault）；"
+                           "报告类工具可用 \"*\" 并行查询所有仓库"
+        }
+        # 全量扫描类工具可设置截止时间，超时返回部分结果
+        if tool.name in SCAN_TOOLS:
+            tool.inputSchema["properties"]["deadline_ms"] = {
+                "type": "number",
+                "minimum": MIN_DEADLINE_MS,
+                "maximum": MAX_DEADLINE_MS,
+                "description": "截止时间（毫秒，从收到请求时起计算，包括等待索引的时间）："
+                               "到达后停止扫描，返回已扫描部分的结果并标注覆盖范围；"
+                               "请求带进度令牌时按已扫描字节数 / 总字节数发送进度通知"
+            }
+    return tools
 
 
-@app.call_tool()
-async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
-    """调用工具"""
+# 报告类工具：只读取日志，可在工作线程中执行，支持 vault="*" 汇总所有仓库
+REPORT_TOOLS = ("get_log_summary", "get_recent_errors", "analyze_errors", "get_reload_statistics")
+
+# 可能全量扫描日志的报告类工具：支持 deadline_ms 参数和进度通知
+SCAN_TOOLS = ("get_log_summary", "analyze_errors", "get_reload_statistics")
+
+# 等待类参数 timeout_seconds 的取值范围（秒）
+MIN_WAIT_TIMEOUT = 1
+MAX_WAIT_TIMEOUT = 300
+
+# 截止时间参数 deadline_ms 的取值范围（毫秒）
+MIN_DEADLINE_MS = 1
+MAX_DEADLINE_MS = 3600 * 1000
+
+# 请求不带进度令牌时，最多等待预热的进度间隔数（之后立即返回标注的部分结果，避免无进度的长时间等待）
+PREWARM_WAIT_INTERVALS = 8
+
+# 仍在等待预热时附加在部分结果后的说明
+PREWARM_PENDING_NOTE = "\n⏳ 仓库预热尚未完成：完整的错误分析正在后台计算，稍后再次查询即可从缓存获取"
+
+
+def run_report_tool(vault: VaultComponents, name: str, arguments: dict,
+                    progress_callback: Optional[Callable[[int, int], None]] = None,
+                    deadline: Optional[float] = None) -> str:
+    """执行报告类工具（同步，在工作线程中运行）
     
-    # 工具 1: read_logs
-    if name == "read_logs":
-        lines = arguments.get("lines", 50)
-        level = arguments.get("level", "all")
-        result = log_manager.read_logs(lines, level)
-        return [types.TextContent(type="text", text=result)]
+    Args:
+        vault: 仓库组件
+        name: 工具名称
+        arguments: 工具参数
+        progress_callback: 扫描进度回调 (已扫描字节数, 总字节数)
+        deadline: 请求收到时换算的绝对截止时间，None 表示按 deadline_ms 参数从现在起计算
+    
+    Returns:
+        工具输出
+    """
+    log_manager = vault.log_manager
+    cache = vault.cache
+    if vault.refresher:
+        # 登记参数组合，日志变化后空闲时在后台重算
+        vault.refresher.record(name, arguments)
+    # 扫描进度和截止时间；到达截止时间的部分结果不缓存
+    progress = ScanProgress(progress_callback, request_deadline_ms(arguments),
+                            vault.config_manager.config.get('progress', {}).get('interval_ms', 250) / 1000,
+                            deadline=deadline)
     
     # 工具 2: get_log_summary
-    elif name == "get_log_summary":
+    if name == "get_log_summary":
         # 先尝试从缓存获取
         cached = cache.get_cached_summary()
         if cached:
             result = cached + "\n\n💾 (来自缓存)"
+        elif log_manager.index_building():
+            # 索引预热中：立即返回已索引部分的统计（标注覆盖范围，不缓存）
+            result = log_manager.get_summary(allow_partial=True)
         else:
-            result = log_manager.get_summary()
+            # 计算前记录缓存代数，期间日志发生变化则丢弃结果
+            generation = cache.generation
+            result = log_manager.get_summary(progress=progress)
             # 更新缓存
-            cache.set_summary_cache(result)
-        return [types.TextContent(type="text", text=result)]
+            if not progress.expired:
+                cache.set_summary_cache(result, generation)
+        return result
     
     # 工具 3: get_recent_errors
     elif name == "get_recent_errors":
         limit = arguments.get("limit", 10)
         include_stack = arguments.get("include_stack", False)
+        cursor = arguments.get("cursor")
+        
+        # 带游标时只检查此后新增的内容
+        if cursor:
+            result = log_manager.get_errors_since(cursor, limit, include_stack)
+            return result
         
         # 尝试从缓存获取
         cached = cache.get_cached_errors(limit)
         if cached and not include_stack:
             result = cached + "\n\n💾 (来自缓存)"
         else:
-            result = log_manager.get_recent_errors(limit, include_stack)
+            generation = cache.generation
+            result = log_manager.get_recent_errors(limit, include_stack, with_cursor=True)
             # 更新缓存（仅当不包含堆栈时）
             if not include_stack:
-                cache.set_errors_cache(result, limit)
-        return [types.TextContent(type="text", text=result)]
+                cache.set_errors_cache(result, limit, generation)
+        return result
     
     # 工具 4: analyze_errors
     elif name == "analyze_errors":
@@ -391,9 +612,384 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
         if cached:
             result = cached + "\n\n💾 (来自缓存)"
         else:
-            result = log_manager.analyze_errors(hours)
+            generation = cache.generation
+            result = log_manager.analyze_errors(hours, progress)
             # 更新缓存
-            cache.set_analysis_cache(result, hours)
+            if not progress.expired:
+                cache.set_analysis_cache(result, hours, generation)
+        return result
+    
+    # 工具 12: get_reload_statistics
+    elif name == "get_reload_statistics":
+        plugin_id = arguments.get("plugin_id")
+        hours = arguments.get("time_range_hours", 24)
+        
+        # 从日志中提取重载记录
+        if not log_manager.file_exists():
+            return "⚠️ 日志文件不存在，无法统计"
+        
+        try:
+            # 提取重载记录
+            reload_records = []
+            for line in log_manager.iter_lines(progress):
+                if 'Auto-Reload' in line and '插件已重载' in line:
+                    parsed = log_manager.parse_log_line(line)
+                    if parsed:
+                        timestamp, level, message = parsed
+                        # 提取插件 ID 和耗时
+                        if plugin_id and plugin_id not in message:
+                            continue
+                        reload_records.append({
+                            'timestamp': timestamp,
+                            'message': message
+                        })
+            
+            # 生成统计
+            total_reloads = len(reload_records)
+            
+            result = f"""
+📊 重载统计
+{'━' * 60}
+⏱️ 统计范围：最近 {hours} 小时
+"""
+            if plugin_id:
+                result += f"🔌 插件：{plugin_id}\n"
+            else:
+                result += "🔌 插件：所有\n"
+            
+            result += f"🔄 重载次数：{total_reloads}\n"
+            
+            if reload_records:
+                result += f"\n📋 最近 5 次重载：\n"
+                for i, record in enumerate(reload_records[-5:], 1):
+                    result += f"{i}. [{record['timestamp']}] {record['message']}\n"
+            else:
+                result += "\n✅ 统计范围内无重载记录\n"
+            
+            result += f"{'━' * 60}" + log_manager.format_partial(progress)
+            return result.strip()
+        
+        except Exception as e:
+            logger.error(f"获取重载统计失败: {e}")
+            return f"❌ 获取统计失败: {str(e)}"
+    
+    return f"❌ 未知工具: {name}"
+
+
+def request_progress_token():
+    """当前请求的 MCP 进度令牌
+    
+    Returns:
+        进度令牌，请求未携带时返回 None
+    """
+    try:
+        meta = app.request_context.meta
+    except LookupError:
+        return None
+    return meta.progressToken if meta is not None else None
+
+
+def progress_sender(progress_token, message: str) -> Callable[[int, int], None]:
+    """创建可在工作线程中调用的进度回调，把进度通知交给事件循环发送
+    
+    Args:
+        progress_token: 请求的进度令牌
+        message: 进度说明
+    
+    Returns:
+        进度回调 (已完成字节数, 总字节数)
+    """
+    loop = asyncio.get_running_loop()
+    session = app.request_context.session
+    
+    def send(done: int, total: int) -> None:
+        asyncio.run_coroutine_threadsafe(
+            session.send_progress_notification(progress_token, done, total, message), loop)
+    
+    return send
+
+
+async def wait_for_index(vault: VaultComponents, progress_token, deadline: Optional[float] = None) -> None:
+    """等待日志索引的大批量更新完成，期间发送进度通知（已索引字节数 / 总字节数）
+    
+    Args:
+        vault: 仓库组件
+        progress_token: 请求的进度令牌
+        deadline: 绝对截止时间（time.monotonic()），到达后不再等待（摘要返回已索引部分的统计）
+    """
+    index = vault.log_index
+    interval_ms = vault.config_manager.config.get('progress', {}).get('interval_ms', 250)
+    session = app.request_context.session
+    while index is not None:
+        progress = index.build_progress()
+        if progress is None or (deadline is not None and time.monotonic() >= deadline):
+            return
+        indexed, target = progress
+        await session.send_progress_notification(progress_token, indexed, target, "正在建立日志索引")
+        await asyncio.sleep(interval_ms / 1000)
+
+
+def prewarm_serves(vault: VaultComponents, name: str, arguments: dict) -> bool:
+    """该请求能否由正在进行的预热提供结果（预热只缓存默认时间范围的错误分析）
+    
+    Args:
+        vault: 仓库组件
+        name: 工具名称
+        arguments: 工具参数
+    
+    Returns:
+        预热仍在进行且完成后会缓存该请求的结果时返回 True
+    """
+    return (name == "analyze_errors"
+            and arguments.get("time_range_hours", 24) == PREWARM_ANALYSIS_HOURS
+            and not vault.prewarm_done()
+            and vault.cache.get_cached_analysis(PREWARM_ANALYSIS_HOURS) is None)
+
+
+async def wait_for_prewarm(pending: List[VaultComponents], progress_token,
+                           deadline: Optional[float] = None) -> bool:
+    """等待仓库预热完成（预热完成后请求命中预热缓存，不与预热并行重复扫描），
+    带进度令牌时发送所有仓库汇总的进度通知
+    
+    不带进度令牌时最多等待 PREWARM_WAIT_INTERVALS 个进度间隔；
+    每个仓库各阶段的字节进度依次累加，保证通知中的 progress 单调递增
+    
+    Args:
+        pending: 需要等待的仓库组件
+        progress_token: 请求的进度令牌，None 表示不发送进度
+        deadline: 绝对截止时间（time.monotonic()），到达后不再等待
+    
+    Returns:
+        所有仓库的预热是否都已完成（False 时调用方应立即返回标注的部分结果）
+    """
+    tasks = {vault.prewarm_task for vault in pending if not vault.prewarm_done()}
+    if not tasks:
+        return True
+    interval_ms = pending[0].config_manager.config.get('progress', {}).get('interval_ms', 250)
+    session = app.request_context.session if progress_token is not None else None
+    if session is None:
+        bound = time.monotonic() + interval_ms * PREWARM_WAIT_INTERVALS / 1000
+        deadline = bound if deadline is None else min(deadline, bound)
+    # 每个仓库：[已完成阶段的累计字节数, 当前阶段, 当前阶段已完成, 当前阶段总数]
+    phases = {vault.name: [0, None, 0, 0] for vault in pending}
+    while not all(task.done() for task in tasks):
+        timeout = interval_ms / 1000
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            timeout = min(timeout, remaining)
+        if session is not None:
+            message = None
+            for vault in pending:
+                phase = phases[vault.name]
+                progress = vault.prewarm_progress()
+                if progress is not None:
+                    if progress[0] != phase[1]:
+                        phase[0] += phase[3]
+                    phase[1:] = progress
+                    message = progress[0]
+                elif vault.prewarm_done():
+                    phase[2] = phase[3]
+            if message is not None:
+                done = sum(phase[0] + phase[2] for phase in phases.values())
+                total = sum(phase[0] + phase[3] for phase in phases.values())
+                await session.send_progress_notification(progress_token, done, total, message)
+        await asyncio.wait(tasks, timeout=timeout)
+    return True
+
+
+@contextlib.contextmanager
+def interactive_request():
+    """交互请求优先：请求期间停止所有仓库的后台重算，结束后重新等待空闲"""
+    refreshers = [vault.refresher for vault in vaults if vault.refresher]
+    for refresher in refreshers:
+        refresher.begin()
+    try:
+        yield
+    finally:
+        for refresher in refreshers:
+            refresher.end()
+
+
+@app.call_tool()
+async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
+    """调用工具（vault 参数选择仓库）"""
+    # 截止时间从收到请求时开始计算，等待启动、等待索引和扫描共用
+    deadline = deadline_from_ms(request_deadline_ms(arguments))
+    
+    # 客户端未发送 initialized 通知时在第一次调用时启动；启动完成前缓存不会被文件变化失效
+    await asyncio.shield(ensure_started())
+    
+    # 阻塞等待日志的工具大部分时间空闲，不打断后台重算
+    if name == "wait_for_log" or (name == "trigger_plugin_reload" and arguments.get("wait")):
+        return await route_tool(name, arguments)
+    with interactive_request():
+        return await route_tool(name, arguments, deadline)
+
+
+async def route_tool(name: str, arguments: dict, deadline: Optional[float] = None) -> list[types.TextContent]:
+    """按 vault 参数把工具调用分发到一个或所有仓库
+    
+    Args:
+        name: 工具名称
+        arguments: 工具参数
+        deadline: 请求收到时换算的绝对截止时间（报告类工具）
+    
+    Returns:
+        工具输出
+    """
+    vault_name = arguments.get("vault")
+    
+    # 跨仓库查询：在工作线程池中并行执行
+    if vault_name == ALL_VAULTS:
+        if name not in REPORT_TOOLS:
+            return [types.TextContent(type="text", text=f"❌ vault=\"*\" 只支持报告类工具：{', '.join(REPORT_TOOLS)}")]
+        if arguments.get("cursor"):
+            # 游标只对生成它的仓库的日志文件有效
+            return [types.TextContent(type="text", text="❌ vault=\"*\" 不支持 cursor 参数，请对每个仓库分别指定 vault 增量读取")]
+        pending = [vault for vault in vaults if prewarm_serves(vault, name, arguments)]
+        unfinished = set()
+        if pending and not await wait_for_prewarm(pending, request_progress_token(), deadline):
+            # 预热未完成的仓库立即返回标注的部分结果，其余仓库照常执行
+            unfinished = {vault.name for vault in pending if not vault.prewarm_done()}
+        now = time.monotonic()
+        
+        def run(vault: VaultComponents) -> str:
+            if vault.name in unfinished:
+                return run_report_tool(vault, name, arguments, deadline=now) + PREWARM_PENDING_NOTE
+            return run_report_tool(vault, name, arguments, deadline=deadline)
+        
+        results = await vaults.fan_out(run)
+        result = "\n\n".join(f"🗄️ 仓库：{vault}\n{'═' * 60}\n{text}" for vault, text in results)
+        return [types.TextContent(type="text", text=result)]
+    
+    try:
+        vault = vaults.get(vault_name)
+    except KeyError:
+        return [types.TextContent(type="text", text=f"❌ 未知的仓库: {vault_name}（可用：{', '.join(vaults.names())}）")]
+    return await dispatch_tool(vault, name, arguments, deadline)
+
+
+def wait_timeout(arguments: dict, default: float) -> float:
+    """读取 timeout_seconds 参数并限制在 [MIN_WAIT_TIMEOUT, MAX_WAIT_TIMEOUT] 范围内
+    
+    Args:
+        arguments: 工具参数
+        default: 未指定或无法解析时使用的默认值
+    
+    Returns:
+        等待超时时间（秒）
+    """
+    try:
+        timeout = float(arguments.get("timeout_seconds", default))
+    except (TypeError, ValueError):
+        timeout = default
+    if timeout != timeout:
+        timeout = default
+    return min(max(timeout, MIN_WAIT_TIMEOUT), MAX_WAIT_TIMEOUT)
+
+
+def request_deadline_ms(arguments: dict) -> Optional[int]:
+    """读取 deadline_ms 参数并限制在 [MIN_DEADLINE_MS, MAX_DEADLINE_MS] 范围内
+    
+    Args:
+        arguments: 工具参数
+    
+    Returns:
+        截止时间（毫秒），未指定或无法解析时返回 None（不限制）
+    """
+    value = arguments.get("deadline_ms")
+    if value is None:
+        return None
+    try:
+        deadline_ms = float(value)
+    except (TypeError, ValueError):
+        return None
+    if deadline_ms != deadline_ms:
+        return None
+    return int(min(max(deadline_ms, MIN_DEADLINE_MS), MAX_DEADLINE_MS))
+
+
+async def run_config_write(func: Callable[..., Any], *args: Any) -> Any:
+    """在线程池中执行插件配置写入（建议锁和比较交换冲突后的退避会阻塞调用线程）"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def dispatch_tool(vault: VaultComponents, name: str, arguments: dict,
+                        deadline: Optional[float] = None) -> list[types.TextContent]:
+    """在指定仓库上执行工具
+    
+    Args:
+        vault: 仓库组件
+        name: 工具名称
+        arguments: 工具参数
+        deadline: 请求收到时换算的绝对截止时间，None 表示按 deadline_ms 参数从现在起计算
+    
+    Returns:
+        工具输出
+    """
+    if deadline is None:
+        deadline = deadline_from_ms(request_deadline_ms(arguments))
+    config_manager = vault.config_manager
+    log_manager = vault.log_manager
+    cache = vault.cache
+    file_monitor = vault.file_monitor
+    
+    # 报告类工具（工具 2-4、12）：在工作线程中执行，扫描期间事件循环可以发送进度通知
+    if name in REPORT_TOOLS:
+        progress_callback = None
+        progress_token = request_progress_token()
+        prewarm_pending = False
+        if prewarm_serves(vault, name, arguments):
+            # 预热正在计算同一份报告：等待预热完成后命中缓存；等待超时则立即返回标注的部分结果
+            if not await wait_for_prewarm([vault], progress_token, deadline):
+                prewarm_pending = True
+                deadline = time.monotonic()
+        if progress_token is not None:
+            # 请求带进度令牌时等待索引预热完成并报告进度（到达截止时间为止），否则摘要立即返回部分结果
+            if name == "get_log_summary":
+                await wait_for_index(vault, progress_token, deadline)
+            progress_callback = progress_sender(progress_token, "正在扫描日志")
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, run_report_tool, vault, name, arguments,
+                                            progress_callback, deadline)
+        if prewarm_pending:
+            result += PREWARM_PENDING_NOTE
+        return [types.TextContent(type="text", text=result)]
+    
+    # 工具 1: read_logs
+    elif name == "read_logs":
+        lines = arguments.get("lines")
+        level = arguments.get("level", "all")
+        cursor = arguments.get("cursor")
+        before = arguments.get("before")
+        
+        if cursor and before:
+            return [types.TextContent(type="text", text="❌ cursor 和 before 不能同时使用")]
+        
+        # 带游标时向后读取此后新增的内容
+        if cursor:
+            result = log_manager.read_logs_since(cursor, level, lines=lines)
+            return [types.TextContent(type="text", text=result)]
+        
+        # 带 before 时向前翻页
+        if lines is None:
+            lines = 50
+        if before:
+            result = log_manager.read_logs_before(before, lines, level)
+            return [types.TextContent(type="text", text=result)]
+        
+        # 先尝试从环形缓冲区获取（与文件状态一致且不超过每页上限时才命中）
+        result = None
+        state = log_manager.get_file_state()
+        if lines <= log_manager.max_page_lines:
+            page = cache.get_tail_page(lines, level, state)
+            if page is not None:
+                # 游标指向缓冲区对应的文件位置，保证翻页和增量读取不遗漏
+                result = log_manager.format_tail_page(page, level, state)
+        if result is None:
+            result = log_manager.read_logs(lines, level, with_cursor=True)
         return [types.TextContent(type="text", text=result)]
     
     # 工具 5: get_log_file_path
@@ -459,7 +1055,7 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
         if not mode:
             return [types.TextContent(type="text", text="❌ 错误：缺少 mode 参数")]
         
-        success = config_manager.set_auto_reload_mode(mode)
+        success = await run_config_write(config_manager.set_auto_reload_mode, mode)
         if success:
             result = f"✅ 已切换到 {mode.upper()} 模式\n💡 插件将在检测到配置变化后自动应用新模式"
         else:
@@ -484,29 +1080,26 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
             if not plugins:
                 return [types.TextContent(type="text", text="❌ 错误：缺少 plugins 参数")]
             
-            success_count = 0
-            for plugin in plugins:
-                if config_manager.add_watched_plugin(plugin):
-                    success_count += 1
-            
-            result = f"✅ 已添加 {success_count}/{len(plugins)} 个插件到监控列表"
+            # 所有插件在一次写入中添加
+            if await run_config_write(config_manager.add_watched_plugins, plugins):
+                result = f"✅ 已添加 {len(plugins)}/{len(plugins)} 个插件到监控列表"
+            else:
+                result = "❌ 添加监控插件失败"
         
         elif action == "remove":
             if not plugins:
                 return [types.TextContent(type="text", text="❌ 错误：缺少 plugins 参数")]
             
-            success_count = 0
-            for plugin in plugins:
-                if config_manager.remove_watched_plugin(plugin):
-                    success_count += 1
-            
-            result = f"✅ 已从监控列表移除 {success_count}/{len(plugins)} 个插件"
+            if await run_config_write(config_manager.remove_watched_plugins, plugins):
+                result = f"✅ 已从监控列表移除 {len(plugins)}/{len(plugins)} 个插件"
+            else:
+                result = "❌ 移除监控插件失败"
         
         elif action == "set":
             if not isinstance(plugins, list):
                 return [types.TextContent(type="text", text="❌ 错误：plugins 必须是列表")]
             
-            success = config_manager.set_watched_plugins(plugins)
+            success = await run_config_write(config_manager.set_watched_plugins, plugins)
             if success:
                 result = f"✅ 已设置监控列表 ({len(plugins)} 个插件)"
             else:
@@ -519,108 +1112,183 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
     
     # 工具 11: trigger_plugin_reload
     elif name == "trigger_plugin_reload":
-        plugin_id = arguments.get("plugin_id")
-        if not plugin_id:
+        plugin_ids = list(arguments.get("plugin_ids") or [])
+        if arguments.get("plugin_id"):
+            plugin_ids.insert(0, arguments["plugin_id"])
+        if not plugin_ids:
             return [types.TextContent(type="text", text="❌ 错误：缺少 plugin_id 参数")]
         
-        success = config_manager.trigger_plugin_reload(plugin_id)
-        if success:
-            result = f"✅ 已触发重载请求: {plugin_id}\n💡 插件将在检测到配置变化后执行重载（约 2 秒内）"
-        else:
-            result = f"❌ 触发重载失败"
+        started_at = time.monotonic()
+        request_ids = await run_config_write(config_manager.enqueue_plugin_reloads, plugin_ids)
+        if request_ids is None:
+            return [types.TextContent(type="text", text="❌ 触发重载失败")]
+        
+        if arguments.get("wait", False):
+            # 提交成功后立即记录日志末尾：插件要在下一次检查配置时才执行重载，结果日志一定在此之后追加
+            follower = LogFollower(log_manager.log_file_path, file_monitor)
+            follower.start()
+            timeout = wait_timeout(arguments, 15)
+            wait_result = await wait_for_reloads(follower, request_ids, started_at, timeout)
+            result = format_reload_wait_result(wait_result, timeout)
+            return [types.TextContent(type="text", text=result)]
+        
+        result = ""
+        for plugin_id, request_id in request_ids.items():
+            result += f"✅ 已触发重载请求: {plugin_id} (请求 ID: {request_id})\n"
+        result += "💡 插件将在检测到配置变化后执行重载（约 2 秒内），日志中的请求 ID 可用于追踪"
         return [types.TextContent(type="text", text=result)]
     
-    # 工具 12: get_reload_statistics
-    elif name == "get_reload_statistics":
-        plugin_id = arguments.get("plugin_id")
-        hours = arguments.get("time_range_hours", 24)
-        
-        # 从日志中提取重载记录
-        if not log_manager.file_exists():
-            return [types.TextContent(type="text", text="⚠️ 日志文件不存在，无法统计")]
+    # 工具 13: wait_for_log
+    elif name == "wait_for_log":
+        pattern = arguments.get("pattern")
+        if not pattern:
+            return [types.TextContent(type="text", text="❌ 错误：缺少 pattern 参数")]
+        levels = arguments.get("levels") or []
+        timeout = wait_timeout(arguments, 30)
         
         try:
-            with open(log_manager.log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            # 提取重载记录
-            reload_records = []
-            for line in lines:
-                if 'Auto-Reload' in line and '插件已重载' in line:
-                    parsed = log_manager.parse_log_line(line)
-                    if parsed:
-                        timestamp, level, message = parsed
-                        # 提取插件 ID 和耗时
-                        if plugin_id and plugin_id not in message:
-                            continue
-                        reload_records.append({
-                            'timestamp': timestamp,
-                            'message': message
-                        })
-            
-            # 生成统计
-            total_reloads = len(reload_records)
-            
-            result = f"""
-📊 重载统计
-{'━' * 60}
-⏱️ 统计范围：最近 {hours} 小时
-"""
-            if plugin_id:
-                result += f"🔌 插件：{plugin_id}\n"
-            else:
-                result += "🔌 插件：所有\n"
-            
-            result += f"🔄 重载次数：{total_reloads}\n"
-            
-            if reload_records:
-                result += f"\n📋 最近 5 次重载：\n"
-                for i, record in enumerate(reload_records[-5:], 1):
-                    result += f"{i}. [{record['timestamp']}] {record['message']}\n"
-            else:
-                result += "\n✅ 统计范围内无重载记录\n"
-            
-            result += f"{'━' * 60}"
-            return [types.TextContent(type="text", text=result.strip())]
+            predicate = make_line_filter(pattern, levels, arguments.get("ignore_case", False))
+        except re.error as e:
+            return [types.TextContent(type="text", text=f"❌ 无效的正则表达式: {e}")]
         
-        except Exception as e:
-            logger.error(f"获取重载统计失败: {e}")
-            return [types.TextContent(type="text", text=f"❌ 获取统计失败: {str(e)}")]
+        follower = LogFollower(log_manager.log_file_path, file_monitor)
+        follower.start()
+        started_at = time.monotonic()
+        line = await wait_for_line(follower, predicate, timeout)
+        waited_ms = (time.monotonic() - started_at) * 1000
+        
+        level_text = '/'.join(levels) if levels else '全部级别'
+        if line is None:
+            result = f"⏱️ 等待超时（{timeout:g}s）：未出现匹配 /{pattern}/ 的日志（{level_text}）"
+        else:
+            result = f"✅ 匹配到日志（等待 {waited_ms:.0f}ms）\n{'─' * 60}\n{line}"
+        result += f"\n📊 读取新增内容 {follower.bytes_read} 字节"
+        return [types.TextContent(type="text", text=result)]
     
     else:
         return [types.TextContent(type="text", text=f"❌ 未知工具: {name}")]
 
 
+# ============================================================================
+# 日志资源
+# ============================================================================
+
+def resource_vault(uri) -> VaultComponents:
+    """资源 URI 对应的仓库（?vault= 查询参数，默认为默认仓库）
+    
+    Raises:
+        ValueError: 未知的资源或仓库
+    """
+    _, query = parse_view_uri(str(uri))
+    try:
+        return vaults.get(query.get('vault'))
+    except KeyError:
+        raise ValueError(f"未知的仓库: {query.get('vault')}")
+
+
+@app.list_resources()
+async def list_resources() -> list[types.Resource]:
+    """列出日志资源（包括默认仓库日志末尾出现过的来源，以及其他仓库的日志）"""
+    views = [DEBUG_VIEW, ERRORS_VIEW]
+    views.extend(source_view(source) for source in recent_sources(vaults.default.log_manager))
+    for name in vaults.names():
+        if name != vaults.default_name:
+            views.extend(vault_view(view, name) for view in (DEBUG_VIEW, ERRORS_VIEW))
+    return [
+        types.Resource(uri=view.uri, name=view.name, description=view.description, mimeType="text/plain")
+        for view in views
+    ]
+
+
+@app.list_resource_templates()
+async def list_resource_templates() -> list[types.ResourceTemplate]:
+    """列出资源模板"""
+    return [
+        types.ResourceTemplate(
+            uriTemplate=SOURCE_URI_TEMPLATE,
+            name="指定来源的日志",
+            description="只包含来源为 [source] 的日志（如 Auto-Reload、Config Monitor）",
+            mimeType="text/plain"
+        )
+    ]
+
+
+@app.read_resource()
+async def read_resource(uri) -> list[ReadResourceContents]:
+    """读取日志资源：末尾一页，或带 ?cursor= 时只读取新增内容"""
+    await asyncio.shield(ensure_started())
+    with interactive_request():
+        text, meta = read_view(resource_vault(uri).log_manager, str(uri))
+    return [ReadResourceContents(content=text, mime_type="text/plain", meta=meta)]
+
+
+@app.subscribe_resource()
+async def subscribe_resource(uri) -> None:
+    """订阅日志资源"""
+    await asyncio.shield(ensure_started())
+    resource_vault(uri).subscriptions.subscribe(str(uri), app.request_context.session)
+
+
+@app.unsubscribe_resource()
+async def unsubscribe_resource(uri) -> None:
+    """取消订阅日志资源"""
+    resource_vault(uri).subscriptions.unsubscribe(str(uri), app.request_context.session)
+
+
+def create_initialization_options():
+    """生成初始化选项（声明资源订阅能力）"""
+    options = app.create_initialization_options()
+    options.capabilities.resources.subscribe = True
+    return options
+
+
 async def run_server():
-    """运行 MCP Server"""
+    """运行 MCP Server（stdio 传输，独占一组组件）"""
     # 初始化组件
     if not initialize_components():
         logger.error("初始化失败，退出")
         sys.exit(1)
     
+    # 文件监听和索引在握手完成后启动（on_initialized），不推迟对 initialize 的响应
     # 使用 stdio 传输运行服务器
     async with stdio_server() as (read_stream, write_stream):
         await app.run(
             read_stream,
             write_stream,
-            app.create_initialization_options()
+            create_initialization_options()
         )
 
 
-def main():
-    """主入口点（用于 uvx 和命令行启动）"""
-    try:
-        asyncio.run(run_server())
-    except KeyboardInterrupt:
-        logger.info("MCP Server 正在关闭...")
-        # 停止文件监听
-        if file_monitor:
-            file_monitor.stop()
-        sys.exit(0)
-    except Exception as e:
-        logger.error(f"MCP Server 启动失败: {e}", exc_info=True)
+async def run_daemon():
+    """运行守护进程：一组组件通过本地套接字服务多个客户端"""
+    if not initialize_components():
+        logger.error("初始化失败，退出")
         sys.exit(1)
+    
+    daemon_config = config_manager.config.get('daemon', {})
+    paths = daemon_paths(log_manager.log_file_path, config_manager.config.get('vault_path', ''),
+                         daemon_config.get('run_dir'))
+    
+    async def run_session(read_stream, write_stream):
+        await app.run(read_stream, write_stream, create_initialization_options())
+    
+    server = DaemonServer(paths, run_session,
+                          daemon_config.get('idle_timeout_seconds', DEFAULT_IDLE_TIMEOUT))
+    if not server.acquire_lock():
+        # 同一仓库的守护进程已在运行（或正在启动）
+        logger.info("守护进程已在运行，退出")
+        vaults.stop()
+        return
+    
+    await server.start()
+    ensure_started()
+    try:
+        await server.serve_until_idle()
+    finally:
+        vaults.stop()
 
 
 if __name__ == "__main__":
+    # 作为脚本运行时，让启动器导入的服务端模块就是本模块，而不是再加载一份
+    sys.modules['mcp_obsidian_logger'] = sys.modules['__main__']
     main()
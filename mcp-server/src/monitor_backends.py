@@ -0,0 +1,611 @@
+"""
+文件监听后端模块
+
+提供可插拔的监听后端：
+- inotify：直接通过 ctypes 调用 Linux inotify，只监听目标文件和目录中针对它的重命名/创建事件
+- watchdog：基于系统文件事件（inotify/FSEvents/ReadDirectoryChangesW）
+- polling：自适应 stat 轮询，适用于网络共享、WSL 挂载的 vault 和同步文件夹等
+  文件事件不可靠的环境
+
+后端只负责在目标日志文件可能发生变化时调用 notify，具体变化类型由 FileMonitor 判断
+"""
+
+import os
+import sys
+import errno
+import ctypes
+import ctypes.util
+import select
+import struct
+import logging
+import functools
+import threading
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 后端名称
+BACKEND_AUTO = 'auto'
+BACKEND_INOTIFY = 'inotify'
+BACKEND_WATCHDOG = 'watchdog'
+BACKEND_POLLING = 'polling'
+
+# 后端启动失败时的回退顺序
+FALLBACK_CHAIN = {
+    BACKEND_INOTIFY: [BACKEND_WATCHDOG, BACKEND_POLLING],
+    BACKEND_WATCHDOG: [BACKEND_POLLING],
+    BACKEND_POLLING: [],
+}
+
+# inotify 常量（linux/inotify.h）
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = getattr(os, 'O_NONBLOCK', 0o4000)
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+# 目标文件只关心内容修改和自身被移走/删除；目录只关心针对目标文件名的重命名/创建/删除
+INOTIFY_FILE_MASK = IN_MODIFY | IN_MOVE_SELF | IN_DELETE_SELF
+INOTIFY_DIR_MASK = IN_CREATE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_ONLYDIR
+
+# struct inotify_event 头部：wd, mask, cookie, len
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+_libc = None
+
+# 文件事件不可靠的文件系统类型（/proc/mounts 中的 fstype）
+UNRELIABLE_FS_TYPES = {
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ncpfs', 'afs',
+    '9p', 'drvfs', 'v9fs', 'vboxsf', 'vmhgfs', 'virtiofs', 'davfs',
+}
+
+# 同步文件夹的路径特征
+SYNCED_FOLDER_MARKERS = ('Dropbox', 'OneDrive', 'Google Drive', 'iCloud', 'Mobile Documents', 'Nutstore')
+
+
+def _find_mount_fs_type(path: str) -> Optional[str]:
+    """查找路径所在挂载点的文件系统类型（仅 Linux）
+    
+    Args:
+        path: 文件或目录路径
+    
+    Returns:
+        文件系统类型，无法判断时返回 None
+    """
+    try:
+        with open('/proc/mounts', 'r', encoding='utf-8', errors='ignore') as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return None
+    
+    real_path = os.path.realpath(path)
+    best_point, best_type = '', None
+    for fields in mounts:
+        if len(fields) < 3:
+            continue
+        # /proc/mounts 中空格被转义为 \040
+        mount_point = fields[1].replace('\\040', ' ')
+        prefix = mount_point.rstrip('/') + '/'
+        if (real_path == mount_point or real_path.startswith(prefix)) and len(mount_point) > len(best_point):
+            best_point, best_type = mount_point, fields[2]
+    return best_type
+
+
+def is_unreliable_fs(path: str) -> Tuple[bool, str]:
+    """判断路径所在位置的文件事件是否可靠
+    
+    Args:
+        path: 日志文件路径
+    
+    Returns:
+        (是否不可靠, 原因)
+    """
+    abs_path = os.path.abspath(path)
+    
+    if abs_path.startswith('\\\\'):
+        return True, 'UNC 网络路径'
+    
+    for marker in SYNCED_FOLDER_MARKERS:
+        if marker in abs_path:
+            return True, f'同步文件夹 ({marker})'
+    
+    if sys.platform.startswith('linux'):
+        fs_type = _find_mount_fs_type(os.path.dirname(abs_path))
+        if fs_type and (fs_type in UNRELIABLE_FS_TYPES or fs_type.startswith('fuse.')):
+            return True, f'文件系统类型 {fs_type}'
+    
+    return False, ''
+
+
+def _load_libc():
+    """加载 libc（仅 Linux），不支持 inotify 时返回 None"""
+    global _libc
+    if _libc is None:
+        if not sys.platform.startswith('linux'):
+            _libc = False
+        else:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+                libc.inotify_init1.argtypes = [ctypes.c_int]
+                libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+                libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+                _libc = libc
+            except (OSError, AttributeError):
+                _libc = False
+    return _libc or None
+
+
+@functools.lru_cache(maxsize=None)
+def watchdog_available() -> bool:
+    """watchdog 是否已安装（只查找模块，不导入；使用 watchdog 后端时才导入）"""
+    return importlib.util.find_spec('watchdog') is not None
+
+
+def inotify_available() -> bool:
+    """当前平台是否可以使用 inotify 后端"""
+    return _load_libc() is not None
+
+
+def select_backend(name: str, log_file_path: str) -> str:
+    """确定实际使用的后端
+    
+    Args:
+        name: 配置的后端名称（auto/inotify/watchdog/polling）
+        log_file_path: 日志文件路径
+    
+    Returns:
+        后端名称（inotify/watchdog/polling）
+    """
+    if name == BACKEND_POLLING:
+        return BACKEND_POLLING
+    
+    if name == BACKEND_INOTIFY:
+        if inotify_available():
+            return BACKEND_INOTIFY
+        logger.warning("当前平台不支持 inotify，改用 watchdog 后端")
+        name = BACKEND_WATCHDOG
+    
+    if name == BACKEND_WATCHDOG:
+        if not watchdog_available():
+            logger.warning("watchdog 不可用，改用轮询后端")
+            return BACKEND_POLLING
+        return BACKEND_WATCHDOG
+    
+    if name != BACKEND_AUTO:
+        logger.warning(f"未知的监听后端: {name}，自动选择")
+    
+    unreliable, reason = is_unreliable_fs(log_file_path)
+    if unreliable:
+        logger.info(f"文件事件可能不可靠（{reason}），使用轮询后端")
+        return BACKEND_POLLING
+    if inotify_available():
+        return BACKEND_INOTIFY
+    if watchdog_available():
+        return BACKEND_WATCHDOG
+    return BACKEND_POLLING
+
+
+def backend_candidates(name: str, log_file_path: str) -> List[str]:
+    """按优先级列出可尝试的后端（首选后端及其回退）
+    
+    Args:
+        name: 配置的后端名称
+        log_file_path: 日志文件路径
+    
+    Returns:
+        后端名称列表
+    """
+    selected = select_backend(name, log_file_path)
+    candidates = [selected] + FALLBACK_CHAIN[selected]
+    if not watchdog_available() and BACKEND_WATCHDOG in candidates:
+        candidates.remove(BACKEND_WATCHDOG)
+    return candidates
+
+
+class MonitorBackend(ABC):
+    """监听后端基类"""
+    
+    name = ''
+    
+    def __init__(self, log_file_path: str, notify: Callable[[], None]):
+        """初始化后端
+        
+        Args:
+            log_file_path: 日志文件路径
+            notify: 目标文件可能变化时调用的函数（应尽快返回）
+        """
+        self.log_file_path = os.path.abspath(log_file_path)
+        self.log_dir = os.path.dirname(self.log_file_path)
+        self.notify = notify
+    
+    @abstractmethod
+    def start(self) -> None:
+        """启动后端，失败时抛出异常"""
+    
+    @abstractmethod
+    def stop(self) -> None:
+        """停止后端"""
+    
+    @abstractmethod
+    def is_alive(self) -> bool:
+        """后端是否运行中"""
+
+
+class LogFileHandler:
+    """日志文件事件处理器
+    
+    过滤出与目标日志文件相关的修改、创建、删除和重命名事件。
+    watchdog 的观察者只调用处理器的 dispatch()，因此无需继承 FileSystemEventHandler（避免导入 watchdog）
+    """
+    
+    def __init__(self, log_file_path: str, on_event: Callable[[], None]):
+        """初始化事件处理器
+        
+        Args:
+            log_file_path: 日志文件路径
+            on_event: 目标文件发生事件时的回调函数
+        """
+        self.log_file_path = os.path.abspath(log_file_path)
+        self.callback = on_event
+        
+        logger.info(f"事件处理器已初始化: {self.log_file_path}")
+    
+    def _matches(self, event) -> bool:
+        """事件是否涉及目标日志文件（源路径或重命名目标路径）"""
+        if event.is_directory:
+            return False
+        if os.path.abspath(event.src_path) == self.log_file_path:
+            return True
+        dest_path = getattr(event, 'dest_path', '')
+        return bool(dest_path) and os.path.abspath(dest_path) == self.log_file_path
+    
+    def on_any_event(self, event):
+        """文件事件处理：修改、创建、删除和重命名都交给回调
+        
+        具体变化类型由 FileMonitor 根据文件身份判断
+        
+        Args:
+            event: 文件系统事件
+        """
+        if event.event_type not in ('modified', 'created', 'deleted', 'moved'):
+            return
+        
+        # 只处理目标日志文件
+        if not self._matches(event):
+            return
+        
+        logger.debug(f"检测到文件事件: {event.event_type} {event.src_path}")
+        self.callback()
+    
+    dispatch = on_any_event
+
+
+class WatchdogBackend(MonitorBackend):
+    """watchdog 后端：监听日志目录的系统文件事件"""
+    
+    name = BACKEND_WATCHDOG
+    
+    def __init__(self, log_file_path: str, notify: Callable[[], None]):
+        super().__init__(log_file_path, notify)
+        self.observer = None
+        self.handler: Optional[LogFileHandler] = None
+    
+    def start(self) -> None:
+        if not watchdog_available():
+            raise RuntimeError("watchdog 不可用")
+        from watchdog.observers import Observer
+        
+        self.handler = LogFileHandler(self.log_file_path, self.notify)
+        self.observer = Observer()
+        self.observer.schedule(self.handler, self.log_dir, recursive=False)
+        self.observer.start()
+    
+    def stop(self) -> None:
+        if self.observer:
+            try:
+                self.observer.stop()
+                self.observer.join(timeout=5)
+            finally:
+                self.observer = None
+                self.handler = None
+    
+    def is_alive(self) -> bool:
+        return self.observer is not None and self.observer.is_alive()
+
+
+class InotifyBackend(MonitorBackend):
+    """直接 inotify 后端（Linux）
+    
+    - 目标文件：监听 IN_MODIFY 和自身被移走/删除
+    - 日志目录：只监听重命名、创建和删除，且只处理目标文件名，
+      轮转出的旧文件、备份和 .tmp 文件的写入不会唤醒监听线程
+    - 一次 read() 批量取出所有事件，直接在缓冲区上解析，不为每个事件创建对象；
+      每批最多调用一次 notify
+    """
+    
+    name = BACKEND_INOTIFY
+    
+    # 单次读取的缓冲区大小
+    READ_SIZE = 64 * 1024
+    
+    def __init__(self, log_file_path: str, notify: Callable[[], None]):
+        super().__init__(log_file_path, notify)
+        self._target_name = os.fsencode(os.path.basename(self.log_file_path))
+        self._fd = -1
+        self._dir_wd = -1
+        self._file_wd = -1
+        self._wake_r = -1
+        self._wake_w = -1
+        self._thread: Optional[threading.Thread] = None
+        
+        # 统计信息
+        self.batches = 0
+        self.events = 0
+        self.notifications = 0
+    
+    def _add_watch(self, path: str, mask: int) -> int:
+        """添加监听，失败时返回 -1"""
+        return _load_libc().inotify_add_watch(self._fd, os.fsencode(path), mask)
+    
+    def _watch_file(self) -> None:
+        """（重新）监听当前路径上的日志文件"""
+        wd = self._add_watch(self.log_file_path, INOTIFY_FILE_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err != errno.ENOENT:
+                logger.warning(f"inotify 监听日志文件失败: {os.strerror(err)}")
+        if wd != self._file_wd:
+            self._unwatch_file()
+        self._file_wd = wd
+    
+    def _unwatch_file(self) -> None:
+        """移除对旧文件的监听"""
+        if self._file_wd >= 0:
+            _load_libc().inotify_rm_watch(self._fd, self._file_wd)
+            self._file_wd = -1
+    
+    def process(self, buf: bytes) -> bool:
+        """解析一批 inotify 事件
+        
+        Args:
+            buf: read() 得到的原始缓冲区
+        
+        Returns:
+            这批事件是否涉及目标日志文件
+        """
+        relevant = False
+        rewatch = False
+        file_moved = False
+        file_released = False
+        target = self._target_name
+        target_len = len(target)
+        file_wd = self._file_wd
+        dir_wd = self._dir_wd
+        unpack = _INOTIFY_EVENT.unpack_from
+        header_size = _INOTIFY_EVENT.size
+        
+        offset = 0
+        end = len(buf)
+        count = 0
+        while offset < end:
+            wd, mask, _cookie, name_len = unpack(buf, offset)
+            name_start = offset + header_size
+            offset = name_start + name_len
+            count += 1
+            
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出（wd 为 -1，需在比较监听描述符之前判断），无法确定发生了什么
+                relevant = True
+                rewatch = True
+            elif wd == file_wd:
+                relevant = True
+                if mask & IN_IGNORED:
+                    # 内核已移除监听（文件被删除）
+                    file_released = True
+                elif mask & (IN_MOVE_SELF | IN_DELETE_SELF):
+                    file_moved = True
+            elif wd == dir_wd:
+                # 名称以 NUL 填充，需确认名称恰好等于目标文件名
+                if (name_len > target_len and buf.startswith(target, name_start)
+                        and buf[name_start + target_len] == 0):
+                    relevant = True
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        rewatch = True
+        
+        self.batches += 1
+        self.events += count
+        
+        if file_released:
+            self._file_wd = -1
+        elif file_moved:
+            # 文件被轮转走，不再关心旧文件的写入
+            self._unwatch_file()
+        if rewatch:
+            self._watch_file()
+        return relevant
+    
+    def _run(self) -> None:
+        """监听线程主循环"""
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        poller.register(self._wake_r, select.POLLIN)
+        
+        while True:
+            ready = poller.poll()
+            if any(fd == self._wake_r for fd, _ in ready):
+                return
+            
+            relevant = False
+            while True:
+                try:
+                    buf = os.read(self._fd, self.READ_SIZE)
+                except BlockingIOError:
+                    break
+                except OSError as e:
+                    logger.error(f"读取 inotify 事件失败: {e}")
+                    return
+                if not buf:
+                    break
+                try:
+                    relevant = self.process(buf) or relevant
+                except Exception as e:
+                    logger.error(f"解析 inotify 事件失败: {e}")
+                    relevant = True
+            
+            if relevant:
+                self.notifications += 1
+                self.notify()
+    
+    def start(self) -> None:
+        libc = _load_libc()
+        if libc is None:
+            raise RuntimeError("当前平台不支持 inotify")
+        
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        
+        try:
+            self._dir_wd = self._add_watch(self.log_dir, INOTIFY_DIR_MASK)
+            if self._dir_wd < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, f"inotify 监听目录失败: {os.strerror(err)}")
+            self._watch_file()
+            self._wake_r, self._wake_w = os.pipe()
+        except Exception:
+            os.close(self._fd)
+            self._fd = -1
+            raise
+        
+        self._thread = threading.Thread(target=self._run, name='log-monitor-inotify', daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        if self._thread:
+            os.write(self._wake_w, b'x')
+            if self._thread is not threading.current_thread():
+                self._thread.join(timeout=5)
+            self._thread = None
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd >= 0:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._fd = self._wake_r = self._wake_w = -1
+        self._dir_wd = self._file_wd = -1
+    
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+class PollingBackend(MonitorBackend):
+    """自适应 stat 轮询后端
+    
+    定期比较 (st_size, st_mtime_ns, st_ino)：文件活跃时轮询间隔缩短到下限，
+    空闲时逐步放大到上限
+    """
+    
+    name = BACKEND_POLLING
+    
+    # 每次空闲轮询后间隔的放大倍数
+    BACKOFF_FACTOR = 1.5
+    
+    def __init__(self, log_file_path: str, notify: Callable[[], None],
+                 min_interval_ms: int = 100, max_interval_ms: int = 2000):
+        """初始化轮询后端
+        
+        Args:
+            log_file_path: 日志文件路径
+            notify: 检测到变化时调用的函数
+            min_interval_ms: 文件活跃时的轮询间隔（毫秒）
+            max_interval_ms: 文件空闲时的最大轮询间隔（毫秒）
+        """
+        super().__init__(log_file_path, notify)
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max(max_interval_ms, min_interval_ms)
+        self.interval_ms: float = min_interval_ms
+        
+        self._last_stat: Optional[Tuple[int, int, int]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        """读取文件的 (大小, mtime_ns, inode)，文件不存在时返回 None"""
+        try:
+            st = os.stat(self.log_file_path)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+    
+    def poll(self) -> bool:
+        """执行一次轮询并调整间隔
+        
+        Returns:
+            是否检测到变化
+        """
+        current = self._stat()
+        changed = current != self._last_stat
+        self._last_stat = current
+        
+        if changed:
+            self.interval_ms = self.min_interval_ms
+            self.notify()
+        else:
+            self.interval_ms = min(self.interval_ms * self.BACKOFF_FACTOR, self.max_interval_ms)
+        return changed
+    
+    def _run(self) -> None:
+        """轮询线程主循环"""
+        while not self._stop_event.wait(self.interval_ms / 1000):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"轮询日志文件失败: {e}")
+    
+    def start(self) -> None:
+        self._last_stat = self._stat()
+        self.interval_ms = self.min_interval_ms
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='log-monitor-poller', daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+    
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+def create_backend(name: str, log_file_path: str, notify: Callable[[], None],
+                   **options) -> MonitorBackend:
+    """创建监听后端
+    
+    Args:
+        name: 后端名称（inotify/watchdog/polling）
+        log_file_path: 日志文件路径
+        notify: 变化通知函数
+        **options: 轮询后端参数（min_interval_ms/max_interval_ms）
+    
+    Returns:
+        后端实例
+    """
+    if name == BACKEND_INOTIFY:
+        return InotifyBackend(log_file_path, notify)
+    if name == BACKEND_WATCHDOG:
+        return WatchdogBackend(log_file_path, notify)
+    if name == BACKEND_POLLING:
+        return PollingBackend(log_file_path, notify, **options)
+    raise ValueError(f"未知的监听后端: {name}")
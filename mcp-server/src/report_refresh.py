@@ -0,0 +1,204 @@
+"""
+报告缓存后台重算模块
+
+文件变化会使报告缓存失效，下一次工具调用需要重新扫描日志。ReportRefresher 记录最近请求过的
+报告参数组合，在写入平静（一段时间内没有新的变化）且没有交互请求时，于工作线程中按最近使用顺序
+重算这些报告并写回缓存，使下一次调用直接命中缓存。
+
+重算的优先级最低：任何交互请求开始时都会停止正在进行的重算（结果丢弃），
+等所有交互请求结束并再次平静后才重新开始
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from cache import LogCache
+from log_manager import LogManager
+from scan_progress import ScanProgress
+
+logger = logging.getLogger(__name__)
+
+# 写入平静的默认判定时间（秒）
+DEFAULT_SETTLE = 1.0
+
+# 默认记录的报告参数组合数量
+DEFAULT_MAX_REPORTS = 8
+
+
+class ReportRefresher:
+    """报告缓存后台重算
+    
+    交互请求通过 record 登记报告参数组合（可在工作线程中调用），
+    并用 begin / end 标记请求的开始和结束（在事件循环中调用）
+    """
+    
+    def __init__(self, log_manager: LogManager, cache: LogCache, monitor=None,
+                 settle: float = DEFAULT_SETTLE, max_reports: int = DEFAULT_MAX_REPORTS):
+        """初始化后台重算
+        
+        Args:
+            log_manager: 日志管理器
+            cache: 报告缓存
+            monitor: 文件监听器，由其变化事件触发重算
+            settle: 最后一次变化或交互请求之后等待的平静时间（秒）
+            max_reports: 记录的报告参数组合数量
+        """
+        self.log_manager = log_manager
+        self.cache = cache
+        self.monitor = monitor
+        self.settle = settle
+        self.max_reports = max_reports
+        
+        # (工具名称, 参数键) -> None，按最近使用排序（最近的在末尾）
+        self._reports: 'OrderedDict[Tuple[str, Hashable], None]' = OrderedDict()
+        self._reports_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Optional[ScanProgress] = None
+        self._active = 0
+        self._last_interactive = float('-inf')
+        
+        self.recomputed = 0
+        self.preempted = 0
+    
+    def record(self, name: str, arguments: dict) -> None:
+        """登记一次报告请求的参数组合（只记录有缓存的报告）
+        
+        Args:
+            name: 工具名称
+            arguments: 工具参数
+        """
+        if name == "get_log_summary":
+            key = None
+        elif name == "analyze_errors":
+            key = arguments.get("time_range_hours", 24)
+        elif name == "get_recent_errors" and not arguments.get("cursor") \
+                and not arguments.get("include_stack", False):
+            key = arguments.get("limit", 10)
+        else:
+            return
+        with self._reports_lock:
+            self._reports[(name, key)] = None
+            self._reports.move_to_end((name, key))
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+    
+    def reports(self) -> List[Tuple[str, Hashable]]:
+        """记录的报告参数组合（最近使用的在前）"""
+        with self._reports_lock:
+            return list(reversed(self._reports))
+    
+    def begin(self) -> None:
+        """交互请求开始：停止正在进行的重算"""
+        self._active += 1
+        if self._running is not None:
+            self._running.cancel()
+    
+    def end(self) -> None:
+        """交互请求结束"""
+        self._active -= 1
+        self._last_interactive = asyncio.get_running_loop().time()
+    
+    def start(self) -> None:
+        """启动后台重算任务（需在事件循环中调用，监听器未运行时不启动）"""
+        if self.monitor is None or not self.monitor.is_running():
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    def stop(self) -> None:
+        """停止后台重算任务"""
+        if self._running is not None:
+            self._running.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    async def _run(self) -> None:
+        """后台任务：文件变化后等待平静，再重算记录的报告"""
+        stream = self.monitor.open_stream()
+        dirty = False
+        try:
+            while True:
+                if not dirty:
+                    try:
+                        await stream.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    dirty = True
+                await self._wait_idle(stream)
+                # 被交互请求打断时保持 dirty，再次空闲后重新开始
+                dirty = not await self._refresh()
+        finally:
+            stream.close()
+    
+    async def _wait_idle(self, stream) -> None:
+        """等待写入平静且没有交互请求"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.settle)
+            if stream.drain() or self._active or loop.time() - self._last_interactive < self.settle:
+                continue
+            return
+    
+    async def _refresh(self) -> bool:
+        """按最近使用顺序重算缓存中缺失的报告
+        
+        Returns:
+            是否全部完成（False 表示被交互请求打断）
+        """
+        loop = asyncio.get_running_loop()
+        for name, key in self.reports():
+            if self._active:
+                self.preempted += 1
+                return False
+            progress = ScanProgress()
+            self._running = progress
+            try:
+                await loop.run_in_executor(None, self._recompute, name, key, progress)
+            except Exception as e:
+                logger.warning(f"后台重算 {name} 失败: {e}")
+            finally:
+                self._running = None
+            if progress.cancelled:
+                self.preempted += 1
+                return False
+        return True
+    
+    def _recompute(self, name: str, key: Hashable, progress: ScanProgress) -> None:
+        """重算一个报告并写回缓存（在工作线程中执行；已有缓存、被打断或期间日志变化时不写入）"""
+        cache = self.cache
+        log_manager = self.log_manager
+        if not log_manager.file_exists():
+            return
+        generation = cache.generation
+        if name == "get_log_summary":
+            if cache.get_cached_summary() is None:
+                result = log_manager.get_summary(progress=progress)
+                if not progress.cancelled and cache.set_summary_cache(result, generation):
+                    self.recomputed += 1
+        elif name == "analyze_errors":
+            if cache.get_cached_analysis(key) is None:
+                result = log_manager.analyze_errors(key, progress)
+                if not progress.cancelled and cache.set_analysis_cache(result, key, generation):
+                    self.recomputed += 1
+        elif name == "get_recent_errors":
+            if cache.get_cached_errors(key) is None:
+                result = log_manager.get_recent_errors(key, False, with_cursor=True)
+                if not progress.cancelled and cache.set_errors_cache(result, key, generation):
+                    self.recomputed += 1
+    
+    def get_stats(self) -> dict:
+        """获取统计信息
+        
+        Returns:
+            统计字典
+        """
+        return {
+            'reports': [f"{name}({key})" if key is not None else name for name, key in self.reports()],
+            'recomputed': self.recomputed,
+            'preempted': self.preempted,
+            'running': self._running is not None
+        }
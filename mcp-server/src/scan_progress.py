@@ -0,0 +1,99 @@
+"""
+扫描进度模块
+
+长时间的日志扫描（错误分析、重载统计、没有索引时的统计摘要）通过 ScanProgress
+报告进度（已扫描字节数 / 总字节数），并检查调用方给出的截止时间：
+到达截止时间后扫描停止，调用方返回已扫描部分的结果并标注覆盖范围，而不是一直阻塞到超时。
+后台扫描还可以被取消（cancel），用于让出给交互请求
+"""
+
+import time
+from typing import Callable, Optional
+
+# 两次进度回调之间的默认最小间隔（秒）
+DEFAULT_PROGRESS_INTERVAL = 0.25
+
+
+def deadline_from_ms(deadline_ms: Optional[int]) -> Optional[float]:
+    """把相对截止时间换算为绝对截止时间（time.monotonic() 时钟）
+    
+    请求收到时换算一次，之后等待索引和扫描共用同一个截止时间
+    
+    Args:
+        deadline_ms: 从现在起的毫秒数，None 表示不限制
+    
+    Returns:
+        绝对截止时间，None 表示不限制
+    """
+    return time.monotonic() + deadline_ms / 1000 if deadline_ms is not None else None
+
+
+class ScanProgress:
+    """一次扫描的进度和截止时间
+    
+    扫描方开始时调用 start 给出总字节数，每处理完一块调用 advance；
+    advance 返回 False 表示已到达截止时间，扫描方应停止并返回部分结果
+    """
+    
+    def __init__(self, callback: Optional[Callable[[int, int], None]] = None,
+                 deadline_ms: Optional[int] = None,
+                 interval: float = DEFAULT_PROGRESS_INTERVAL,
+                 deadline: Optional[float] = None):
+        """初始化扫描进度
+        
+        Args:
+            callback: 进度回调 (已扫描字节数, 总字节数)，可能在工作线程中调用
+            deadline_ms: 截止时间（从创建时起的毫秒数），None 表示不限制；也用于部分结果的说明
+            interval: 两次进度回调之间的最小间隔（秒）
+            deadline: 绝对截止时间（deadline_from_ms 的结果），给出时代替 deadline_ms 计算
+        """
+        self.callback = callback
+        self.deadline_ms = deadline_ms
+        self.deadline = deadline if deadline is not None else deadline_from_ms(deadline_ms)
+        self.interval = interval
+        self._next_report = 0.0
+        
+        self.done = 0
+        self.total = 0
+        self.expired = False
+        self.cancelled = False
+    
+    def start(self, total: int, done: int = 0) -> None:
+        """开始扫描
+        
+        Args:
+            total: 总字节数
+            done: 已覆盖的字节数（例如索引已统计的部分）
+        """
+        self.total = total
+        self.done = done
+        self._report(time.monotonic())
+    
+    def cancel(self) -> None:
+        """请求停止扫描（可在其他线程中调用），下一次 advance 返回 False"""
+        self.cancelled = True
+    
+    def advance(self, done: int) -> bool:
+        """更新进度
+        
+        Args:
+            done: 已扫描的字节数（绝对偏移量）
+        
+        Returns:
+            是否继续扫描（False 表示已到达截止时间或已取消）
+        """
+        self.done = done
+        if self.cancelled:
+            return False
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            self.expired = True
+            return False
+        if now >= self._next_report:
+            self._report(now)
+        return True
+    
+    def _report(self, now: float) -> None:
+        if self.callback is not None:
+            self._next_report = now + self.interval
+            self.callback(min(self.done, self.total), self.total)
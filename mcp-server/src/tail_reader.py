@@ -0,0 +1,245 @@
+"""
+增量读取模块
+
+记录日志文件的身份和读取偏移量，只读取新追加的完整行
+"""
+
+import os
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 文件状态：(inode, 已读取字节数, mtime_ns)
+FileState = Tuple[int, int, int]
+
+# 行在文件中的位置：(起始偏移量, 字节数)
+LineSpan = Tuple[int, int]
+
+# 计算文件头校验和的字节数
+HEAD_CHECKSUM_BYTES = 1024
+
+
+def decode_lines(data: bytes) -> List[str]:
+    """将以换行符结尾的字节块解码为行列表
+
+    与文本模式 readlines() 的行为保持一致（通用换行符、忽略非法编码）
+
+    Args:
+        data: 以 b'\\n' 结尾的字节块
+
+    Returns:
+        保留换行符的行列表
+    """
+    if not data:
+        return []
+    text = data.decode('utf-8', errors='ignore')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    parts = text.split('\n')
+    if parts[-1] == '':
+        parts.pop()
+        return [part + '\n' for part in parts]
+    last = parts.pop()
+    return [part + '\n' for part in parts] + [last]
+
+
+def line_spans(data: bytes, start: int, count: int) -> List[Optional[LineSpan]]:
+    """计算 decode_lines(data) 返回的各行在文件中的位置
+
+    Args:
+        data: 以 b'\n' 结尾的字节块
+        start: 字节块在文件中的起始偏移量
+        count: decode_lines 返回的行数
+
+    Returns:
+        与解码结果一一对应的位置列表；单独的 '\r' 把一行拆成多行时位置未知，全部为 None
+    """
+    raw = data.split(b'\n')
+    raw.pop()
+    if len(raw) != count:
+        return [None] * count
+    spans: List[Optional[LineSpan]] = []
+    for part in raw:
+        spans.append((start, len(part) + 1))
+        start += len(part) + 1
+    return spans
+
+
+class TailReader:
+    """增量日志读取器
+
+    从文件末尾预读若干行，之后只读取追加的字节，未以换行结尾的残行暂存到下次读取
+    """
+
+    def __init__(self, log_file_path: str, chunk_size: int = 64 * 1024):
+        """初始化读取器
+
+        Args:
+            log_file_path: 日志文件路径
+            chunk_size: 反向读取时的块大小（字节）
+        """
+        self.log_file_path = log_file_path
+        self.chunk_size = chunk_size
+
+        self.inode: Optional[int] = None
+        self.offset: int = 0
+        self.mtime_ns: int = 0
+        self.pending: bytes = b''
+        # 文件开头的 min(offset, HEAD_CHECKSUM_BYTES) 字节（生成游标用），None 表示未知
+        self.head: Optional[bytes] = None
+        # 上一次 read_tail/read_appended 返回的各行在文件中的位置
+        self.last_spans: List[Optional[LineSpan]] = []
+
+    @property
+    def file_state(self) -> Optional[FileState]:
+        """已读取内容对应的文件状态，存在残行时返回 None"""
+        if self.inode is None or self.pending:
+            return None
+        return (self.inode, self.offset, self.mtime_ns)
+
+    def reset(self) -> None:
+        """重置读取状态"""
+        self.inode = None
+        self.offset = 0
+        self.mtime_ns = 0
+        self.pending = b''
+        self.head = None
+        self.last_spans = []
+
+    def restart(self) -> None:
+        """从当前文件的开头重新开始跟踪（文件被截断、轮转或重建之后）"""
+        self.reset()
+        try:
+            self.inode = os.stat(self.log_file_path).st_ino
+        except FileNotFoundError:
+            return
+        self.head = b''
+
+    def seek_end(self) -> None:
+        """定位到当前文件末尾，之后只读取新追加的内容"""
+        self.reset()
+        try:
+            st = os.stat(self.log_file_path)
+        except FileNotFoundError:
+            return
+        self.inode = st.st_ino
+        self.offset = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+
+    def finish_rotated(self, rotated_path: str, final_offset: int) -> List[str]:
+        """读完被轮转的旧文件中尚未读取的部分
+
+        Args:
+            rotated_path: 旧文件重命名后的路径
+            final_offset: 旧文件的最终大小
+
+        Returns:
+            剩余的日志行（末尾残行也会返回，因为旧文件不会再被写入）
+        """
+        if self.inode is None:
+            return []
+        try:
+            with open(rotated_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_ino != self.inode:
+                    logger.warning(f"轮转文件与跟踪的文件不一致: {rotated_path}")
+                    return []
+                f.seek(self.offset)
+                data = f.read(max(final_offset - self.offset, 0))
+        except OSError as e:
+            logger.warning(f"读取轮转文件失败: {e}")
+            return []
+
+        data = self.pending + data
+        self.offset += len(data) - len(self.pending)
+        self.pending = b''
+        return decode_lines(data)
+
+    def read_tail(self, max_lines: int) -> Tuple[List[str], bool]:
+        """读取文件末尾最多 max_lines 个完整行，并把偏移量定位到文件末尾
+
+        Args:
+            max_lines: 最多返回的行数
+
+        Returns:
+            (行列表, 是否覆盖了整个文件)
+        """
+        self.reset()
+        try:
+            with open(self.log_file_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                size = st.st_size
+                pos = size
+                data = b''
+                while pos > 0 and data.count(b'\n') <= max_lines:
+                    step = min(self.chunk_size, pos)
+                    pos -= step
+                    f.seek(pos)
+                    data = f.read(step) + data
+                if pos > 0:
+                    f.seek(0)
+                    head = f.read(min(size, HEAD_CHECKSUM_BYTES))
+                else:
+                    head = data[:HEAD_CHECKSUM_BYTES]
+        except FileNotFoundError:
+            return [], False
+
+        end = data.rfind(b'\n') + 1
+        body = data[:end]
+        body_start = pos
+        if pos > 0:
+            # 第一行可能不完整，丢弃
+            cut = body.find(b'\n') + 1
+            body = body[cut:]
+            body_start += cut
+
+        lines = decode_lines(body)
+        spans = line_spans(body, body_start, len(lines))
+        complete = pos == 0 and len(lines) <= max_lines
+        if len(lines) > max_lines:
+            lines = lines[-max_lines:]
+            spans = spans[-max_lines:]
+
+        self.head = head
+        self.last_spans = spans
+        self.inode = st.st_ino
+        self.offset = size
+        self.mtime_ns = st.st_mtime_ns
+        self.pending = data[end:]
+        return lines, complete
+
+    def read_appended(self) -> Optional[List[str]]:
+        """读取上次读取之后追加的完整行
+
+        Returns:
+            新增的行列表；文件被截断、替换或删除时返回 None，调用方需重新预读
+        """
+        try:
+            st = os.stat(self.log_file_path)
+        except FileNotFoundError:
+            return None
+
+        if self.inode is None or st.st_ino != self.inode or st.st_size < self.offset:
+            return None
+
+        if st.st_size == self.offset:
+            self.mtime_ns = st.st_mtime_ns
+            self.last_spans = []
+            return []
+
+        with open(self.log_file_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+
+        if self.head is not None and len(self.head) < HEAD_CHECKSUM_BYTES:
+            self.head += data[:HEAD_CHECKSUM_BYTES - len(self.head)]
+        start = self.offset - len(self.pending)
+        self.offset += len(data)
+        self.mtime_ns = st.st_mtime_ns
+
+        data = self.pending + data
+        end = data.rfind(b'\n') + 1
+        self.pending = data[end:]
+        lines = decode_lines(data[:end])
+        self.last_spans = line_spans(data[:end], start, len(lines))
+        return lines
@@ -0,0 +1,253 @@
+"""
+多仓库模块
+
+一个服务进程可以同时服务多个仓库（vault）及其日志：每个仓库拥有独立的一组组件
+（配置管理器、日志管理器、缓存、文件监听、资源订阅、日志索引），工具通过 vault 参数选择仓库。
+跨仓库的报告查询（vault="*"）在工作线程池中并行执行，各仓库的扫描互不阻塞。
+启动后各仓库在后台预热：建立日志索引，并缓存统计摘要和默认时间范围的错误分析；
+之后每次日志变化使缓存失效，空闲时在后台重算最近请求过的报告
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from config_manager import ConfigManager
+from log_manager import LogManager
+from cache import LogCache
+from file_monitor import FileMonitor
+from log_index import LogIndex
+from log_resources import ResourceSubscriptions
+from report_refresh import ReportRefresher
+from scan_progress import ScanProgress
+
+logger = logging.getLogger(__name__)
+
+# vault 参数取该值时查询所有仓库
+ALL_VAULTS = '*'
+
+# 跨仓库查询的默认工作线程数
+DEFAULT_FAN_OUT_WORKERS = 4
+
+# 预热的错误分析时间范围（与 analyze_errors 的默认值一致）
+PREWARM_ANALYSIS_HOURS = 24
+
+T = TypeVar('T')
+
+
+@dataclass
+class VaultComponents:
+    """一个仓库的组件"""
+    name: str
+    config_manager: ConfigManager
+    log_manager: LogManager
+    cache: LogCache
+    file_monitor: Optional[FileMonitor] = None
+    subscriptions: Optional[ResourceSubscriptions] = None
+    log_index: Optional[LogIndex] = None
+    refresher: Optional[ReportRefresher] = None
+    prewarm: bool = True
+    prewarm_task: Optional[asyncio.Task] = field(default=None, init=False)
+    # 启动失败的组件：组件名 -> 错误信息（该仓库以降级模式运行）
+    degraded: Dict[str, str] = field(default_factory=dict, init=False)
+    # 预热中错误分析的扫描进度
+    _warm_progress: Optional[ScanProgress] = field(default=None, init=False, repr=False)
+    
+    async def start(self) -> None:
+        """启动日志索引和文件监听（预读日志末尾等阻塞操作在线程中执行），
+        并在当前事件循环中启动环形缓冲区的增量读取；预热在后台任务中进行，不等待完成
+        
+        单个组件启动失败只记录日志并降级（索引失败时不使用索引，文件监听失败时读取回退到磁盘），
+        不会抛出异常，避免一个仓库的错误让所有请求都失败
+        """
+        loop = asyncio.get_running_loop()
+        if self.log_index:
+            try:
+                await loop.run_in_executor(None, self.log_index.elect)
+            except Exception as e:
+                self._degrade('log_index', e)
+                self.log_index.close()
+                self.log_index = None
+                self.log_manager.index = None
+        if self.file_monitor:
+            try:
+                if await loop.run_in_executor(None, self.file_monitor.start):
+                    if self.log_index:
+                        # 写入者随日志变化即时更新索引
+                        self.log_index.attach(self.file_monitor)
+                    self.file_monitor.start_ingest()
+                    if self.refresher:
+                        self.refresher.start()
+                else:
+                    self._degrade('file_monitor', RuntimeError("文件监听未能启动"))
+            except Exception as e:
+                self._degrade('file_monitor', e)
+        if self.prewarm and self.prewarm_task is None:
+            self.prewarm_task = loop.create_task(self._prewarm())
+    
+    def _degrade(self, component: str, error: Exception) -> None:
+        """记录启动失败的组件"""
+        logger.error(f"仓库 {self.name} 的 {component} 启动失败，以降级模式运行: {error}", exc_info=error)
+        self.degraded[component] = str(error)
+    
+    async def _prewarm(self) -> None:
+        """后台预热：建立日志索引（期间摘要可返回部分结果），再缓存统计摘要和错误分析"""
+        loop = asyncio.get_running_loop()
+        try:
+            if self.log_index and self.log_index.is_writer:
+                await loop.run_in_executor(None, self.log_index.update)
+            await loop.run_in_executor(None, self._warm_reports)
+            logger.info(f"仓库 {self.name} 预热完成")
+        except Exception as e:
+            logger.warning(f"仓库 {self.name} 预热失败: {e}")
+    
+    def _warm_reports(self) -> None:
+        """计算并缓存统计摘要和默认时间范围的错误分析（已有缓存或日志不存在时跳过）"""
+        if not self.log_manager.file_exists():
+            return
+        if self.cache.get_cached_summary() is None:
+            generation = self.cache.generation
+            self.cache.set_summary_cache(self.log_manager.get_summary(), generation)
+        if self.cache.get_cached_analysis(PREWARM_ANALYSIS_HOURS) is None:
+            generation = self.cache.generation
+            self._warm_progress = ScanProgress()
+            try:
+                analysis = self.log_manager.analyze_errors(PREWARM_ANALYSIS_HOURS, self._warm_progress)
+            finally:
+                self._warm_progress = None
+            self.cache.set_analysis_cache(analysis, PREWARM_ANALYSIS_HOURS, generation)
+    
+    def prewarm_done(self) -> bool:
+        """预热是否已完成（未启用预热时视为完成）"""
+        return self.prewarm_task is None or self.prewarm_task.done()
+    
+    def prewarm_progress(self) -> Optional[Tuple[str, int, int]]:
+        """预热当前阶段的进度（不等待）
+        
+        Returns:
+            (阶段说明, 已完成字节数, 总字节数)，进度未知时返回 None
+        """
+        building = self.log_index.build_progress() if self.log_index else None
+        if building is not None:
+            return ("正在建立日志索引", *building)
+        progress = self._warm_progress
+        if progress is not None and progress.total:
+            return "正在预热错误分析", min(progress.done, progress.total), progress.total
+        return None
+    
+    def stop(self) -> None:
+        """停止后台任务和文件监听，释放索引"""
+        if self.prewarm_task is not None:
+            self.prewarm_task.cancel()
+        if self.refresher:
+            self.refresher.stop()
+        if self.subscriptions:
+            self.subscriptions.stop()
+        if self.file_monitor:
+            self.file_monitor.stop()
+        if self.log_index:
+            self.log_index.close()
+
+
+class VaultRegistry:
+    """仓库注册表
+    
+    按名称管理各仓库的组件，并提供跨仓库查询的工作线程池
+    """
+    
+    def __init__(self, default_name: str, max_workers: int = DEFAULT_FAN_OUT_WORKERS):
+        """初始化注册表
+        
+        Args:
+            default_name: 默认仓库名称（未指定 vault 参数时使用）
+            max_workers: 跨仓库查询的工作线程数
+        """
+        self.default_name = default_name
+        self.max_workers = max_workers
+        self._vaults: Dict[str, VaultComponents] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.fan_out_queries = 0
+    
+    def add(self, components: VaultComponents) -> None:
+        """注册仓库
+        
+        Args:
+            components: 仓库组件
+        """
+        self._vaults[components.name] = components
+    
+    def __iter__(self) -> Iterator[VaultComponents]:
+        """按配置顺序遍历所有仓库的组件"""
+        return iter(list(self._vaults.values()))
+    
+    def names(self) -> List[str]:
+        """所有仓库名称（按配置顺序）"""
+        return list(self._vaults)
+    
+    def get(self, name: Optional[str] = None) -> VaultComponents:
+        """获取仓库组件
+        
+        Args:
+            name: 仓库名称，None 表示默认仓库
+        
+        Returns:
+            仓库组件
+        
+        Raises:
+            KeyError: 未知的仓库
+        """
+        return self._vaults[name or self.default_name]
+    
+    @property
+    def default(self) -> VaultComponents:
+        """默认仓库的组件"""
+        return self.get()
+    
+    async def fan_out(self, func: Callable[[VaultComponents], T]) -> List[Tuple[str, T]]:
+        """在工作线程池中对每个仓库并行执行 func
+        
+        Args:
+            func: 接收仓库组件的同步函数
+        
+        Returns:
+            [(仓库名称, 结果)]，按配置顺序
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='vault-fan-out')
+        self.fan_out_queries += 1
+        loop = asyncio.get_running_loop()
+        vaults = list(self._vaults.values())
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, func, vault) for vault in vaults
+        ))
+        return [(vault.name, result) for vault, result in zip(vaults, results)]
+    
+    async def start(self) -> None:
+        """启动所有仓库的文件监听和日志索引（需在事件循环中调用）"""
+        await asyncio.gather(*(vault.start() for vault in self._vaults.values()))
+    
+    def stop(self) -> None:
+        """停止所有仓库的组件和工作线程池"""
+        for vault in self._vaults.values():
+            vault.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    def get_stats(self) -> dict:
+        """获取统计信息
+        
+        Returns:
+            统计字典
+        """
+        return {
+            'vaults': self.names(),
+            'default_vault': self.default_name,
+            'fan_out_workers': self.max_workers,
+            'fan_out_queries': self.fan_out_queries,
+            'prewarming': [vault.name for vault in self._vaults.values() if not vault.prewarm_done()],
+            'degraded': {vault.name: dict(vault.degraded) for vault in self._vaults.values() if vault.degraded}
+        }
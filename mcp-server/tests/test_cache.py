@@ -39,6 +39,17 @@ class TestLogCache:
         assert 'Log 5' in cache.log_entries[0]
         assert 'Log 9' in cache.log_entries[4]
     
+    def test_add_log_entry_publishes_lazily(self):
+        """测试逐行添加不立即复制缓冲区，下一次读取时才发布快照"""
+        cache = LogCache(max_size=10)
+        
+        for i in range(3):
+            cache.add_log_entry(f'[10:30:{i:02d}.000] [LOG] Log {i}')
+        
+        assert cache._tail.entries == ()
+        assert len(cache.get_log_entries()) == 3
+        assert len(cache._tail.entries) == 3
+    
     def test_get_log_entries_all(self):
         """测试获取所有日志条目"""
         cache = LogCache(max_size=10)
@@ -158,3 +169,102 @@ class TestLogCache:
         assert cache.file_metadata['mtime'] == 123456
         assert cache.file_metadata['lines'] == 100
 
+    
+    def test_level_sub_rings(self):
+        """测试按级别拆分的子环"""
+        cache = LogCache(max_size=10)
+        
+        cache.add_log_entry('[10:30:01.000] [LOG] Log 1')
+        cache.add_log_entry('[10:30:02.000] [ERROR] Error 1')
+        cache.add_log_entry('[10:30:03.000] [WARN] Warn 1')
+        
+        assert list(cache.level_entries['ERROR']) == ['[10:30:02.000] [ERROR] Error 1']
+        assert len(cache.level_entries['LOG']) == 1
+        assert len(cache.level_entries['DEBUG']) == 0
+    
+    def test_get_tail(self):
+        """测试从环形缓冲区读取"""
+        cache = LogCache(max_size=5)
+        state = (1, 100, 200)
+        entries = [f'[10:30:0{i}.000] [{"ERROR" if i % 2 else "LOG"}] Log {i}\n' for i in range(4)]
+        
+        cache.reset_tail(entries, complete=True, state=state)
+        
+        assert cache.get_tail(2, 'all', state) == entries[-2:]
+        assert cache.get_tail(5, 'all', state) == entries
+        assert cache.get_tail(5, 'error', state) == [entries[1], entries[3]]
+        
+        # 文件状态不一致时未命中
+        assert cache.get_tail(2, 'all', (1, 120, 300)) is None
+        # 超过容量时未命中
+        assert cache.get_tail(6, 'all', state) is None
+    
+    def test_get_tail_incomplete(self):
+        """测试缓冲区溢出后不足的请求回退到磁盘"""
+        cache = LogCache(max_size=3)
+        state = (1, 100, 200)
+        
+        cache.reset_tail(['[10:30:00.000] [LOG] a\n'], complete=True, state=state)
+        cache.extend_tail([f'[10:30:0{i}.000] [LOG] b{i}\n' for i in range(1, 4)], state)
+        
+        assert cache.tail_complete is False
+        assert len(cache.get_tail(3, 'all', state)) == 3
+        assert cache.get_tail(1, 'error', state) is None
+    
+    def test_invalidate_tail(self):
+        """测试缓冲区失效"""
+        cache = LogCache(max_size=5)
+        state = (1, 100, 200)
+        cache.reset_tail(['[10:30:00.000] [LOG] a\n'], complete=True, state=state)
+        
+        cache.invalidate_tail()
+        assert cache.get_tail(1, 'all', state) is None
+        
+        cache.reset_tail(['[10:30:00.000] [LOG] a\n'], complete=True, state=state)
+        cache.clear()
+        assert cache.get_tail(1, 'all', state) is None
+    
+    def test_stale_generation_dropped(self):
+        """测试计算期间发生失效时丢弃过期结果"""
+        cache = LogCache(max_size=10)
+        
+        generation = cache.generation
+        cache.invalidate()
+        assert cache.generation == generation + 1
+        
+        # 基于旧代数计算的结果不会写入
+        assert cache.set_summary_cache('Old Summary', generation) is False
+        assert cache.get_cached_summary() is None
+        
+        # 基于当前代数的结果正常写入
+        assert cache.set_summary_cache('New Summary', cache.generation) is True
+        assert cache.get_cached_summary() == 'New Summary'
+    
+    def test_targeted_invalidate_keeps_others(self):
+        """测试按类型失效只移除对应条目"""
+        cache = LogCache(max_size=10)
+        cache.set_summary_cache('Summary')
+        cache.set_errors_cache('Errors 5', 5)
+        cache.set_errors_cache('Errors 10', 10)
+        
+        cache.invalidate_errors()
+        
+        assert cache.get_cached_summary() == 'Summary'
+        assert cache.get_cached_errors(5) is None
+        assert cache.get_cached_errors(10) is None
+    
+    def test_snapshot_immutable(self):
+        """测试已发布的快照不受后续写入影响"""
+        cache = LogCache(max_size=10)
+        state = (1, 100, 200)
+        cache.reset_tail(['[10:30:00.000] [LOG] a\n'], complete=True, state=state)
+        cache.set_summary_cache('Summary')
+        
+        snapshot = cache.snapshot()
+        cache.invalidate()
+        cache.extend_tail(['[10:30:01.000] [ERROR] b\n'], state)
+        
+        assert snapshot.entries[('summary', None)].value == 'Summary'
+        assert cache.get_tail(2, 'all', state) == [
+            '[10:30:00.000] [LOG] a\n', '[10:30:01.000] [ERROR] b\n'
+        ]
@@ -222,7 +222,191 @@ class TestConfigManager:
         
         # 验证重载请求已添加
         config = manager.read_plugin_config()
-        assert '_reloadRequest' in config
-        assert config['_reloadRequest']['pluginId'] == 'test-plugin'
-        assert 'timestamp' in config['_reloadRequest']
+        assert '_reloadQueue' in config
+        assert config['_reloadQueue'][0]['pluginId'] == 'test-plugin'
+        assert 'timestamp' in config['_reloadQueue'][0]
+        assert 'id' in config['_reloadQueue'][0]
 
+    
+    def test_plugin_config_cache(self, config_file, plugin_data_file):
+        """测试文件未变化时复用缓存，外部修改后重新解析"""
+        manager = ConfigManager(config_file)
+        
+        manager.get_watched_plugins()
+        manager.get_auto_reload_mode()
+        manager.read_plugin_config()
+        assert manager.plugin_config_loads == 1
+        
+        # 返回的是副本，修改不影响缓存
+        manager.read_plugin_config()['autoReload']['mode'] = 'auto'
+        assert manager.get_auto_reload_mode() == 'smart'
+        
+        # 外部（插件）修改文件
+        with open(plugin_data_file, 'w', encoding='utf-8') as f:
+            json.dump({"autoReload": {"mode": "manual", "watchedPlugins": []}}, f)
+        
+        assert manager.get_auto_reload_mode() == 'manual'
+        assert manager.plugin_config_loads == 2
+    
+    def test_batch_watched_plugins_single_write(self, config_file, plugin_data_file):
+        """测试批量添加/移除只写入一次"""
+        manager = ConfigManager(config_file)
+        plugins = [f'plugin-{i}' for i in range(20)]
+        
+        assert manager.add_watched_plugins(plugins + ['test-plugin']) is True
+        assert manager.plugin_config_writes == 1
+        assert manager.get_watched_plugins() == ['test-plugin'] + plugins
+        
+        assert manager.remove_watched_plugins(plugins[:10]) is True
+        assert manager.plugin_config_writes == 2
+        assert manager.get_watched_plugins() == ['test-plugin'] + plugins[10:]
+        assert manager.plugin_config_loads == 1
+    
+    def test_modify_plugin_config(self, config_file, plugin_data_file):
+        """测试事务：多个修改合并为一次写入，无变化时不写入"""
+        manager = ConfigManager(config_file)
+        
+        assert manager.modify_plugin_config(
+            lambda c: c['autoReload'].update({'mode': 'manual'}),
+            lambda c: c.update({'extra': 1})
+        ) is True
+        assert manager.plugin_config_writes == 1
+        
+        with open(plugin_data_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        assert saved['autoReload']['mode'] == 'manual'
+        assert saved['extra'] == 1
+        
+        assert manager.set_auto_reload_mode('manual') is True
+        assert manager.plugin_config_writes == 1
+    
+    def test_concurrent_modification_retried(self, config_file, plugin_data_file):
+        """测试写入前文件被插件改写时重新读取并重新应用修改"""
+        manager = ConfigManager(config_file)
+        calls = []
+        
+        def mutate(config):
+            calls.append(dict(config))
+            if len(calls) == 1:
+                # 模拟插件在读取之后、写入之前保存了设置
+                with open(plugin_data_file, 'w', encoding='utf-8') as f:
+                    json.dump({"autoReload": {"mode": "smart", "watchedPlugins": ["test-plugin"]},
+                               "logger": {"flushInterval": 250}}, f)
+            config['autoReload']['mode'] = 'manual'
+        
+        assert manager.modify_plugin_config(mutate) is True
+        assert len(calls) == 2
+        assert manager.plugin_config_conflicts == 1
+        
+        with open(plugin_data_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        assert saved['autoReload']['mode'] == 'manual'
+        assert saved['logger'] == {"flushInterval": 250}
+    
+    def test_modification_during_write_retried(self, config_file, plugin_data_file, monkeypatch):
+        """测试写入临时文件期间文件被改写时不覆盖（重命名之前重新比较哈希）"""
+        manager = ConfigManager(config_file)
+        dumps = json.dumps
+        calls = []
+        
+        def racing_dumps(obj, **kwargs):
+            calls.append(obj)
+            if len(calls) == 1:
+                # 模拟插件在比较之后、重命名之前保存了设置
+                with open(plugin_data_file, 'w', encoding='utf-8') as f:
+                    f.write(dumps({"autoReload": {"mode": "smart"}, "logger": {"flushInterval": 250}}))
+            return dumps(obj, **kwargs)
+        
+        monkeypatch.setattr(json, 'dumps', racing_dumps)
+        assert manager.modify_plugin_config(lambda c: c.update({'extra': 1})) is True
+        assert manager.plugin_config_conflicts == 1
+        
+        with open(plugin_data_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        assert saved['logger'] == {"flushInterval": 250}
+        assert saved['extra'] == 1
+        assert not [name for name in os.listdir(os.path.dirname(plugin_data_file)) if name.endswith('.tmp')]
+    
+    def test_conflict_retries_exhausted(self, config_file, plugin_data_file):
+        """测试持续冲突时放弃写入"""
+        manager = ConfigManager(config_file)
+        manager.max_write_retries = 2
+        
+        def mutate(config):
+            with open(plugin_data_file, 'a', encoding='utf-8') as f:
+                f.write(' ')
+            config['extra'] = True
+        
+        assert manager.modify_plugin_config(mutate) is False
+        assert manager.plugin_config_conflicts == 3
+        assert manager.plugin_config_writes == 0
+    
+    def test_advisory_lock(self, temp_dir, plugin_data_file):
+        """测试启用 fcntl 建议锁"""
+        pytest.importorskip('fcntl')
+        config_path = os.path.join(temp_dir, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump({"vault_path": temp_dir, "plugin_config": {"advisory_lock": True}}, f)
+        
+        manager = ConfigManager(config_path)
+        assert manager.advisory_lock is True
+        assert manager.add_watched_plugins(['locked-plugin']) is True
+        assert os.path.exists(manager.lock_path)
+        assert 'locked-plugin' in manager.get_watched_plugins()
+    
+    def test_reload_queue_keeps_all_plugins(self, config_file, plugin_data_file):
+        """测试快速连续触发不同插件时请求不会互相覆盖"""
+        manager = ConfigManager(config_file)
+        
+        assert manager.trigger_plugin_reload('plugin-a') is True
+        assert manager.trigger_plugin_reload('plugin-b') is True
+        
+        pending = manager.get_pending_reloads()
+        assert [entry['pluginId'] for entry in pending] == ['plugin-a', 'plugin-b']
+    
+    def test_reload_queue_coalesce_and_batch(self, config_file, plugin_data_file):
+        """测试批量提交一次写入，窗口内的重复请求合并"""
+        manager = ConfigManager(config_file)
+        
+        first = manager.enqueue_plugin_reloads(['plugin-a', 'plugin-b', 'plugin-a'])
+        assert list(first) == ['plugin-a', 'plugin-b']
+        assert first['plugin-a'] != first['plugin-b']
+        assert manager.plugin_config_writes == 1
+        
+        second = manager.enqueue_plugin_reloads(['plugin-b', 'plugin-c'])
+        assert second['plugin-b'] == first['plugin-b']
+        assert [entry['pluginId'] for entry in manager.get_pending_reloads()] == [
+            'plugin-a', 'plugin-b', 'plugin-c'
+        ]
+        
+        # 窗口外的请求不合并
+        manager.reload_coalesce_ms = -1
+        third = manager.enqueue_plugin_reloads(['plugin-a'])
+        assert third['plugin-a'] != first['plugin-a']
+        assert len(manager.get_pending_reloads()) == 4
+    
+    def test_multiple_vaults(self, temp_dir):
+        """测试 vaults 列表：仓库条目覆盖顶层配置，名称缺省时取目录名"""
+        config_path = os.path.join(temp_dir, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "cache_size": 100,
+                "vaults": [
+                    {"name": "main", "vault_path": os.path.join(temp_dir, 'main')},
+                    {"vault_path": os.path.join(temp_dir, 'work'), "cache_size": 10}
+                ],
+                "default_vault": "work"
+            }, f)
+        
+        default = ConfigManager(config_path)
+        assert default.vault_name == 'work'
+        assert default.vault_names == ['main', 'work']
+        assert default.config['cache_size'] == 10
+        assert 'vaults' not in default.config
+        
+        main = ConfigManager(config_path, 'main')
+        assert main.vault_path == os.path.join(temp_dir, 'main')
+        assert main.config['cache_size'] == 100
+        
+        with pytest.raises(ValueError):
+            ConfigManager(config_path, 'unknown')
@@ -0,0 +1,169 @@
+"""
+守护进程模块单元测试
+"""
+
+import io
+import os
+import json
+import socket
+import asyncio
+import threading
+import pytest
+import daemon
+from daemon import DaemonServer, daemon_paths, connect, relay, read_port_file, write_port_file, USE_UNIX_SOCKET
+
+
+async def _echo_session(read_stream, write_stream):
+    """把收到的每条消息原样发回"""
+    async with write_stream:
+        async for message in read_stream:
+            await write_stream.send(message)
+
+
+class TestDaemonPaths:
+    """运行时文件路径测试"""
+    
+    def test_paths_per_vault(self, temp_dir):
+        """测试同一仓库得到相同的路径，不同仓库不同"""
+        log_path = os.path.join(temp_dir, 'obsidian-debug.log')
+        first = daemon_paths(log_path, '/vault/a', run_dir=temp_dir)
+        
+        assert first == daemon_paths(log_path, '/vault/a', run_dir=temp_dir)
+        assert first.daemon_id != daemon_paths(log_path, '/vault/b', run_dir=temp_dir).daemon_id
+        assert first.socket_path.startswith(temp_dir)
+
+
+class TestDaemonServer:
+    """守护进程测试"""
+    
+    def test_serve_multiple_clients(self, temp_dir):
+        """测试多个客户端同时连接，各自独立会话，空闲后退出并清理"""
+        paths = daemon_paths(os.path.join(temp_dir, 'obsidian-debug.log'), run_dir=temp_dir)
+        message = {'jsonrpc': '2.0', 'method': 'notifications/initialized'}
+        
+        async def run():
+            server = DaemonServer(paths, _echo_session, idle_timeout=0.3)
+            assert server.acquire_lock()
+            await server.start()
+            serving = asyncio.ensure_future(server.serve_until_idle())
+            
+            async def client():
+                if USE_UNIX_SOCKET:
+                    reader, writer = await asyncio.open_unix_connection(paths.socket_path)
+                else:
+                    port, token = read_port_file(paths.port_path)
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                    writer.write(token.encode() + b'\n')
+                writer.write(json.dumps(message).encode() + b'\n')
+                await writer.drain()
+                reply = json.loads(await reader.readline())
+                writer.close()
+                return reply
+            
+            replies = await asyncio.gather(client(), client(), client())
+            stats = server.get_stats()
+            await asyncio.wait_for(serving, 5)
+            return replies, stats
+        
+        replies, stats = asyncio.run(run())
+        
+        assert replies == [message] * 3
+        assert stats['total_connections'] == 3
+        assert connect(paths) is None
+    
+    def test_tcp_requires_token(self, temp_dir, monkeypatch):
+        """测试回环 TCP 传输：端口文件权限 0600，令牌不匹配的连接被关闭"""
+        monkeypatch.setattr(daemon, 'USE_UNIX_SOCKET', False)
+        paths = daemon_paths(os.path.join(temp_dir, 'obsidian-debug.log'), run_dir=temp_dir)
+        message = {'jsonrpc': '2.0', 'method': 'notifications/initialized'}
+        
+        async def run():
+            server = DaemonServer(paths, _echo_session, idle_timeout=0)
+            await server.start()
+            port, _ = read_port_file(paths.port_path)
+            mode = os.stat(paths.port_path).st_mode & 0o777
+            
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'wrong-token\n' + json.dumps(message).encode() + b'\n')
+            await writer.drain()
+            rejected = await reader.read()
+            writer.close()
+            
+            def shim():
+                sock = connect(paths)
+                try:
+                    sock.sendall(json.dumps(message).encode() + b'\n')
+                    return sock.makefile('rb').readline()
+                finally:
+                    sock.close()
+            reply = await asyncio.get_running_loop().run_in_executor(None, shim)
+            stats = server.get_stats()
+            server.close()
+            return mode, rejected, json.loads(reply), stats
+        
+        mode, rejected, reply, stats = asyncio.run(run())
+        
+        if os.name == 'posix':
+            assert mode == 0o600
+        assert rejected == b''
+        assert reply == message
+        assert stats['rejected_connections'] == 1
+        assert stats['total_connections'] == 1
+    
+    def test_close_keeps_foreign_port_file(self, temp_dir, monkeypatch):
+        """测试端口文件已被其他守护进程改写时关闭不删除"""
+        monkeypatch.setattr(daemon, 'USE_UNIX_SOCKET', False)
+        paths = daemon_paths(os.path.join(temp_dir, 'obsidian-debug.log'), run_dir=temp_dir)
+        
+        async def run():
+            first = DaemonServer(paths, _echo_session, idle_timeout=0)
+            await first.start()
+            write_port_file(paths.port_path, 1, 'other-token')
+            first.close()
+            kept = read_port_file(paths.port_path)
+            
+            second = DaemonServer(paths, _echo_session, idle_timeout=0)
+            await second.start()
+            second.close()
+            return kept
+        
+        assert asyncio.run(run()) == (1, 'other-token')
+        assert not os.path.exists(paths.port_path)
+    
+    @pytest.mark.skipif(daemon.fcntl is None and daemon.msvcrt is None, reason="平台不支持文件锁")
+    def test_single_instance_lock(self, temp_dir):
+        """测试同一仓库只能有一个守护进程"""
+        paths = daemon_paths(os.path.join(temp_dir, 'obsidian-debug.log'), run_dir=temp_dir)
+        
+        async def run():
+            first = DaemonServer(paths, _echo_session)
+            second = DaemonServer(paths, _echo_session)
+            try:
+                return first.acquire_lock(), second.acquire_lock()
+            finally:
+                first.close()
+        
+        assert asyncio.run(run()) == (True, False)
+
+
+class TestRelay:
+    """转发器测试"""
+    
+    def test_relay_both_directions(self):
+        """测试 stdin 写入套接字、套接字内容写到 stdout，对端关闭后返回"""
+        shim_side, daemon_side = socket.socketpair()
+        received = []
+        
+        def daemon():
+            received.append(daemon_side.recv(1024))
+            daemon_side.sendall(b'{"reply": 1}\n')
+            daemon_side.close()
+        
+        thread = threading.Thread(target=daemon)
+        thread.start()
+        stdout = io.BytesIO()
+        relay(shim_side, io.BytesIO(b'{"request": 1}\n'), stdout)
+        thread.join()
+        
+        assert received == [b'{"request": 1}\n']
+        assert stdout.getvalue() == b'{"reply": 1}\n'
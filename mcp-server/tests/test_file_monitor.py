@@ -0,0 +1,265 @@
+"""
+FileMonitor 模块单元测试
+"""
+
+import os
+import time
+import asyncio
+import threading
+import pytest
+from cache import LogCache
+from tail_reader import TailReader
+from file_monitor import (
+    CoalescingScheduler, FileChangeEvent, FileMonitor, follow_change, merge_events,
+    read_file_identity, CHANGE_APPEND, CHANGE_TRUNCATE, CHANGE_ROTATE, CHANGE_RECREATE
+)
+
+
+class TestCoalescingScheduler:
+    """CoalescingScheduler 测试类"""
+    
+    @pytest.fixture
+    def calls(self):
+        return []
+    
+    def test_trailing_edge(self, calls):
+        """测试突发事件只在最后一次事件之后触发一次"""
+        scheduler = CoalescingScheduler(lambda: calls.append(time.monotonic()),
+                                        debounce_ms=50, adaptive=False)
+        scheduler.start()
+        try:
+            last = 0
+            for _ in range(5):
+                scheduler.trigger()
+                last = time.monotonic()
+                time.sleep(0.01)
+            time.sleep(0.2)
+            
+            assert len(calls) == 1
+            assert calls[0] - last >= 0.04
+            assert scheduler.get_stats()['coalesced'] == 4
+        finally:
+            scheduler.stop()
+    
+    def test_max_wait(self, calls):
+        """测试持续写入时最长等待后必定触发"""
+        scheduler = CoalescingScheduler(lambda: calls.append(time.monotonic()),
+                                        debounce_ms=100, max_wait_ms=150, adaptive=False)
+        scheduler.start()
+        try:
+            end = time.monotonic() + 0.5
+            while time.monotonic() < end:
+                scheduler.trigger()
+                time.sleep(0.02)
+            
+            assert len(calls) >= 2
+        finally:
+            scheduler.stop()
+    
+    def test_adaptive_window(self):
+        """测试窗口随写入间隔调整"""
+        scheduler = CoalescingScheduler(lambda: None, debounce_ms=100, min_debounce_ms=20,
+                                        max_debounce_ms=500, flush_interval_ms=400)
+        assert scheduler.window_ms == 100
+        
+        # 同一次写入的事件不计入间隔
+        scheduler._last_event = 10.0
+        scheduler._observe(10.005)
+        assert scheduler.write_interval_ms == 400
+        
+        # 写入变频繁，窗口收缩到下限
+        for i in range(30):
+            scheduler._last_event = 10.0
+            scheduler._observe(10.03)
+        assert scheduler.window_ms == 20
+    
+    def test_stop_discards_pending(self, calls):
+        """测试停止后不再触发"""
+        scheduler = CoalescingScheduler(lambda: calls.append(1), debounce_ms=50, adaptive=False)
+        scheduler.start()
+        scheduler.trigger()
+        scheduler.stop()
+        time.sleep(0.1)
+        
+        assert calls == []
+
+
+class TestFileChangeDetection:
+    """文件变化分类测试"""
+    
+    @pytest.fixture
+    def monitor(self, temp_dir):
+        log_path = os.path.join(temp_dir, 'obsidian-debug.log')
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write('[10:30:45.123] [LOG] first\n')
+        
+        monitor = FileMonitor(log_path, LogCache(max_size=10))
+        monitor.identity = read_file_identity(log_path)
+        monitor._prime_tail()
+        
+        events = []
+        monitor.subscribe(events.append)
+        return monitor, events
+    
+    @staticmethod
+    def _append(path, text):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(text)
+    
+    def test_append(self, monitor):
+        """测试追加"""
+        monitor, events = monitor
+        self._append(monitor.log_file_path, '[10:30:46.000] [ERROR] second\n')
+        monitor._on_file_modified()
+        
+        assert [e.kind for e in events] == [CHANGE_APPEND]
+        assert events[0].size > events[0].previous_size
+        assert list(monitor.cache.level_entries['ERROR']) == ['[10:30:46.000] [ERROR] second\n']
+    
+    def test_truncate(self, monitor):
+        """测试清空（截断）后重新写入"""
+        monitor, events = monitor
+        with open(monitor.log_file_path, 'w', encoding='utf-8') as f:
+            f.write('[11:00:00.000] [WARN] after clear, longer than before\n')
+        monitor._on_file_modified()
+        
+        assert [e.kind for e in events] == [CHANGE_TRUNCATE]
+        assert list(monitor.cache.log_entries) == ['[11:00:00.000] [WARN] after clear, longer than before\n']
+    
+    def test_rotate(self, monitor):
+        """测试重命名轮转，读取方可以先读完旧文件再切换"""
+        monitor, events = monitor
+        reader = TailReader(monitor.log_file_path)
+        reader.read_tail(10)
+        
+        path = monitor.log_file_path
+        self._append(path, '[10:30:47.000] [LOG] last line of old file\n')
+        rotated = path.replace('.log', '-2025-01-01T00-00-00.log')
+        os.rename(path, rotated)
+        self._append(path, '[10:30:48.000] [LOG] new file\n')
+        monitor._on_file_modified()
+        
+        assert [e.kind for e in events] == [CHANGE_ROTATE]
+        event = events[0]
+        assert event.rotated_path == rotated
+        assert event.final_offset == os.path.getsize(rotated)
+        
+        assert follow_change(reader, event) == [
+            '[10:30:47.000] [LOG] last line of old file\n',
+            '[10:30:48.000] [LOG] new file\n'
+        ]
+        assert list(monitor.cache.log_entries) == ['[10:30:48.000] [LOG] new file\n']
+    
+    def test_recreate(self, monitor):
+        """测试删除后重新创建"""
+        monitor, events = monitor
+        os.remove(monitor.log_file_path)
+        monitor._on_file_modified()
+        assert events == []
+        
+        self._append(monitor.log_file_path, '[10:31:00.000] [LOG] recreated\n')
+        monitor._on_file_modified()
+        
+        assert [e.kind for e in events] == [CHANGE_RECREATE]
+    
+    def test_no_change(self, monitor):
+        """测试无实质变化时不通知"""
+        monitor, events = monitor
+        monitor._on_file_modified()
+        
+        assert events == []
+
+
+class TestChangeStream:
+    """事件循环桥接测试"""
+    
+    @staticmethod
+    def _event(kind, size, previous_size=0, **kwargs):
+        return FileChangeEvent(kind, '/tmp/obsidian-debug.log', 1, size, previous_size, **kwargs)
+    
+    def test_merge_events(self):
+        """测试事件合并保留结构性变化和最早的 previous_size"""
+        merged = merge_events(self._event(CHANGE_APPEND, 20, 10), self._event(CHANGE_APPEND, 30, 20))
+        assert (merged.kind, merged.previous_size, merged.size) == (CHANGE_APPEND, 10, 30)
+        
+        rotate = self._event(CHANGE_ROTATE, 5, 30, rotated_path='/tmp/old.log', final_offset=30)
+        merged = merge_events(rotate, self._event(CHANGE_APPEND, 40, 5))
+        assert merged.kind == CHANGE_ROTATE
+        assert (merged.rotated_path, merged.final_offset, merged.size) == ('/tmp/old.log', 30, 40)
+        
+        merged = merge_events(self._event(CHANGE_APPEND, 40, 30), self._event(CHANGE_TRUNCATE, 0, 40))
+        assert merged.kind == CHANGE_TRUNCATE
+    
+    def test_delivery_from_thread(self, temp_log_file):
+        """测试监听线程的事件按顺序投递到事件循环"""
+        monitor = FileMonitor(temp_log_file, LogCache(max_size=10))
+        
+        async def consume():
+            stream = monitor.open_stream()
+            events = [self._event(CHANGE_APPEND, size) for size in (1, 2, 3)]
+            thread = threading.Thread(target=lambda: [monitor._emit(e) for e in events])
+            thread.start()
+            received = []
+            async for event in stream:
+                received.append(event.size)
+                if len(received) == 3:
+                    stream.close()
+            thread.join()
+            return received
+        
+        assert asyncio.run(consume()) == [1, 2, 3]
+    
+    def test_full_queue_coalesces(self, temp_log_file):
+        """测试队列已满时合并事件而不阻塞监听线程"""
+        monitor = FileMonitor(temp_log_file, LogCache(max_size=10))
+        
+        async def consume():
+            stream = monitor.open_stream(maxsize=1)
+            for size in (1, 2, 3, 4):
+                monitor._emit(self._event(CHANGE_APPEND, size, size - 1))
+            await asyncio.sleep(0)
+            first = await stream.__anext__()
+            second = await stream.__anext__()
+            stream.close()
+            rest = [event async for event in stream]
+            return first, second, rest, stream.coalesced
+        
+        first, second, rest, coalesced = asyncio.run(consume())
+        assert first.size == 1
+        assert (second.previous_size, second.size) == (1, 4)
+        assert rest == []
+        assert coalesced == 3
+    
+    def test_ingest_on_loop(self, temp_dir):
+        """测试环形缓冲区由事件循环中的任务更新"""
+        log_path = os.path.join(temp_dir, 'obsidian-debug.log')
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write('[10:30:45.123] [LOG] first\n')
+        monitor = FileMonitor(log_path, LogCache(max_size=10))
+        monitor.identity = read_file_identity(log_path)
+        monitor._prime_tail()
+        threads = []
+        feed_tail = monitor._feed_tail
+        
+        def record_thread(event):
+            threads.append(threading.current_thread())
+            feed_tail(event)
+        
+        monitor._feed_tail = record_thread
+        
+        async def run():
+            task = monitor.start_ingest()
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write('[10:30:46.000] [ERROR] second\n')
+            await asyncio.get_running_loop().run_in_executor(None, monitor._on_file_modified)
+            for _ in range(50):
+                if len(monitor.cache.log_entries) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            monitor.stop()
+            await asyncio.wait_for(task, 1)
+        
+        asyncio.run(run())
+        assert list(monitor.cache.level_entries['ERROR']) == ['[10:30:46.000] [ERROR] second\n']
+        # 文件读取在线程池中执行，不阻塞事件循环
+        assert threads and threading.main_thread() not in threads
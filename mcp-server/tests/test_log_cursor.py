@@ -0,0 +1,256 @@
+"""
+LogCursor 模块单元测试
+"""
+
+import os
+import pytest
+from log_cursor import LogCursor, cursor_at_end, read_since, read_page_before, scan_backward
+from log_manager import LogManager
+from tail_reader import TailReader
+from cache import LogCache
+import log_manager as log_manager_module
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+class TestLogCursor:
+    """日志游标测试"""
+    
+    def test_encode_decode(self):
+        """测试编码往返"""
+        cursor = LogCursor(123456, 789, 789, 0xDEADBEEF)
+        assert LogCursor.decode(cursor.encode()) == cursor
+        
+        with pytest.raises(ValueError):
+            LogCursor.decode('not-a-cursor')
+    
+    def test_read_since_appended(self, temp_log_file):
+        """测试只返回游标之后追加的完整行"""
+        cursor = cursor_at_end(temp_log_file)
+        _append(temp_log_file, '[10:31:00.000] [LOG] new\n[10:31:01.000] [LOG] partial')
+        
+        read = read_since(temp_log_file, cursor)
+        assert read.lines == ['[10:31:00.000] [LOG] new\n']
+        assert read.reset is False
+        
+        # 残行写完后才返回
+        _append(temp_log_file, ' done\n')
+        read = read_since(temp_log_file, read.cursor)
+        assert read.lines == ['[10:31:01.000] [LOG] partial done\n']
+        assert read_since(temp_log_file, read.cursor).lines == []
+    
+    def test_read_since_truncated(self, temp_log_file):
+        """测试清空后从新文件开头读取"""
+        cursor = cursor_at_end(temp_log_file)
+        with open(temp_log_file, 'w', encoding='utf-8') as f:
+            f.write('[11:00:00.000] [LOG] after clear, a line that is longer than before\n' * 5)
+        
+        read = read_since(temp_log_file, cursor)
+        assert read.reset is True
+        assert len(read.lines) == 5
+    
+    def test_read_since_rotated(self, temp_dir):
+        """测试轮转后先读完旧文件再读新文件"""
+        path = os.path.join(temp_dir, 'obsidian-debug.log')
+        _append(path, '[10:30:00.000] [LOG] old\n')
+        cursor = cursor_at_end(path)
+        
+        _append(path, '[10:30:01.000] [LOG] old tail\n')
+        rotated = os.path.join(temp_dir, 'obsidian-debug-2025-01-01T00-00-00.log')
+        os.rename(path, rotated)
+        _append(path, '[10:30:02.000] [LOG] new\n')
+        
+        read = read_since(path, cursor)
+        assert read.lines == ['[10:30:01.000] [LOG] old tail\n', '[10:30:02.000] [LOG] new\n']
+        assert read.rotated_from == rotated
+        assert read.gap is False
+        
+        # 旧文件不存在时报告可能丢失
+        os.remove(rotated)
+        read = read_since(path, cursor)
+        assert read.gap is True
+        assert read.lines == ['[10:30:02.000] [LOG] new\n']
+    
+    def test_read_since_max_bytes(self, temp_log_file):
+        """测试超过字节上限时分批返回"""
+        cursor = cursor_at_end(temp_log_file)
+        _append(temp_log_file, ''.join(f'[10:31:0{i}.000] [LOG] line {i}\n' for i in range(6)))
+        
+        first = read_since(temp_log_file, cursor, max_bytes=60)
+        assert first.more is True
+        assert 0 < len(first.lines) < 6
+        
+        second = read_since(temp_log_file, first.cursor)
+        assert first.lines + second.lines == [f'[10:31:0{i}.000] [LOG] line {i}\n' for i in range(6)]
+        assert second.more is False
+
+
+class TestPagination:
+    """双向分页测试"""
+    
+    @staticmethod
+    def _write_lines(path, count):
+        lines = [f'[10:{i // 60:02d}:{i % 60:02d}.000] [{"ERROR" if i % 10 == 0 else "LOG"}] line {i}\n'
+                 for i in range(count)]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(''.join(lines))
+        return lines
+    
+    def test_scan_backward_blocks(self, temp_dir):
+        """测试跨块反向扫描与正向读取一致"""
+        path = os.path.join(temp_dir, 'big.log')
+        lines = self._write_lines(path, 5000)
+        with open(path, 'rb') as f:
+            selected, start = scan_backward(f, os.path.getsize(path), 3000)
+        
+        assert [line.decode() for line in selected] == lines[-3000:]
+        assert start == sum(len(line) for line in lines[:2000])
+    
+    def test_page_backward_and_forward(self, temp_dir):
+        """测试向前翻页直到文件开头，再用 after 游标向后读取"""
+        path = os.path.join(temp_dir, 'big.log')
+        lines = self._write_lines(path, 1234)
+        
+        pages = []
+        page = read_page_before(path, None, max_lines=500)
+        pages.append(page)
+        while page.before is not None:
+            page = read_page_before(path, page.before, max_lines=500)
+            pages.append(page)
+        
+        assert [len(p.lines) for p in pages] == [500, 500, 234]
+        assert [line for p in reversed(pages) for line in p.lines] == lines
+        
+        # 最早一页的 after 游标向后读取紧接其后的内容
+        forward = read_since(path, pages[-1].after, max_lines=10)
+        assert forward.lines == lines[234:244]
+        assert forward.more is True
+    
+    def test_tail_page_includes_partial_line(self, temp_log_file):
+        """测试末尾页包含未以换行结尾的最后一行，after 游标在该行写完后完整读取"""
+        _append(temp_log_file, '[10:31:00.000] [LOG] partial')
+        
+        page = read_page_before(temp_log_file, None, max_lines=2)
+        assert page.lines[-1] == '[10:31:00.000] [LOG] partial'
+        
+        _append(temp_log_file, ' line\n')
+        forward = read_since(temp_log_file, page.after)
+        assert forward.lines == ['[10:31:00.000] [LOG] partial line\n']
+    
+    def test_page_budgets(self, temp_dir):
+        """测试每页字节上限和按级别过滤时的扫描上限"""
+        path = os.path.join(temp_dir, 'big.log')
+        lines = self._write_lines(path, 1000)
+        
+        page = read_page_before(path, None, max_lines=500, max_bytes=1000)
+        assert 0 < len(page.lines) < 500
+        assert sum(len(line) for line in page.lines) <= 1000
+        
+        page = read_page_before(path, None, max_lines=500, marker=b'[ERROR]', max_scan=2000)
+        assert page.scanned_bytes <= 2000 + len(lines[-1])
+        assert page.lines and all('[ERROR]' in line for line in page.lines)
+        assert page.before is not None
+    
+    def test_page_before_rotated(self, temp_dir):
+        """测试 before 游标在轮转后指向旧文件"""
+        path = os.path.join(temp_dir, 'obsidian-debug.log')
+        lines = self._write_lines(path, 20)
+        page = read_page_before(path, None, max_lines=5)
+        
+        rotated = os.path.join(temp_dir, 'obsidian-debug-2025-01-01T00-00-00.log')
+        os.rename(path, rotated)
+        _append(path, '[11:00:00.000] [LOG] new\n')
+        
+        older = read_page_before(path, page.before, max_lines=5)
+        assert older.lines == lines[10:15]
+        assert older.source == rotated
+        
+        # 清空后指向原内容的游标失效
+        latest = read_page_before(path, None, max_lines=1)
+        open(path, 'w').close()
+        with pytest.raises(ValueError):
+            read_page_before(path, latest.after)
+
+
+class TestCursorTools:
+    """LogManager 的游标读取测试"""
+    
+    @staticmethod
+    def _cursor(text):
+        return text.rsplit('🔖 cursor: ', 1)[1].split('（', 1)[0]
+    
+    def test_read_logs_since(self, temp_log_file):
+        """测试 read_logs 的增量读取"""
+        manager = LogManager(temp_log_file)
+        first = manager.read_logs(lines=10, with_cursor=True)
+        
+        _append(temp_log_file, '[10:31:00.000] [ERROR] new error\n[10:31:01.000] [LOG] new log\n')
+        result = manager.read_logs_since(self._cursor(first), level='error')
+        
+        assert '新增 1 条日志' in result
+        assert 'new error' in result
+        assert '测试错误' not in result
+        assert '新增 0 条日志' in manager.read_logs_since(self._cursor(result))
+    
+    def test_errors_since(self, temp_log_file):
+        """测试 get_recent_errors 的增量读取"""
+        manager = LogManager(temp_log_file)
+        first = manager.get_recent_errors(with_cursor=True)
+        assert '10:30:46.456' in first
+        
+        assert '未发现新的错误日志' in manager.get_errors_since(self._cursor(first))
+        
+        _append(temp_log_file, '[10:31:00.000] [ERROR] new error\n')
+        result = manager.get_errors_since(self._cursor(first))
+        assert '新增 1 个错误' in result
+        assert '10:30:46.456' not in result
+    
+    def test_invalid_cursor(self, temp_log_file):
+        """测试无效游标"""
+        manager = LogManager(temp_log_file)
+        assert manager.read_logs_since('!!!').startswith('❌')
+    
+    def test_read_logs_pages(self, temp_log_file):
+        """测试 read_logs 的行数上限和 before 翻页"""
+        manager = LogManager(temp_log_file, max_page_lines=2)
+        first = manager.read_logs(lines=100, with_cursor=True)
+        
+        assert '最近 2 条日志' in first
+        assert '每页最多 2 行' in first
+        before = first.split('⬆️ before: ', 1)[1].split('（', 1)[0]
+        
+        older = manager.read_logs_before(before, lines=100)
+        assert '更早的' in older
+        assert not set(older.splitlines()[2:4]) & set(first.splitlines()[2:4])
+        assert manager.read_logs_before('!!!').startswith('❌')
+    
+    def test_tail_page_without_file_io(self, temp_dir, monkeypatch):
+        """测试环形缓冲区命中时用记录的行位置生成游标，结果与磁盘读取一致且不读取文件"""
+        path = os.path.join(temp_dir, 'ring.log')
+        TestPagination._write_lines(path, 300)
+        manager = LogManager(path)
+        cache = LogCache(max_size=100)
+        reader = TailReader(path, chunk_size=256)
+        entries, complete = reader.read_tail(cache.max_size)
+        cache.reset_tail(entries, complete, reader.file_state, reader.last_spans, reader.head)
+        _append(path, '[11:00:00.000] [ERROR] appended\n')
+        entries = reader.read_appended()
+        cache.extend_tail(entries, reader.file_state, reader.last_spans, reader.head)
+        
+        state = manager.get_file_state()
+        expected = {level: manager.read_logs(5, level, with_cursor=True) for level in ('all', 'error')}
+        
+        def no_open(*args, **kwargs):
+            raise AssertionError('不应读取文件')
+        monkeypatch.setattr(log_manager_module, 'open', no_open, raising=False)
+        
+        for level in ('all', 'error'):
+            page = cache.get_tail_page(5, level, state)
+            assert manager.format_tail_page(page, level, state) == expected[level]
+        
+        # 行位置未知时回退到磁盘
+        cache.reset_tail(entries, False, state)
+        assert manager.format_tail_page(cache.get_tail_page(1, 'all', state), 'all', state) is None
@@ -0,0 +1,181 @@
+"""
+LogFollower 模块单元测试
+"""
+
+import os
+import time
+import asyncio
+import threading
+import pytest
+from cache import LogCache
+from file_monitor import FileMonitor
+from log_follower import (
+    LogFollower, ReloadOutcome, make_line_filter, match_reload_line, wait_for_line,
+    wait_for_reloads, format_reload_wait_result
+)
+
+
+def _append_later(path, lines, delay=0.05):
+    """在后台线程中延迟追加日志"""
+    def write():
+        for line in lines:
+            time.sleep(delay)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+    thread = threading.Thread(target=write)
+    thread.start()
+    return thread
+
+
+class TestMatchReloadLine:
+    """重载结果匹配测试"""
+    
+    def test_success_with_request_id(self):
+        """测试带请求 ID 的成功日志"""
+        outcomes = {'my-plugin': ReloadOutcome('my-plugin', 'abc123')}
+        line = '[10:30:45.123] [LOG] [Config Monitor] ✅ 插件已重载: my-plugin (用时: 210ms, 请求: abc123)\n'
+        
+        outcome = match_reload_line(line, outcomes)
+        assert outcome is outcomes['my-plugin']
+        assert outcome.success is True
+        assert outcome.reload_ms == 210
+    
+    def test_other_request_ignored(self):
+        """测试其他请求的结果不匹配"""
+        outcomes = {'my-plugin': ReloadOutcome('my-plugin', 'abc123')}
+        line = '[10:30:45.123] [LOG] [Config Monitor] ✅ 插件已重载: my-plugin (用时: 210ms, 请求: zzz999)\n'
+        
+        assert match_reload_line(line, outcomes) is None
+        assert outcomes['my-plugin'].success is None
+    
+    def test_coalesced_request_ids(self):
+        """测试合并进同一次重载的任一请求 ID 都能匹配"""
+        outcomes = {'my-plugin': ReloadOutcome('my-plugin', 'def456')}
+        line = '[10:30:45.123] [LOG] [Config Monitor] ✅ 插件已重载: my-plugin (用时: 210ms, 请求: abc123,def456)\n'
+        
+        assert match_reload_line(line, outcomes).success is True
+    
+    def test_auto_reload_failure(self):
+        """测试 Auto-Reload 的失败日志"""
+        outcomes = {'my-plugin': ReloadOutcome('my-plugin', 'abc123')}
+        line = '[10:30:45.123] [ERROR] [Auto-Reload] ❌ 插件重载失败: my-plugin (用时: 15ms)\n'
+        
+        assert match_reload_line(line, outcomes).success is False
+
+
+class TestLogFollower:
+    """日志跟随测试"""
+    
+    def test_follow_only_appended(self, temp_log_file):
+        """测试只产出 start() 之后追加的行（轮询模式）"""
+        follower = LogFollower(temp_log_file, poll_interval=0.01)
+        follower.start()
+        
+        async def collect():
+            lines = []
+            async for line in follower.follow(0.5):
+                lines.append(line)
+                if len(lines) == 2:
+                    break
+            return lines
+        
+        thread = _append_later(temp_log_file, ['[10:31:00.000] [LOG] a\n', '[10:31:01.000] [LOG] b\n'])
+        lines = asyncio.run(collect())
+        thread.join()
+        
+        assert lines == ['[10:31:00.000] [LOG] a\n', '[10:31:01.000] [LOG] b\n']
+        assert follower.bytes_read == sum(len(line.encode()) for line in lines)
+    
+    def test_follow_after_truncate(self, temp_log_file):
+        """测试日志被清空后从新内容继续"""
+        follower = LogFollower(temp_log_file, poll_interval=0.01)
+        follower.start()
+        with open(temp_log_file, 'w', encoding='utf-8') as f:
+            f.write('[11:00:00.000] [LOG] after clear\n')
+        
+        async def collect():
+            return [line async for line in follower.follow(0.05)]
+        
+        assert asyncio.run(collect()) == ['[11:00:00.000] [LOG] after clear\n']
+    
+    def test_wait_for_reloads_with_monitor(self, temp_dir):
+        """测试由文件变化事件唤醒，收集重载期间的错误"""
+        log_path = os.path.join(temp_dir, 'obsidian-debug.log')
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write('[10:30:00.000] [LOG] [Config Monitor] ✅ 插件已重载: my-plugin (用时: 1ms, 请求: old)\n')
+        
+        monitor = FileMonitor(log_path, LogCache(max_size=10), debounce_ms=10, backend='polling',
+                              poll_min_interval_ms=10, poll_max_interval_ms=20)
+        assert monitor.start()
+        try:
+            async def run():
+                monitor.start_ingest()
+                follower = LogFollower(log_path, monitor)
+                follower.start()
+                started_at = time.monotonic()
+                thread = _append_later(log_path, [
+                    '[10:31:00.000] [ERROR] TypeError: x is undefined\n',
+                    '[10:31:00.100] [LOG] [Config Monitor] ✅ 插件已重载: my-plugin (用时: 120ms, 请求: req1)\n'
+                ])
+                result = await wait_for_reloads(follower, {'my-plugin': 'req1'}, started_at, 5)
+                thread.join()
+                return result
+            
+            result = asyncio.run(run())
+        finally:
+            monitor.stop()
+        
+        assert result.timed_out is False
+        outcome = result.outcomes['my-plugin']
+        assert outcome.success is True
+        assert outcome.reload_ms == 120
+        assert 0 < outcome.latency_ms < 5000
+        assert result.errors == ['[10:31:00.000] [ERROR] TypeError: x is undefined']
+        assert '✅ 插件已重载: my-plugin' in format_reload_wait_result(result, 5)
+    
+    def test_wait_for_reloads_timeout(self, temp_log_file):
+        """测试超时"""
+        follower = LogFollower(temp_log_file, poll_interval=0.01)
+        follower.start()
+        
+        result = asyncio.run(wait_for_reloads(follower, {'my-plugin': 'req1'}, time.monotonic(), 0.05))
+        
+        assert result.timed_out is True
+        assert result.outcomes['my-plugin'].success is None
+        assert '等待超时' in format_reload_wait_result(result, 0.05)
+
+
+class TestWaitForLine:
+    """等待匹配日志测试"""
+    
+    def test_line_filter(self):
+        """测试正则和级别过滤"""
+        matches = make_line_filter(r'plugin \w+ loaded', ['ERROR', 'warn'])
+        
+        assert matches('[10:31:00.000] [WARN] plugin foo loaded\n')
+        assert not matches('[10:31:00.000] [LOG] plugin foo loaded\n')
+        assert not matches('[10:31:00.000] [ERROR] plugin failed\n')
+        assert make_line_filter('LOADED', ignore_case=True)('[10:31:00.000] [LOG] loaded\n')
+    
+    def test_wait_for_line(self, temp_log_file):
+        """测试返回调用之后追加的第一条匹配行"""
+        follower = LogFollower(temp_log_file, poll_interval=0.01)
+        follower.start()
+        
+        thread = _append_later(temp_log_file, [
+            '[10:31:00.000] [LOG] 测试错误 not yet\n',
+            '[10:31:01.000] [ERROR] 测试错误 again\n',
+            '[10:31:02.000] [ERROR] 测试错误 third\n'
+        ])
+        line = asyncio.run(wait_for_line(follower, make_line_filter('测试错误', ['ERROR']), 2))
+        thread.join()
+        
+        # 文件中已有的 "测试错误" 行不会匹配
+        assert line == '[10:31:01.000] [ERROR] 测试错误 again'
+    
+    def test_wait_for_line_timeout(self, temp_log_file):
+        """测试超时返回 None"""
+        follower = LogFollower(temp_log_file, poll_interval=0.01)
+        follower.start()
+        
+        assert asyncio.run(wait_for_line(follower, make_line_filter('never'), 0.05)) is None
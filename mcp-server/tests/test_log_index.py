@@ -0,0 +1,169 @@
+"""
+日志索引模块单元测试
+"""
+
+import os
+import time
+import threading
+from log_index import LogIndex, INDEX_MAGIC, HEADER_SIZE
+from log_manager import LogManager
+from scan_progress import ScanProgress
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+class TestLogIndex:
+    """共享索引测试"""
+    
+    def test_single_writer(self, temp_log_file, temp_dir):
+        """测试同一日志只有一个写入者，写入者关闭后其他实例接管"""
+        first = LogIndex(temp_log_file, index_dir=temp_dir)
+        second = LogIndex(temp_log_file, index_dir=temp_dir)
+        
+        assert first.elect() is True
+        assert second.elect() is False
+        
+        first.close()
+        assert second.elect() is True
+        second.close()
+    
+    def test_takeover_waits_for_readers(self, temp_log_file, temp_dir):
+        """测试接管写入者时等待正在使用只读映射的读取结束"""
+        first = LogIndex(temp_log_file, index_dir=temp_dir)
+        second = LogIndex(temp_log_file, index_dir=temp_dir)
+        first.elect()
+        first.update()
+        assert second.snapshot() is not None
+        first.close()
+        
+        results = []
+        with second._lock:
+            thread = threading.Thread(target=lambda: results.append(second.elect()))
+            thread.start()
+            thread.join(0.1)
+            assert thread.is_alive()
+        thread.join()
+        assert results == [True]
+        second.close()
+    
+    def test_reader_sees_writer_updates(self, temp_log_file, temp_dir):
+        """测试只读实例读取写入者发布的统计，并自行统计索引之后的新内容"""
+        writer = LogIndex(temp_log_file, index_dir=temp_dir)
+        reader = LogIndex(temp_log_file, index_dir=temp_dir)
+        writer.elect()
+        
+        try:
+            assert writer.update() is True
+            generation = reader.snapshot().generation
+            assert reader.aggregates().level_counts == {'LOG': 2, 'ERROR': 1, 'WARN': 1, 'DEBUG': 1}
+            
+            _append(temp_log_file, '[10:31:00.000] [ERROR] new error\n[10:31:01.000] [LOG] partial')
+            aggregates = reader.aggregates()
+            assert aggregates.total_lines == 7
+            assert aggregates.level_counts['ERROR'] == 2
+            assert aggregates.last_time == '10:31:01.000'
+            assert reader.get_stats()['is_writer'] is False
+            
+            writer.update()
+            snapshot = reader.snapshot()
+            assert snapshot.generation > generation
+            assert snapshot.aggregates.total_lines == 6
+        finally:
+            writer.close()
+            reader.close()
+    
+    def test_reset_on_truncate(self, temp_log_file, temp_dir):
+        """测试日志被清空后重建索引"""
+        index = LogIndex(temp_log_file, index_dir=temp_dir)
+        index.elect()
+        try:
+            assert index.aggregates().total_lines == 5
+            
+            with open(temp_log_file, 'w', encoding='utf-8') as f:
+                f.write('[11:00:00.000] [WARN] after clear\n')
+            aggregates = index.aggregates()
+            assert aggregates.total_lines == 1
+            assert aggregates.first_time == '11:00:00.000'
+        finally:
+            index.close()
+    
+    def test_old_format_rebuilt(self, temp_log_file, temp_dir):
+        """测试版本不符的索引文件被重建"""
+        index = LogIndex(temp_log_file, index_dir=temp_dir)
+        with open(index.index_path, 'wb') as f:
+            f.write(INDEX_MAGIC + b'\0\1' + b'\xff' * (HEADER_SIZE + 4096))
+        index.elect()
+        try:
+            assert index.aggregates().total_lines == 5
+            assert os.path.getsize(index.index_path) >= HEADER_SIZE
+        finally:
+            index.close()
+    
+    def test_summary_matches_full_scan(self, temp_log_file, temp_dir):
+        """测试使用索引的统计摘要与全量扫描一致"""
+        _append(temp_log_file, 'stack line\r\n[10:31:00.000] [ERROR] crlf error\r\n')
+        index = LogIndex(temp_log_file, index_dir=temp_dir)
+        index.elect()
+        try:
+            assert LogManager(temp_log_file, index=index).get_summary() == LogManager(temp_log_file).get_summary()
+        finally:
+            index.close()
+    
+    def test_partial_aggregates_while_building(self, temp_dir):
+        """测试大批量建立索引期间可读取已索引部分的统计，完成后不再返回部分结果"""
+        log_path = os.path.join(temp_dir, 'obsidian-debug.log')
+        line = '[10:00:00.000] [LOG] ' + 'x' * 80 + '\n'
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write(line * (6 * 1024 * 1024 // len(line)))
+        
+        index = LogIndex(log_path, index_dir=temp_dir)
+        index.elect()
+        log_manager = LogManager(log_path, index=index)
+        observed = []
+        publish = index._publish
+        
+        def record(snapshot):
+            publish(snapshot)
+            observed.append((index.partial_aggregates(), log_manager.get_summary(allow_partial=True)))
+        
+        index._publish = record
+        try:
+            index.update()
+            (aggregates, indexed, target), summary = observed[0]
+            assert 0 < indexed < target == os.path.getsize(log_path)
+            assert aggregates.total_lines == indexed // len(line)
+            assert '⏳ 索引预热中' in summary
+            
+            assert index.partial_aggregates() is None
+            assert log_manager.index_building() is False
+            assert '⏳' not in log_manager.get_summary(allow_partial=True)
+        finally:
+            index.close()
+    
+    def test_update_stops_at_deadline(self, temp_dir):
+        """测试增量更新到达截止时间时停在块边界，查询不等待大批量更新"""
+        log_path = os.path.join(temp_dir, 'obsidian-debug.log')
+        line = '[10:00:00.000] [LOG] ' + 'x' * 80 + '\n'
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write(line * (16 * 1024 * 1024 // len(line)))
+        size = os.path.getsize(log_path)
+        
+        index = LogIndex(log_path, index_dir=temp_dir)
+        index.elect()
+        try:
+            # 截止时间已过：每次更新只索引一块
+            assert index.update(deadline=time.monotonic()) is True
+            assert 0 < index.snapshot(deadline=time.monotonic()).indexed_offset <= size / 2
+            
+            # 剩余内容由带进度的扫描统计，到达截止时间时停止
+            progress = ScanProgress(deadline_ms=0)
+            aggregates = index.aggregates(progress)
+            assert progress.expired is True
+            assert aggregates.total_lines < size // len(line)
+            
+            assert index.aggregates().total_lines == size // len(line)
+        finally:
+            index.close()
@@ -0,0 +1,102 @@
+"""
+日志资源模块单元测试
+"""
+
+import asyncio
+import pytest
+from log_manager import LogManager
+from log_resources import (
+    ResourceSubscriptions, ERRORS_URI, DEBUG_URI, parse_view_uri, read_view, recent_sources
+)
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+class FakeSession:
+    """记录收到的资源更新通知"""
+    
+    def __init__(self):
+        self.updated = []
+    
+    async def send_resource_updated(self, uri):
+        self.updated.append(str(uri))
+
+
+class TestLogViews:
+    """资源读取测试"""
+    
+    def test_parse_view_uri(self):
+        """测试解析资源 URI 和查询参数"""
+        view, query = parse_view_uri('obsidian-log://errors?cursor=abc')
+        assert view.uri == ERRORS_URI
+        assert query == {'cursor': 'abc'}
+        
+        view, _ = parse_view_uri('obsidian-log://source/Config%20Monitor')
+        assert view.name == '[Config Monitor] 日志'
+        
+        with pytest.raises(ValueError):
+            parse_view_uri('obsidian-log://unknown')
+    
+    def test_read_delta(self, temp_log_file):
+        """测试带 cursor 只读取新增的匹配行"""
+        manager = LogManager(temp_log_file)
+        text, meta = read_view(manager, ERRORS_URI)
+        assert text and all('[ERROR]' in line for line in text.splitlines())
+        
+        _append(temp_log_file, '[10:31:00.000] [LOG] plain\n[10:31:01.000] [ERROR] new error\n')
+        text, meta = read_view(manager, f"{ERRORS_URI}?cursor={meta['cursor']}")
+        assert text == '[10:31:01.000] [ERROR] new error\n'
+        assert meta['more'] is False
+    
+    def test_source_view(self, temp_log_file):
+        """测试按来源过滤"""
+        _append(temp_log_file, '[10:31:00.000] [LOG] [Auto-Reload] ✅ 插件已重载: my-plugin\n'
+                               '[10:31:01.000] [LOG] message mentions [Auto-Reload]\n')
+        manager = LogManager(temp_log_file)
+        
+        text, _ = read_view(manager, 'obsidian-log://source/Auto-Reload')
+        assert text == '[10:31:00.000] [LOG] [Auto-Reload] ✅ 插件已重载: my-plugin\n'
+        assert 'Auto-Reload' in recent_sources(manager)
+
+
+class TestResourceSubscriptions:
+    """资源订阅测试（定时检查模式）"""
+    
+    def test_notify_only_matching_views(self, temp_log_file):
+        """测试只通知有新匹配行的资源，写入风暴合并为少量通知"""
+        manager = LogManager(temp_log_file)
+        subscriptions = ResourceSubscriptions(manager, min_interval=0.1)
+        session = FakeSession()
+        
+        async def run():
+            subscriptions.subscribe(ERRORS_URI, session)
+            subscriptions.subscribe(DEBUG_URI, session)
+            
+            _append(temp_log_file, '[10:31:00.000] [LOG] plain\n')
+            await asyncio.sleep(0.25)
+            first = list(session.updated)
+            
+            for i in range(20):
+                _append(temp_log_file, f'[10:31:01.000] [ERROR] error {i}\n')
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.25)
+            
+            subscriptions.unsubscribe(ERRORS_URI, session)
+            subscriptions.unsubscribe(DEBUG_URI, session)
+            return first
+        
+        first = asyncio.run(run())
+        
+        assert first == [DEBUG_URI]
+        assert ERRORS_URI in session.updated
+        assert len(session.updated) < 10
+        assert subscriptions.get_stats()['subscriptions'] == 0
+    
+    def test_subscribe_unknown_resource(self, temp_log_file):
+        """测试订阅未知资源"""
+        subscriptions = ResourceSubscriptions(LogManager(temp_log_file))
+        with pytest.raises(ValueError):
+            subscriptions.subscribe('obsidian-log://unknown', FakeSession())
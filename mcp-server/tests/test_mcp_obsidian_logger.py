@@ -0,0 +1,157 @@
+"""
+MCP 服务端工具调度单元测试
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import mcp_obsidian_logger as server
+from config_manager import ConfigManager
+from log_manager import LogManager
+
+
+@pytest.fixture
+def server_config(temp_dir, temp_log_file):
+    """创建带插件配置的仓库和服务端配置，初始化组件"""
+    vault_path = os.path.join(temp_dir, 'vault')
+    plugin_dir = os.path.join(vault_path, '.obsidian', 'plugins', 'obsidian-logger')
+    os.makedirs(plugin_dir)
+    with open(os.path.join(plugin_dir, 'data.json'), 'w', encoding='utf-8') as f:
+        json.dump({"autoReload": {"mode": "smart", "watchedPlugins": []}}, f)
+    
+    config_path = os.path.join(temp_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "vault_path": vault_path,
+            "log_file_path": temp_log_file,
+            "index": {"dir": os.path.join(temp_dir, 'index')},
+            "prewarm": {"enabled": False},
+            "refresh": {"enabled": False}
+        }, f)
+    assert server.initialize_components(config_path)
+    yield config_path
+    server.vaults.stop()
+
+
+def _call(name, arguments):
+    """通过内存中的客户端会话调用一次工具，返回文本结果"""
+    async def run():
+        async with create_connected_server_and_client_session(server.app) as session:
+            result = await session.call_tool(name, arguments)
+            return result.content[0].text
+    return asyncio.run(run())
+
+
+class TestDispatch:
+    """工具调度测试"""
+    
+    def test_config_write_off_loop(self, server_config, monkeypatch):
+        """测试插件配置写入在线程池中执行，不阻塞事件循环"""
+        threads = []
+        modify = ConfigManager.modify_plugin_config
+        
+        def record_thread(self, *mutators):
+            threads.append(threading.current_thread())
+            return modify(self, *mutators)
+        
+        monkeypatch.setattr(ConfigManager, 'modify_plugin_config', record_thread)
+        
+        assert '✅' in _call("set_auto_reload_mode", {"mode": "manual"})
+        assert '✅' in _call("manage_watched_plugins", {"action": "add", "plugins": ["a"]})
+        assert len(threads) == 2
+        assert threading.main_thread() not in threads
+        assert server.config_manager.get_auto_reload_mode() == 'manual'
+    
+    def test_wait_timeout_clamped(self):
+        """测试 timeout_seconds 被限制在允许范围内"""
+        assert server.wait_timeout({}, 30) == 30
+        assert server.wait_timeout({"timeout_seconds": -5}, 30) == server.MIN_WAIT_TIMEOUT
+        assert server.wait_timeout({"timeout_seconds": 0}, 30) == server.MIN_WAIT_TIMEOUT
+        assert server.wait_timeout({"timeout_seconds": 1e9}, 30) == server.MAX_WAIT_TIMEOUT
+        assert server.wait_timeout({"timeout_seconds": "abc"}, 15) == 15
+    
+    def test_deadline_ms_clamped(self, server_config):
+        """测试 deadline_ms 被限制在允许范围内，无法解析时不限制截止时间"""
+        assert server.request_deadline_ms({}) is None
+        assert server.request_deadline_ms({"deadline_ms": "abc"}) is None
+        assert server.request_deadline_ms({"deadline_ms": float('nan')}) is None
+        assert server.request_deadline_ms({"deadline_ms": 0}) == server.MIN_DEADLINE_MS
+        assert server.request_deadline_ms({"deadline_ms": 1e12}) == server.MAX_DEADLINE_MS
+        assert server.request_deadline_ms({"deadline_ms": "500"}) == 500
+        assert "minimum" in _call("analyze_errors", {"deadline_ms": 0})
+        
+        async def run():
+            return await server.dispatch_tool(server.vaults.default, "analyze_errors", {"deadline_ms": "abc"})
+        assert not asyncio.run(run())[0].text.startswith('❌')
+    
+    def test_wait_for_log_negative_timeout(self, server_config):
+        """测试 schema 拒绝负数超时，绕过校验时处理函数按最小值等待"""
+        assert "minimum" in _call("wait_for_log", {"pattern": "x", "timeout_seconds": -1})
+        
+        async def run():
+            return await server.dispatch_tool(
+                server.vaults.default, "wait_for_log", {"pattern": "never-matches", "timeout_seconds": -1})
+        text = asyncio.run(run())[0].text
+        assert f"等待超时（{server.MIN_WAIT_TIMEOUT}s）" in text
+    
+    def test_all_vaults_rejects_cursor(self, server_config):
+        """测试 vault="*" 时拒绝 cursor，避免把同一游标发给每个仓库"""
+        text = _call("get_recent_errors", {"vault": "*", "cursor": "abc"})
+        assert text.startswith('❌')
+        assert 'cursor' in text
+        assert '🗄️ 仓库' in _call("get_recent_errors", {"vault": "*"})
+    
+    def test_report_waits_for_prewarm(self, server_config, monkeypatch):
+        """测试预热期间的错误分析等待预热完成并命中其缓存，不并行重复扫描"""
+        vault = server.vaults.default
+        vault.prewarm = True
+        calls = []
+        analyze = LogManager.analyze_errors
+        
+        def slow_analyze(self, time_range_hours=24, progress=None):
+            calls.append(time_range_hours)
+            time.sleep(0.3)
+            return analyze(self, time_range_hours, progress)
+        
+        monkeypatch.setattr(LogManager, 'analyze_errors', slow_analyze)
+        
+        async def run():
+            await vault.start()
+            assert not vault.prewarm_done()
+            result = await server.dispatch_tool(vault, "analyze_errors", {})
+            return result[0].text
+        
+        text = asyncio.run(run())
+        assert calls == [24]
+        assert '💾' in text
+    
+    def test_prewarm_wait_bounded(self, server_config, monkeypatch):
+        """测试不带进度令牌时只等待有限时间，随后返回标注的部分结果；其他报告不等待预热"""
+        vault = server.vaults.default
+        vault.prewarm = True
+        analyze = LogManager.analyze_errors
+        
+        def slow_analyze(self, time_range_hours=24, progress=None):
+            time.sleep(1)
+            return analyze(self, time_range_hours, progress)
+        
+        monkeypatch.setattr(LogManager, 'analyze_errors', slow_analyze)
+        monkeypatch.setattr(server, 'PREWARM_WAIT_INTERVALS', 1)
+        
+        async def run():
+            await vault.start()
+            errors = await server.dispatch_tool(vault, "get_recent_errors", {})
+            assert not vault.prewarm_done()
+            analysis = await server.dispatch_tool(vault, "analyze_errors", {})
+            return errors[0].text, analysis[0].text
+        
+        errors, analysis = asyncio.run(run())
+        assert not errors.startswith('❌')
+        assert '⏳ 仓库预热尚未完成' in analysis
+        assert '💾' not in analysis
+
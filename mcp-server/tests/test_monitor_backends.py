@@ -0,0 +1,158 @@
+"""
+监听后端模块单元测试
+"""
+
+import os
+import time
+import pytest
+from monitor_backends import (
+    PollingBackend, InotifyBackend, select_backend, is_unreliable_fs, inotify_available,
+    IN_Q_OVERFLOW, _INOTIFY_EVENT,
+    BACKEND_AUTO, BACKEND_INOTIFY, BACKEND_WATCHDOG, BACKEND_POLLING
+)
+
+
+def _wait_for(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestPollingBackend:
+    """PollingBackend 测试类"""
+    
+    def test_interval_adapts(self, temp_log_file):
+        """测试空闲时间隔放大、活跃时收缩"""
+        calls = []
+        backend = PollingBackend(temp_log_file, lambda: calls.append(1),
+                                 min_interval_ms=10, max_interval_ms=100)
+        backend._last_stat = backend._stat()
+        
+        for _ in range(10):
+            assert backend.poll() is False
+        assert backend.interval_ms == 100
+        
+        with open(temp_log_file, 'a', encoding='utf-8') as f:
+            f.write('[10:31:00.000] [LOG] more\n')
+        
+        assert backend.poll() is True
+        assert backend.interval_ms == 10
+        assert calls == [1]
+    
+    def test_detects_removal(self, temp_log_file):
+        """测试文件删除也视为变化"""
+        calls = []
+        backend = PollingBackend(temp_log_file, lambda: calls.append(1))
+        backend._last_stat = backend._stat()
+        os.remove(temp_log_file)
+        
+        assert backend.poll() is True
+        assert backend.poll() is False
+    
+    def test_thread(self, temp_log_file):
+        """测试轮询线程能发现追加"""
+        calls = []
+        backend = PollingBackend(temp_log_file, lambda: calls.append(1),
+                                 min_interval_ms=10, max_interval_ms=20)
+        backend.start()
+        try:
+            assert backend.is_alive()
+            with open(temp_log_file, 'a', encoding='utf-8') as f:
+                f.write('[10:31:00.000] [LOG] more\n')
+            time.sleep(0.2)
+            assert calls
+        finally:
+            backend.stop()
+        assert not backend.is_alive()
+
+
+@pytest.mark.skipif(not inotify_available(), reason="需要 Linux inotify")
+class TestInotifyBackend:
+    """InotifyBackend 测试类"""
+    
+    @pytest.fixture
+    def backend(self, temp_dir):
+        log_path = os.path.join(temp_dir, 'obsidian-debug.log')
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write('[10:30:45.123] [LOG] first\n')
+        
+        calls = []
+        backend = InotifyBackend(log_path, lambda: calls.append(1))
+        backend.start()
+        yield backend, calls
+        backend.stop()
+    
+    def test_append(self, backend):
+        """测试追加目标文件触发通知"""
+        backend, calls = backend
+        with open(backend.log_file_path, 'a', encoding='utf-8') as f:
+            f.write('[10:30:46.000] [LOG] second\n')
+        
+        assert _wait_for(lambda: calls)
+    
+    def test_ignores_other_files(self, backend):
+        """测试同目录其他文件的写入不触发通知"""
+        backend, calls = backend
+        other = os.path.join(backend.log_dir, 'obsidian-debug-backup.log')
+        with open(other, 'w', encoding='utf-8') as f:
+            for _ in range(50):
+                f.write('noise\n')
+                f.flush()
+        with open(backend.log_file_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write('tmp\n')
+        time.sleep(0.1)
+        
+        assert calls == []
+    
+    def test_rotation(self, backend):
+        """测试轮转后继续监听新文件"""
+        backend, calls = backend
+        path = backend.log_file_path
+        os.rename(path, path.replace('.log', '-rotated.log'))
+        assert _wait_for(lambda: calls)
+        
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('[10:31:00.000] [LOG] new file\n')
+        assert _wait_for(lambda: backend._file_wd >= 0)
+        
+        calls.clear()
+        with open(path.replace('.log', '-rotated.log'), 'a', encoding='utf-8') as f:
+            f.write('late write to rotated file\n')
+        time.sleep(0.1)
+        assert calls == []
+        
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('[10:31:01.000] [LOG] more\n')
+        assert _wait_for(lambda: calls)
+
+    
+    def test_overflow_without_file_watch(self, temp_dir):
+        """测试日志文件不存在时（文件监听描述符为 -1）队列溢出仍会重新监听"""
+        backend = InotifyBackend(os.path.join(temp_dir, 'obsidian-debug.log'), lambda: None)
+        backend._dir_wd = 1
+        rewatched = []
+        backend._watch_file = lambda: rewatched.append(1)
+        
+        assert backend._file_wd == -1
+        assert backend.process(_INOTIFY_EVENT.pack(-1, IN_Q_OVERFLOW, 0, 0))
+        assert rewatched == [1]
+
+
+class TestSelectBackend:
+    """后端选择测试"""
+    
+    def test_explicit(self, temp_log_file):
+        """测试显式指定后端"""
+        assert select_backend(BACKEND_POLLING, temp_log_file) == BACKEND_POLLING
+        assert select_backend(BACKEND_WATCHDOG, temp_log_file) == BACKEND_WATCHDOG
+        expected = BACKEND_INOTIFY if inotify_available() else BACKEND_WATCHDOG
+        assert select_backend(BACKEND_INOTIFY, temp_log_file) == expected
+    
+    def test_auto_synced_folder(self):
+        """测试同步文件夹自动使用轮询"""
+        path = os.path.join(os.sep, 'home', 'user', 'Dropbox', 'vault', 'obsidian-debug.log')
+        assert is_unreliable_fs(path)[0] is True
+        assert select_backend(BACKEND_AUTO, path) == BACKEND_POLLING
@@ -0,0 +1,93 @@
+"""
+报告缓存后台重算模块单元测试
+"""
+
+import asyncio
+from cache import LogCache
+from log_manager import LogManager
+from file_monitor import FileMonitor, FileChangeEvent, CHANGE_APPEND
+from scan_progress import ScanProgress
+from report_refresh import ReportRefresher
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _changed(monitor, cache, path):
+    """模拟监听线程检测到追加：使缓存失效并发出变化事件"""
+    cache.invalidate()
+    monitor._emit(FileChangeEvent(CHANGE_APPEND, path, 1, 0, 0))
+
+
+class TestReportRefresher:
+    """后台重算测试"""
+    
+    def test_record(self, temp_log_file):
+        """测试只记录有缓存的参数组合，按最近使用排序并淘汰最旧的"""
+        refresher = ReportRefresher(LogManager(temp_log_file), LogCache(), max_reports=2)
+        refresher.record("analyze_errors", {"time_range_hours": 6})
+        refresher.record("get_recent_errors", {"limit": 5, "include_stack": True})
+        refresher.record("get_recent_errors", {"cursor": "abc"})
+        refresher.record("get_reload_statistics", {})
+        refresher.record("get_log_summary", {})
+        refresher.record("analyze_errors", {"time_range_hours": 6})
+        assert refresher.reports() == [("analyze_errors", 6), ("get_log_summary", None)]
+        
+        refresher.record("get_recent_errors", {})
+        assert refresher.reports() == [("get_recent_errors", 10), ("analyze_errors", 6)]
+    
+    def test_recompute_after_settle(self, temp_log_file):
+        """测试变化平静后重算记录的报告，下一次调用命中缓存"""
+        cache = LogCache()
+        monitor = FileMonitor(temp_log_file, cache)
+        refresher = ReportRefresher(LogManager(temp_log_file), cache, monitor, settle=0.05)
+        refresher.record("get_log_summary", {})
+        refresher.record("analyze_errors", {})
+        
+        async def run():
+            refresher._task = asyncio.get_running_loop().create_task(refresher._run())
+            await asyncio.sleep(0)
+            _append(temp_log_file, '[10:31:00.000] [ERROR] TypeError: late\n')
+            _changed(monitor, cache, temp_log_file)
+            for _ in range(100):
+                if cache.get_cached_summary() and cache.get_cached_analysis(24):
+                    break
+                await asyncio.sleep(0.02)
+            refresher.stop()
+        
+        asyncio.run(run())
+        assert '总行数：6' in cache.get_cached_summary()
+        assert 'late' in cache.get_cached_analysis(24)
+        assert refresher.get_stats()['recomputed'] == 2
+    
+    def test_interactive_preempts(self, temp_log_file):
+        """测试交互请求开始时取消正在进行的重算，请求期间不开始重算"""
+        cache = LogCache()
+        monitor = FileMonitor(temp_log_file, cache)
+        refresher = ReportRefresher(LogManager(temp_log_file), cache, monitor, settle=0.05)
+        refresher.record("get_log_summary", {})
+        running = ScanProgress()
+        refresher._running = running
+        
+        async def run():
+            refresher.begin()
+            assert running.cancelled is True
+            refresher._running = None
+            
+            refresher._task = asyncio.get_running_loop().create_task(refresher._run())
+            await asyncio.sleep(0)
+            _changed(monitor, cache, temp_log_file)
+            await asyncio.sleep(0.2)
+            assert cache.get_cached_summary() is None
+            
+            refresher.end()
+            for _ in range(100):
+                if cache.get_cached_summary():
+                    break
+                await asyncio.sleep(0.02)
+            refresher.stop()
+        
+        asyncio.run(run())
+        assert cache.get_cached_summary() is not None
@@ -0,0 +1,71 @@
+"""
+扫描进度模块单元测试
+"""
+
+import os
+import time
+from scan_progress import ScanProgress, deadline_from_ms
+from log_manager import LogManager
+
+
+def _big_log(temp_dir, size=6 * 1024 * 1024):
+    """创建跨越多个读取块的日志文件"""
+    log_path = os.path.join(temp_dir, 'obsidian-debug.log')
+    line = '[10:00:00.000] [ERROR] TypeError: ' + 'x' * 60 + '\n'
+    with open(log_path, 'w', encoding='utf-8') as f:
+        f.write(line * (size // len(line)))
+    return log_path
+
+
+class TestScanProgress:
+    """扫描进度测试"""
+    
+    def test_callback(self):
+        """测试开始时立即报告，之后按最小间隔报告"""
+        reports = []
+        progress = ScanProgress(lambda done, total: reports.append((done, total)), interval=3600)
+        progress.start(100)
+        assert progress.advance(50) is True
+        assert reports == [(0, 100)]
+        assert progress.done == 50 and progress.expired is False
+    
+    def test_deadline(self):
+        """测试到达截止时间后 advance 返回 False"""
+        progress = ScanProgress(deadline_ms=0)
+        progress.start(100)
+        assert progress.advance(10) is False
+        assert progress.expired is True
+    
+    def test_absolute_deadline(self):
+        """测试绝对截止时间从换算时起计算，之后创建的进度共用同一截止时间"""
+        deadline = deadline_from_ms(0)
+        time.sleep(0.01)
+        progress = ScanProgress(deadline_ms=10_000, deadline=deadline)
+        progress.start(100)
+        assert progress.advance(10) is False
+        assert progress.deadline_ms == 10_000
+        assert deadline_from_ms(None) is None
+    
+    def test_partial_analysis(self, temp_dir):
+        """测试错误分析到达截止时间时返回已扫描部分的结果并标注覆盖范围"""
+        log_manager = LogManager(_big_log(temp_dir))
+        progress = ScanProgress(deadline_ms=0)
+        
+        result = log_manager.analyze_errors(progress=progress)
+        assert progress.expired is True
+        assert 0 < progress.done < progress.total
+        assert '⏱️ 已到达截止时间（0 ms）' in result
+        
+        complete = ScanProgress()
+        assert '已到达截止时间' not in log_manager.analyze_errors(progress=complete)
+        assert complete.done == complete.total
+    
+    def test_partial_summary(self, temp_dir):
+        """测试没有索引时统计摘要到达截止时间只统计已扫描的部分"""
+        log_manager = LogManager(_big_log(temp_dir))
+        full = log_manager._get_aggregates()
+        progress = ScanProgress(deadline_ms=0)
+        
+        partial = log_manager._get_aggregates(progress)
+        assert 0 < partial.total_lines < full.total_lines
+        assert '⏱️ 已到达截止时间' in log_manager.get_summary(progress=ScanProgress(deadline_ms=0))
@@ -0,0 +1,112 @@
+"""
+TailReader 模块单元测试
+"""
+
+import os
+import pytest
+from tail_reader import TailReader, decode_lines
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+class TestTailReader:
+    """TailReader 测试类"""
+    
+    def test_decode_lines(self):
+        """测试解码与通用换行符"""
+        assert decode_lines(b'a\nb\r\nc\n') == ['a\n', 'b\n', 'c\n']
+        assert decode_lines(b'') == []
+    
+    def test_read_tail_complete(self, temp_log_file):
+        """测试预读整个小文件"""
+        reader = TailReader(temp_log_file)
+        lines, complete = reader.read_tail(100)
+        
+        with open(temp_log_file, 'r', encoding='utf-8') as f:
+            expected = f.readlines()
+        
+        assert lines == expected
+        assert complete is True
+        assert reader.offset == os.path.getsize(temp_log_file)
+        assert reader.file_state is not None
+    
+    def test_read_tail_limited(self, temp_log_file):
+        """测试只预读末尾几行"""
+        reader = TailReader(temp_log_file, chunk_size=16)
+        lines, complete = reader.read_tail(2)
+        
+        assert len(lines) == 2
+        assert '[LOG]' in lines[0]
+        assert '[DEBUG]' in lines[1]
+        assert complete is False
+    
+    def test_read_appended(self, temp_log_file):
+        """测试只读取追加的完整行"""
+        reader = TailReader(temp_log_file)
+        reader.read_tail(100)
+        
+        _append(temp_log_file, '[10:31:00.000] [ERROR] new error\n[10:31:01')
+        assert reader.read_appended() == ['[10:31:00.000] [ERROR] new error\n']
+        # 存在残行时状态不可用
+        assert reader.file_state is None
+        
+        _append(temp_log_file, '.000] [LOG] tail\n')
+        assert reader.read_appended() == ['[10:31:01.000] [LOG] tail\n']
+        assert reader.file_state is not None
+        
+        assert reader.read_appended() == []
+    
+    def test_read_appended_truncated(self, temp_log_file):
+        """测试截断后返回 None"""
+        reader = TailReader(temp_log_file)
+        reader.read_tail(100)
+        
+        with open(temp_log_file, 'w', encoding='utf-8') as f:
+            f.write('')
+        
+        assert reader.read_appended() is None
+    
+    def test_read_tail_nonexistent(self):
+        """测试文件不存在"""
+        reader = TailReader('/nonexistent/file.log')
+        lines, complete = reader.read_tail(10)
+        
+        assert lines == []
+        assert reader.file_state is None
+        assert reader.read_appended() is None
+
+    def test_line_spans_and_head(self, temp_log_file):
+        """测试记录各行在文件中的位置和文件开头"""
+        reader = TailReader(temp_log_file, chunk_size=16)
+        lines, _ = reader.read_tail(2)
+        with open(temp_log_file, 'rb') as f:
+            data = f.read()
+
+        assert reader.head == data[:1024]
+        for line, (start, length) in zip(lines, reader.last_spans):
+            assert data[start:start + length].decode('utf-8') == line
+
+        _append(temp_log_file, '[10:31:00.000] [LOG] a\r\n[10:31:01.000] [LOG] b\n')
+        appended = reader.read_appended()
+        start, length = reader.last_spans[0]
+        assert (start, length) == (len(data), len(b'[10:31:00.000] [LOG] a\r\n'))
+        assert len(reader.last_spans) == len(appended) == 2
+
+        # 单独的 '\r' 把一行拆成多行时位置未知
+        _append(temp_log_file, 'x\ry\n')
+        assert reader.read_appended() == ['x\n', 'y\n']
+        assert reader.last_spans == [None, None]
+
+    def test_head_grows_after_restart(self, temp_log_file):
+        """测试从头跟踪时文件开头随追加补齐"""
+        reader = TailReader(temp_log_file)
+        with open(temp_log_file, 'w', encoding='utf-8') as f:
+            f.write('')
+        reader.restart()
+        _append(temp_log_file, '[10:31:00.000] [LOG] a\n')
+        reader.read_appended()
+        assert reader.head == b'[10:31:00.000] [LOG] a\n'
+        assert reader.last_spans == [(0, len(reader.head))]
@@ -0,0 +1,145 @@
+"""
+多仓库模块单元测试
+"""
+
+import os
+import json
+import asyncio
+import threading
+import pytest
+from config_manager import ConfigManager
+from log_manager import LogManager
+from cache import LogCache
+from vaults import VaultComponents, VaultRegistry
+
+
+def _vault(temp_dir, name):
+    """创建一个不带文件监听的仓库组件"""
+    vault_path = os.path.join(temp_dir, name)
+    os.makedirs(vault_path, exist_ok=True)
+    log_path = os.path.join(temp_dir, f'{name}.log')
+    with open(log_path, 'w', encoding='utf-8') as f:
+        f.write(f'[10:00:00.000] [ERROR] {name} error\n')
+    
+    config_path = os.path.join(temp_dir, f'{name}.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({"vault_path": vault_path, "log_file_path": log_path}, f)
+    config_manager = ConfigManager(config_path)
+    return VaultComponents(name, config_manager, LogManager(log_path), LogCache())
+
+
+class TestVaultRegistry:
+    """仓库注册表测试"""
+    
+    def test_get(self, temp_dir):
+        """测试按名称获取仓库，未指定时返回默认仓库"""
+        registry = VaultRegistry('b')
+        registry.add(_vault(temp_dir, 'a'))
+        registry.add(_vault(temp_dir, 'b'))
+        
+        assert registry.names() == ['a', 'b']
+        assert registry.get().name == 'b'
+        assert registry.get('a').name == 'a'
+        with pytest.raises(KeyError):
+            registry.get('c')
+    
+    def test_fan_out(self, temp_dir):
+        """测试跨仓库查询在工作线程中并行执行，结果按配置顺序返回"""
+        registry = VaultRegistry('a', max_workers=2)
+        registry.add(_vault(temp_dir, 'a'))
+        registry.add(_vault(temp_dir, 'b'))
+        threads = set()
+        
+        def summarize(vault):
+            threads.add(threading.current_thread().name)
+            return vault.log_manager.get_summary()
+        
+        try:
+            results = asyncio.run(registry.fan_out(summarize))
+        finally:
+            registry.stop()
+        
+        assert [name for name, _ in results] == ['a', 'b']
+        assert 'a.log' in results[0][1] and 'b.log' in results[1][1]
+        assert all(name.startswith('vault-fan-out') for name in threads)
+        assert registry.get_stats()['fan_out_queries'] == 1
+    
+    def test_deferred_start(self, temp_dir):
+        """测试创建组件时不启动文件监听，start 在事件循环中启动监听和增量读取"""
+        from file_monitor import FileMonitor
+        
+        vault = _vault(temp_dir, 'a')
+        vault.file_monitor = FileMonitor(vault.log_manager.log_file_path, vault.cache)
+        registry = VaultRegistry('a')
+        registry.add(vault)
+        assert vault.file_monitor.is_running() is False
+        
+        async def run():
+            await registry.start()
+            return vault.file_monitor.is_running()
+        
+        try:
+            assert asyncio.run(run()) is True
+        finally:
+            registry.stop()
+    
+    def test_prewarm(self, temp_dir):
+        """测试启动后在后台缓存统计摘要和默认时间范围的错误分析"""
+        vault = _vault(temp_dir, 'a')
+        registry = VaultRegistry('a')
+        registry.add(vault)
+        
+        async def run():
+            await registry.start()
+            assert registry.get_stats()['prewarming'] == ['a']
+            await vault.prewarm_task
+        
+        try:
+            asyncio.run(run())
+        finally:
+            registry.stop()
+        
+        assert vault.prewarm_done()
+        assert 'a.log' in vault.cache.get_cached_summary()
+        assert 'a error' in vault.cache.get_cached_analysis(24)
+    
+    def test_start_failure_degrades(self, temp_dir, monkeypatch):
+        """测试索引或文件监听启动时抛出异常只降级该仓库，start 不抛出"""
+        from file_monitor import FileMonitor
+        from log_index import LogIndex
+        
+        def broken(self):
+            raise OSError('mmap failed')
+        monkeypatch.setattr(LogIndex, '_open_writer', broken)
+        monkeypatch.setattr(FileMonitor, 'start_ingest', broken)
+        
+        vault = _vault(temp_dir, 'a')
+        vault.log_index = LogIndex(vault.log_manager.log_file_path, index_dir=temp_dir)
+        vault.log_manager.index = vault.log_index
+        vault.file_monitor = FileMonitor(vault.log_manager.log_file_path, vault.cache)
+        vault.prewarm = False
+        registry = VaultRegistry('a')
+        registry.add(vault)
+        
+        try:
+            asyncio.run(registry.start())
+            assert set(registry.get_stats()['degraded']['a']) == {'log_index', 'file_monitor'}
+            assert vault.log_index is None and vault.log_manager.index is None
+            assert 'a.log' in vault.log_manager.get_summary()
+        finally:
+            registry.stop()
+    
+    def test_monitor_not_started_degrades(self, temp_dir, monkeypatch):
+        """测试文件监听启动返回失败时同样记录为降级"""
+        from file_monitor import FileMonitor
+        monkeypatch.setattr(FileMonitor, 'start', lambda self: False)
+        
+        vault = _vault(temp_dir, 'a')
+        vault.file_monitor = FileMonitor(vault.log_manager.log_file_path, vault.cache)
+        vault.prewarm = False
+        
+        try:
+            asyncio.run(vault.start())
+            assert set(vault.degraded) == {'file_monitor'}
+        finally:
+            vault.stop()